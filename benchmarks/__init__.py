@@ -0,0 +1 @@
+"""Offline load benchmarks for the MCP app and proxy against a fake Databricks workspace."""
@@ -0,0 +1,248 @@
+"""MCP clients used to drive the app: direct streamable HTTP and the stdio proxy."""
+
+import itertools
+import json
+import os
+import subprocess
+import sys
+import threading
+from concurrent.futures import Future
+
+import httpx
+
+from dba_mcp_proxy.mcp_client import iter_sse_events
+
+PROTOCOL_VERSION = '2024-11-05'
+CLIENT_INFO = {'name': 'databricks-mcp-benchmark', 'version': '1.0.0'}
+
+
+def is_error(response: dict) -> bool:
+  """Whether a JSON-RPC response failed, including tool results reporting success=false."""
+  if 'error' in response:
+    return True
+  result = response.get('result') or {}
+  if result.get('isError'):
+    return True
+  structured = result.get('structuredContent')
+  return isinstance(structured, dict) and structured.get('success') is False
+
+
+def rss_bytes(max_rss: int) -> int:
+  """Convert ru_maxrss to bytes; it is in kilobytes on Linux and bytes on macOS."""
+  return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+def process_cpu_seconds(pid: int) -> float | None:
+  """CPU time a running process has used so far, None where /proc is not available."""
+  try:
+    with open(f'/proc/{pid}/stat') as f:
+      # Fields after the parenthesized command name; utime and stime are the 12th and 13th
+      fields = f.read().rsplit(')', 1)[1].split()
+  except OSError:
+    return None
+  return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def wait_with_usage(process: subprocess.Popen, timeout: float = 30) -> dict:
+  """Reap a child process and return the CPU time and peak memory it used.
+
+  The process is killed if it has not exited after timeout seconds.
+  """
+  # Popen.wait() would reap the process and lose its resource usage, so wait4 it directly
+  killer = threading.Timer(timeout, process.kill)
+  killer.start()
+  try:
+    _, status, usage = os.wait4(process.pid, 0)
+  finally:
+    killer.cancel()
+  process.returncode = os.waitstatus_to_exitcode(status)
+  return {
+    'cpu_seconds': round(usage.ru_utime + usage.ru_stime, 3),
+    'peak_rss_bytes': rss_bytes(usage.ru_maxrss),
+  }
+
+
+class McpHttpClient:
+  """One MCP session with the app over streamable HTTP, as an MCP host would hold it."""
+
+  def __init__(self, mcp_url: str, timeout: float = 300, headers: dict = None):
+    """Create a client.
+
+    Args:
+        mcp_url: The app's MCP endpoint, e.g. http://localhost:8000/mcp/
+        timeout: Seconds to wait for a response
+        headers: Extra headers sent with every request
+    """
+    self.mcp_url = mcp_url
+    self.http = httpx.Client(timeout=timeout)
+    self.headers = {
+      'Accept': 'application/json, text/event-stream',
+      'Authorization': 'Bearer benchmark',
+      **(headers or {}),
+    }
+    self._ids = itertools.count(1)
+
+  def initialize(self) -> dict:
+    """Run the initialize handshake and keep the session id."""
+    response = self.request(
+      'initialize',
+      {'protocolVersion': PROTOCOL_VERSION, 'capabilities': {}, 'clientInfo': CLIENT_INFO},
+    )
+    self.notify('notifications/initialized')
+    return response
+
+  def _post(self, message: dict) -> httpx.Response:
+    return self.http.post(self.mcp_url, json=message, headers=self.headers)
+
+  def notify(self, method: str, params: dict = None) -> None:
+    """Send a notification."""
+    message = {'jsonrpc': '2.0', 'method': method}
+    if params is not None:
+      message['params'] = params
+    self._post(message).raise_for_status()
+
+  def request(self, method: str, params: dict = None) -> dict:
+    """Send a request and return its JSON-RPC response."""
+    request_id = next(self._ids)
+    message = {'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params or {}}
+    with self.http.stream('POST', self.mcp_url, json=message, headers=self.headers) as response:
+      if 'mcp-session-id' in response.headers:
+        self.headers['mcp-session-id'] = response.headers['mcp-session-id']
+      response.raise_for_status()
+      if response.headers.get('content-type', '').startswith('text/event-stream'):
+        for data in iter_sse_events(response.iter_bytes()):
+          payload = json.loads(data)
+          if payload.get('id') == request_id:
+            return payload
+        raise RuntimeError(f'Stream ended without a response to {method}')
+      return json.loads(response.read())
+
+  def call_tool(self, name: str, arguments: dict = None) -> dict:
+    """Call a tool and return its JSON-RPC response."""
+    return self.request('tools/call', {'name': name, 'arguments': arguments or {}})
+
+  def close(self) -> None:
+    """End the session and close connections."""
+    session_id = self.headers.get('mcp-session-id')
+    try:
+      if session_id:
+        self.http.delete(self.mcp_url, headers=self.headers)
+    except httpx.HTTPError:
+      pass
+    self.http.close()
+
+
+class StdioProxyClient:
+  """Runs dba_mcp_proxy as a subprocess and talks to it over stdin/stdout.
+
+  The proxy is shared by every benchmark worker, the way an MCP host shares
+  one proxy between its concurrent tool calls: requests are written as they
+  are made and a reader thread matches responses back by JSON-RPC id.
+  """
+
+  def __init__(
+    self,
+    app_url: str,
+    databricks_host: str,
+    max_concurrency: int = 8,
+    extra_args: list[str] = None,
+    stderr=subprocess.DEVNULL,
+    timeout: float = 300,
+  ):
+    """Start the proxy.
+
+    Args:
+        app_url: URL of the app, must be http://localhost:... so no OAuth token is fetched
+        databricks_host: Workspace URL passed to the proxy
+        max_concurrency: Proxy worker threads
+        extra_args: Further proxy command line arguments
+        stderr: Where the proxy's log goes
+        timeout: Seconds to wait for a response
+    """
+    self.timeout = timeout
+    command = [
+      sys.executable,
+      '-m',
+      'dba_mcp_proxy.mcp_client',
+      '--databricks-host',
+      databricks_host,
+      '--databricks-app-url',
+      app_url,
+      '--max-concurrency',
+      str(max_concurrency),
+      *(extra_args or []),
+    ]
+    self.process = subprocess.Popen(
+      command,
+      stdin=subprocess.PIPE,
+      stdout=subprocess.PIPE,
+      stderr=stderr,
+      text=True,
+      bufsize=1,
+    )
+    self._ids = itertools.count(1)
+    self._pending = {}
+    self._lock = threading.Lock()
+    self._write_lock = threading.Lock()
+    self._reader = threading.Thread(target=self._read, name='proxy-reader', daemon=True)
+    self._reader.start()
+
+  def _read(self) -> None:
+    for line in self.process.stdout:
+      try:
+        message = json.loads(line)
+      except json.JSONDecodeError:
+        continue
+      if not isinstance(message, dict) or 'id' not in message:
+        continue  # Notifications
+      with self._lock:
+        future = self._pending.pop(message['id'], None)
+      if future is not None:
+        future.set_result(message)
+    # The proxy exited, fail whatever is still waiting
+    with self._lock:
+      pending, self._pending = self._pending, {}
+    for future in pending.values():
+      future.set_exception(RuntimeError('Proxy exited'))
+
+  def _write(self, message: dict) -> None:
+    # Not self._lock: a write blocked on a full pipe must not stop the reader draining stdout
+    with self._write_lock:
+      self.process.stdin.write(json.dumps(message) + '\n')
+      self.process.stdin.flush()
+
+  def initialize(self) -> dict:
+    """Run the initialize handshake through the proxy."""
+    response = self.request(
+      'initialize',
+      {'protocolVersion': PROTOCOL_VERSION, 'capabilities': {}, 'clientInfo': CLIENT_INFO},
+    )
+    self._write({'jsonrpc': '2.0', 'method': 'notifications/initialized'})
+    return response
+
+  def request(self, method: str, params: dict = None) -> dict:
+    """Send a request and wait for its response."""
+    future = Future()
+    with self._lock:
+      request_id = next(self._ids)
+      self._pending[request_id] = future
+    self._write({'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params or {}})
+    return future.result(self.timeout)
+
+  def call_tool(self, name: str, arguments: dict = None) -> dict:
+    """Call a tool and return its JSON-RPC response."""
+    return self.request('tools/call', {'name': name, 'arguments': arguments or {}})
+
+  def cpu_seconds(self) -> float | None:
+    """CPU time the proxy has used so far, None where it cannot be read while running."""
+    return process_cpu_seconds(self.process.pid)
+
+  def close(self) -> dict:
+    """Stop the proxy and return the CPU time and peak memory it used."""
+    try:
+      self.process.stdin.close()
+    except OSError:
+      pass
+    usage = wait_with_usage(self.process)
+    self._reader.join(5)
+    return usage
@@ -0,0 +1,553 @@
+"""Local stand-in for the Databricks REST APIs the MCP server calls.
+
+Serves the Statement Execution, SQL Warehouses, DBFS and SCIM Me endpoints
+with synthetic data, so the app can be load tested without a workspace.
+Every request sleeps for a configurable latency, statements take a
+configurable time to run, and results are split into chunks the way the
+real API splits them (JSON_ARRAY inline, or ARROW_STREAM external links
+served by this process when pyarrow is installed).
+
+Run standalone and point the app at it:
+
+    python -m benchmarks.fake_databricks --port 8765 --latency-ms 20 --rows 5000
+    DATABRICKS_HOST=http://127.0.0.1:8765 DATABRICKS_TOKEN=fake uvicorn server.app:app
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# Column name, SQL type name and type text of the synthetic result schema, cycled for wide results
+COLUMN_TYPES = (
+  ('id', 'LONG', 'bigint'),
+  ('category', 'STRING', 'string'),
+  ('amount', 'DOUBLE', 'double'),
+  ('name', 'STRING', 'string'),
+  ('active', 'BOOLEAN', 'boolean'),
+  ('created_at', 'TIMESTAMP', 'timestamp'),
+)
+CATEGORIES = ('alpha', 'beta', 'gamma', 'delta', 'epsilon', 'zeta', 'eta', 'theta')
+MAX_STATEMENTS = 10000  # Statements remembered for polling, oldest forgotten first
+
+_STATEMENT = re.compile(r'^/api/2\.0/sql/statements/([^/]+)$')
+_CHUNK = re.compile(r'^/api/2\.0/sql/statements/([^/]+)/result/chunks/(\d+)$')
+_CANCEL = re.compile(r'^/api/2\.0/sql/statements/([^/]+)/cancel$')
+_WAREHOUSE = re.compile(r'^/api/2\.0/sql/warehouses/([^/]+)$')
+_WAREHOUSE_START = re.compile(r'^/api/2\.0/sql/warehouses/([^/]+)/start$')
+_STORAGE = re.compile(r'^/fake-storage/(\d+)/(\d+)$')
+
+
+class FakeApiError(Exception):
+  """An error answered in the Databricks error format."""
+
+  def __init__(self, status: int, error_code: str, message: str):
+    super().__init__(message)
+    self.status = status
+    self.error_code = error_code
+
+
+def _parse_duration(value: str | None) -> float:
+  """Parse a wait_timeout such as '30s' into seconds."""
+  if not value:
+    return 10.0
+  return float(value.rstrip('s') or 0)
+
+
+class FakeWorkspace:
+  """Synthetic workspace state and the responses of each endpoint.
+
+  Results are deterministic: a statement returns min(rows, row_limit) rows of
+  generated data split into chunks of chunk_rows, whatever its SQL text.
+  """
+
+  def __init__(
+    self,
+    latency: float = 0.02,
+    jitter: float = 0.0,
+    statement_seconds: float = 0.05,
+    rows: int = 1000,
+    columns: int = 6,
+    chunk_rows: int = 10000,
+    warehouses: int = 3,
+    dbfs_files: int = 50,
+    seed: int = 0,
+  ):
+    """Create a workspace.
+
+    Args:
+        latency: Seconds added to every API request
+        jitter: Up to this many seconds added on top of latency, uniformly random
+        statement_seconds: Time a statement runs before it succeeds
+        rows: Rows produced by each statement before row_limit applies
+        columns: Columns of the result schema
+        chunk_rows: Rows per result chunk
+        warehouses: Running SQL warehouses in the workspace
+        dbfs_files: Entries returned when listing a DBFS directory
+        seed: Seed of the jitter generator, so runs are repeatable
+    """
+    self.latency = latency
+    self.jitter = jitter
+    self.statement_seconds = statement_seconds
+    self.rows = rows
+    self.columns = max(1, columns)
+    self.chunk_rows = max(1, chunk_rows)
+    self.warehouses = max(1, warehouses)
+    self.dbfs_files = dbfs_files
+    self.base_url = ''  # Set by the server, used in external links
+    self._random = random.Random(seed)
+    self._statements = OrderedDict()  # statement_id -> [started_at, row_count, arrow, state]
+    self._lock = threading.Lock()
+    self.requests = Counter()
+
+  def config(self) -> dict:
+    """Return the settings, for inclusion in benchmark reports."""
+    return {
+      'latency_ms': self.latency * 1000,
+      'jitter_ms': self.jitter * 1000,
+      'statement_ms': self.statement_seconds * 1000,
+      'rows': self.rows,
+      'columns': self.columns,
+      'chunk_rows': self.chunk_rows,
+      'warehouses': self.warehouses,
+      'dbfs_files': self.dbfs_files,
+    }
+
+  def stats(self) -> dict:
+    """Return request counts per endpoint."""
+    with self._lock:
+      return {'requests': dict(self.requests), 'statements': len(self._statements)}
+
+  def delay(self) -> None:
+    """Sleep for the configured API latency."""
+    with self._lock:
+      extra = self._random.uniform(0, self.jitter) if self.jitter else 0.0
+    if self.latency + extra > 0:
+      time.sleep(self.latency + extra)
+
+  def count(self, endpoint: str) -> None:
+    """Count one request to endpoint."""
+    with self._lock:
+      self.requests[endpoint] += 1
+
+  # Statement Execution API
+
+  def _schema(self) -> dict:
+    columns = []
+    for position in range(self.columns):
+      name, type_name, type_text = COLUMN_TYPES[position % len(COLUMN_TYPES)]
+      if position >= len(COLUMN_TYPES):
+        name = f'{name}_{position // len(COLUMN_TYPES)}'
+      columns.append(
+        {'name': name, 'type_name': type_name, 'type_text': type_text, 'position': position}
+      )
+    return {'column_count': self.columns, 'columns': columns}
+
+  def _chunks(self, row_count: int) -> list[dict]:
+    return [
+      {
+        'chunk_index': index,
+        'row_offset': offset,
+        'row_count': min(self.chunk_rows, row_count - offset),
+      }
+      for index, offset in enumerate(range(0, row_count, self.chunk_rows))
+    ]
+
+  def _manifest(self, row_count: int, arrow: bool) -> dict:
+    chunks = self._chunks(row_count)
+    return {
+      'format': 'ARROW_STREAM' if arrow else 'JSON_ARRAY',
+      'schema': self._schema(),
+      'total_chunk_count': len(chunks),
+      'total_row_count': row_count,
+      'chunks': chunks,
+      'truncated': row_count < self.rows,
+    }
+
+  def _state(self, statement: list) -> str:
+    started_at, _, _, state = statement
+    if state == 'RUNNING' and time.monotonic() - started_at >= self.statement_seconds:
+      statement[3] = state = 'SUCCEEDED'
+    return state
+
+  def _statement(self, statement_id: str) -> list:
+    with self._lock:
+      statement = self._statements.get(statement_id)
+    if statement is None:
+      raise FakeApiError(404, 'RESOURCE_DOES_NOT_EXIST', f'Statement {statement_id} not found')
+    return statement
+
+  def _response(self, statement_id: str, statement: list) -> dict:
+    _, row_count, arrow, _ = statement
+    state = self._state(statement)
+    response = {'statement_id': statement_id, 'status': {'state': state}}
+    if state == 'SUCCEEDED':
+      response['manifest'] = self._manifest(row_count, arrow)
+      if row_count:
+        response['result'] = self.chunk(statement_id, 0)
+    return response
+
+  def execute_statement(self, body: dict) -> dict:
+    """POST /api/2.0/sql/statements/."""
+    if not body.get('warehouse_id') or not body.get('statement'):
+      raise FakeApiError(400, 'INVALID_PARAMETER_VALUE', 'warehouse_id and statement are required')
+    row_limit = body.get('row_limit')
+    row_count = min(self.rows, row_limit) if row_limit is not None else self.rows
+    arrow = body.get('disposition') == 'EXTERNAL_LINKS'
+    statement_id = f'01f0{uuid.uuid4().hex[:28]}'
+    statement = [time.monotonic(), row_count, arrow, 'RUNNING']
+    with self._lock:
+      self._statements[statement_id] = statement
+      while len(self._statements) > MAX_STATEMENTS:
+        self._statements.popitem(last=False)
+
+    # Hold the request until the statement finishes or the wait timeout passes
+    wait = min(_parse_duration(body.get('wait_timeout')), self.statement_seconds)
+    if wait > 0:
+      time.sleep(wait)
+    return self._response(statement_id, statement)
+
+  def get_statement(self, statement_id: str) -> dict:
+    """GET /api/2.0/sql/statements/{statement_id}."""
+    return self._response(statement_id, self._statement(statement_id))
+
+  def chunk(self, statement_id: str, chunk_index: int) -> dict:
+    """GET /api/2.0/sql/statements/{statement_id}/result/chunks/{chunk_index}."""
+    _, row_count, arrow, _ = self._statement(statement_id)
+    chunks = self._chunks(row_count)
+    if chunk_index >= len(chunks):
+      raise FakeApiError(400, 'INVALID_PARAMETER_VALUE', f'No chunk {chunk_index}')
+    chunk = dict(chunks[chunk_index])
+    if chunk_index + 1 < len(chunks):
+      chunk['next_chunk_index'] = chunk_index + 1
+    if arrow:
+      link = {
+        **chunk,
+        'byte_count': len(self.arrow_chunk(row_count, chunk_index)),
+        'external_link': f'{self.base_url}/fake-storage/{row_count}/{chunk_index}',
+        'expiration': '2099-01-01T00:00:00Z',
+      }
+      return {'external_links': [link]}
+    chunk['data_array'] = self._rows(chunk['row_offset'], chunk['row_count'])
+    return chunk
+
+  def cancel(self, statement_id: str) -> dict:
+    """POST /api/2.0/sql/statements/{statement_id}/cancel."""
+    statement = self._statement(statement_id)
+    if self._state(statement) == 'RUNNING':
+      statement[3] = 'CANCELED'
+    return {}
+
+  def _rows(self, offset: int, count: int) -> list:
+    return _generated_rows(self.columns, offset, count)
+
+  def arrow_chunk(self, row_count: int, chunk_index: int) -> bytes:
+    """Arrow IPC stream of one chunk, the body of an external link."""
+    chunk = self._chunks(row_count)[chunk_index]
+    return _arrow_stream(
+      self.columns,
+      tuple(c['name'] for c in self._schema()['columns']),
+      chunk['row_offset'],
+      chunk['row_count'],
+    )
+
+  # SQL Warehouses API
+
+  def _warehouse(self, index: int) -> dict:
+    return {
+      'id': f'bench{index:04d}',
+      'name': f'Benchmark warehouse {index}',
+      'state': 'RUNNING',
+      'cluster_size': ('Small', 'Medium', 'Large')[index % 3],
+      'warehouse_type': 'PRO',
+      'enable_serverless_compute': True,
+      'creator_name': 'bench@example.com',
+      'auto_stop_mins': 10,
+      'num_clusters': 1,
+      'num_active_sessions': 0,
+    }
+
+  def list_warehouses(self) -> dict:
+    """GET /api/2.0/sql/warehouses."""
+    return {'warehouses': [self._warehouse(i) for i in range(self.warehouses)]}
+
+  def get_warehouse(self, warehouse_id: str) -> dict:
+    """GET /api/2.0/sql/warehouses/{id}."""
+    for index in range(self.warehouses):
+      if self._warehouse(index)['id'] == warehouse_id:
+        return self._warehouse(index)
+    raise FakeApiError(404, 'RESOURCE_DOES_NOT_EXIST', f'Warehouse {warehouse_id} not found')
+
+  def start_warehouse(self, warehouse_id: str) -> dict:
+    """POST /api/2.0/sql/warehouses/{id}/start, a no-op since every warehouse is running."""
+    self.get_warehouse(warehouse_id)
+    return {}
+
+  # DBFS and SCIM APIs
+
+  def list_dbfs(self, path: str) -> dict:
+    """GET /api/2.0/dbfs/list."""
+    base = path.rstrip('/')
+    return {
+      'files': [
+        {
+          'path': f'{base}/{"dir" if i % 5 == 0 else "file"}_{i}',
+          'is_dir': i % 5 == 0,
+          'file_size': 0 if i % 5 == 0 else 1024 * (i + 1),
+          'modification_time': 1700000000000 + i,
+        }
+        for i in range(self.dbfs_files)
+      ]
+    }
+
+  def dbfs_status(self, path: str) -> dict:
+    """GET /api/2.0/dbfs/get-status, listed 'file_' entries are files, anything else a directory."""
+    is_dir = not path.rstrip('/').rsplit('/', 1)[-1].startswith('file_')
+    return {
+      'path': path,
+      'is_dir': is_dir,
+      'file_size': 0 if is_dir else 1024,
+      'modification_time': 1700000000000,
+    }
+
+  def me(self) -> dict:
+    """GET /api/2.0/preview/scim/v2/Me."""
+    return {
+      'id': '1000',
+      'userName': 'bench@example.com',
+      'displayName': 'Benchmark User',
+      'active': True,
+      'emails': [{'value': 'bench@example.com', 'primary': True}],
+      'groups': [{'display': 'users', 'value': '1'}],
+    }
+
+
+@lru_cache(maxsize=64)
+def _generated_rows(columns: int, offset: int, count: int) -> list:
+  """Deterministic JSON_ARRAY rows, values as strings like the real API returns them."""
+  rows = []
+  for i in range(offset, offset + count):
+    row = []
+    for position in range(columns):
+      kind = COLUMN_TYPES[position % len(COLUMN_TYPES)][1]
+      if kind == 'LONG':
+        row.append(str(i))
+      elif kind == 'DOUBLE':
+        row.append(str(round(i * 1.25 + position, 2)))
+      elif kind == 'BOOLEAN':
+        row.append('true' if i % 2 else 'false')
+      elif kind == 'TIMESTAMP':
+        row.append(f'2024-01-{1 + i % 28:02d}T{i % 24:02d}:00:00.000Z')
+      elif position % len(COLUMN_TYPES) == 1:
+        row.append(CATEGORIES[i % len(CATEGORIES)])
+      else:
+        row.append(f'name-{i}')
+    rows.append(row)
+  return rows
+
+
+@lru_cache(maxsize=64)
+def _arrow_stream(columns: int, names: tuple, offset: int, count: int) -> bytes:
+  try:
+    import pyarrow as pa
+    import pyarrow.ipc  # noqa: F401
+  except ImportError:
+    raise FakeApiError(
+      400, 'INVALID_PARAMETER_VALUE', 'The fake serves ARROW_STREAM results only with pyarrow'
+    ) from None
+  rows = _generated_rows(columns, offset, count)
+  arrays = []
+  for position in range(columns):
+    values = [row[position] for row in rows]
+    kind = COLUMN_TYPES[position % len(COLUMN_TYPES)][1]
+    if kind == 'LONG':
+      arrays.append(pa.array([int(v) for v in values], pa.int64()))
+    elif kind == 'DOUBLE':
+      arrays.append(pa.array([float(v) for v in values], pa.float64()))
+    elif kind == 'BOOLEAN':
+      arrays.append(pa.array([v == 'true' for v in values], pa.bool_()))
+    else:
+      arrays.append(pa.array(values, pa.string()))
+  table = pa.Table.from_arrays(arrays, names=list(names))
+  sink = pa.BufferOutputStream()
+  with pa.ipc.new_stream(sink, table.schema) as writer:
+    writer.write_table(table)
+  return sink.getvalue().to_pybytes()
+
+
+class _Handler(BaseHTTPRequestHandler):
+  """Routes requests to the FakeWorkspace of the server."""
+
+  protocol_version = 'HTTP/1.1'  # Keep-alive, like the real API
+
+  def log_message(self, format, *args):
+    pass
+
+  @property
+  def workspace(self) -> FakeWorkspace:
+    return self.server.workspace
+
+  def _send(self, status: int, body: bytes, content_type: str = 'application/json') -> None:
+    self.send_response(status)
+    self.send_header('Content-Type', content_type)
+    self.send_header('Content-Length', str(len(body)))
+    self.end_headers()
+    self.wfile.write(body)
+
+  def _dispatch(self, method: str) -> None:
+    url = urlsplit(self.path)
+    path = url.path
+    length = int(self.headers.get('Content-Length') or 0)
+    body = json.loads(self.rfile.read(length) or b'{}') if length else {}
+    try:
+      endpoint, handler = self._route(method, path, parse_qs(url.query), body)
+      if endpoint is None:
+        raise FakeApiError(404, 'ENDPOINT_NOT_FOUND', f'No fake for {method} {path}')
+      if endpoint == 'fake.stats':
+        self._send(200, json.dumps(self.workspace.stats()).encode())
+        return
+      self.workspace.count(endpoint)
+      self.workspace.delay()
+      result = handler()
+      if isinstance(result, bytes):
+        self._send(200, result, 'application/vnd.apache.arrow.stream')
+      else:
+        self._send(200, json.dumps(result).encode())
+    except FakeApiError as e:
+      error = {'error_code': e.error_code, 'message': str(e)}
+      self._send(e.status, json.dumps(error).encode())
+
+  def _route(self, method: str, path: str, query: dict, body: dict):
+    """Return (endpoint name, handler) for a request, (None, None) if there is no fake."""
+    ws = self.workspace
+    if method == 'POST':
+      if path.rstrip('/') == '/api/2.0/sql/statements':
+        return 'statements.execute', lambda: ws.execute_statement(body)
+      if match := _CANCEL.match(path):
+        return 'statements.cancel', lambda: ws.cancel(match.group(1))
+      if match := _WAREHOUSE_START.match(path):
+        return 'warehouses.start', lambda: ws.start_warehouse(match.group(1))
+      return None, None
+
+    if match := _CHUNK.match(path):
+      return 'statements.chunk', lambda: ws.chunk(match.group(1), int(match.group(2)))
+    if match := _STATEMENT.match(path):
+      return 'statements.get', lambda: ws.get_statement(match.group(1))
+    if path == '/api/2.0/sql/warehouses':
+      return 'warehouses.list', ws.list_warehouses
+    if match := _WAREHOUSE.match(path):
+      return 'warehouses.get', lambda: ws.get_warehouse(match.group(1))
+    if path == '/api/2.0/dbfs/list':
+      return 'dbfs.list', lambda: ws.list_dbfs(query.get('path', ['/'])[0])
+    if path == '/api/2.0/dbfs/get-status':
+      return 'dbfs.get_status', lambda: ws.dbfs_status(query.get('path', ['/'])[0])
+    if path == '/api/2.0/preview/scim/v2/Me':
+      return 'scim.me', ws.me
+    if match := _STORAGE.match(path):
+      return 'storage', lambda: ws.arrow_chunk(int(match.group(1)), int(match.group(2)))
+    if path == '/fake/stats':
+      return 'fake.stats', None
+    return None, None
+
+  def do_GET(self):
+    """Handle a GET request."""
+    self._dispatch('GET')
+
+  def do_POST(self):
+    """Handle a POST request."""
+    self._dispatch('POST')
+
+
+class FakeDatabricksServer(ThreadingHTTPServer):
+  """Threaded HTTP server answering for a FakeWorkspace."""
+
+  daemon_threads = True
+  request_queue_size = 1024
+
+  def __init__(self, workspace: FakeWorkspace, host: str = '127.0.0.1', port: int = 0):
+    """Bind the server; port 0 picks a free port."""
+    super().__init__((host, port), _Handler)
+    self.workspace = workspace
+    workspace.base_url = self.url
+
+  @property
+  def url(self) -> str:
+    """Base URL to use as DATABRICKS_HOST."""
+    host, port = self.server_address[:2]
+    return f'http://{host}:{port}'
+
+  def start(self) -> 'FakeDatabricksServer':
+    """Serve on a background thread."""
+    threading.Thread(target=self.serve_forever, name='fake-databricks', daemon=True).start()
+    return self
+
+
+def add_workspace_arguments(parser: argparse.ArgumentParser) -> None:
+  """Add the FakeWorkspace settings to an argument parser."""
+  parser.add_argument('--latency-ms', type=float, default=20, help='Latency of every API call')
+  parser.add_argument('--jitter-ms', type=float, default=0, help='Random extra latency, up to')
+  parser.add_argument('--statement-ms', type=float, default=50, help='Time a statement runs')
+  parser.add_argument('--rows', type=int, default=1000, help='Rows produced by each statement')
+  parser.add_argument('--columns', type=int, default=6, help='Columns of statement results')
+  parser.add_argument('--chunk-rows', type=int, default=10000, help='Rows per result chunk')
+  parser.add_argument('--warehouses', type=int, default=3, help='SQL warehouses to list')
+  parser.add_argument('--dbfs-files', type=int, default=50, help='Entries per DBFS listing')
+
+
+def workspace_arguments(args: argparse.Namespace) -> list[str]:
+  """Turn parsed workspace settings back into command line arguments."""
+  return [
+    f'--latency-ms={args.latency_ms}',
+    f'--jitter-ms={args.jitter_ms}',
+    f'--statement-ms={args.statement_ms}',
+    f'--rows={args.rows}',
+    f'--columns={args.columns}',
+    f'--chunk-rows={args.chunk_rows}',
+    f'--warehouses={args.warehouses}',
+    f'--dbfs-files={args.dbfs_files}',
+  ]
+
+
+def workspace_from_args(args: argparse.Namespace) -> FakeWorkspace:
+  """Create a FakeWorkspace from parsed workspace settings."""
+  return FakeWorkspace(
+    latency=args.latency_ms / 1000,
+    jitter=args.jitter_ms / 1000,
+    statement_seconds=args.statement_ms / 1000,
+    rows=args.rows,
+    columns=args.columns,
+    chunk_rows=args.chunk_rows,
+    warehouses=args.warehouses,
+    dbfs_files=args.dbfs_files,
+  )
+
+
+def main():
+  """Run the fake API until interrupted."""
+  parser = argparse.ArgumentParser(description='Local stand-in for the Databricks REST APIs')
+  parser.add_argument('--host', default='127.0.0.1', help='Interface to bind')
+  parser.add_argument('--port', type=int, default=8765, help='Port to bind, 0 picks a free one')
+  add_workspace_arguments(parser)
+  args = parser.parse_args()
+
+  server = FakeDatabricksServer(workspace_from_args(args), args.host, args.port)
+  # The benchmark runner reads the URL from the first line
+  print(f'Fake Databricks API listening on {server.url}', flush=True)
+  try:
+    server.serve_forever()
+  except KeyboardInterrupt:
+    pass
+  finally:
+    print(json.dumps(server.workspace.stats()), file=sys.stderr)
+
+
+if __name__ == '__main__':
+  main()
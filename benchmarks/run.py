@@ -0,0 +1,560 @@
+"""Run load scenarios against the app and the stdio proxy and report the results as JSON.
+
+Every scenario and transport gets a fresh fake workspace and a fresh app
+process, so memory high-water marks and CPU time are not carried over from
+one scenario to the next. The report is written as JSON (schema_version 1);
+passing an earlier report as --baseline adds a list of regressions. The
+run exits with status 1 when a scenario failed or regressed.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import re
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from benchmarks.clients import (
+  McpHttpClient,
+  StdioProxyClient,
+  is_error,
+  wait_with_usage,
+)
+from benchmarks.fake_databricks import (
+  add_workspace_arguments,
+  workspace_arguments,
+  workspace_from_args,
+)
+from benchmarks.scenarios import SCENARIOS, TRANSPORTS, Scenario, get_scenario
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SCHEMA_VERSION = 1
+WAREHOUSE_ID = 'bench0000'  # First warehouse of the fake workspace
+STARTUP_TIMEOUT = 60
+
+_SERIES = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*(?:\{.*\})?) (\S+)$')
+
+
+def _free_port() -> int:
+  with socket.socket() as s:
+    s.bind(('127.0.0.1', 0))
+    return s.getsockname()[1]
+
+
+def parse_metrics(text: str) -> dict:
+  """Parse Prometheus text into {series: value}, series being name{labels} as rendered."""
+  series = {}
+  for line in text.splitlines():
+    match = _SERIES.match(line)
+    if match:
+      series[match.group(1)] = float(match.group(2))
+  return series
+
+
+def _delta(before: dict, after: dict, key: str) -> float:
+  return after.get(key, 0.0) - before.get(key, 0.0)
+
+
+def latency_summary(latencies: list[float]) -> dict:
+  """Mean, p50, p95, p99 and max of latencies in seconds, in milliseconds."""
+  if not latencies:
+    return {'mean': None, 'p50': None, 'p95': None, 'p99': None, 'max': None}
+  if len(latencies) == 1:
+    cuts = latencies * 99
+  else:
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+  return {
+    'mean': round(statistics.fmean(latencies) * 1000, 2),
+    'p50': round(cuts[49] * 1000, 2),
+    'p95': round(cuts[94] * 1000, 2),
+    'p99': round(cuts[98] * 1000, 2),
+    'max': round(max(latencies) * 1000, 2),
+  }
+
+
+class FakeWorkspaceProcess:
+  """The fake Databricks API running in its own process, so it does not share our GIL."""
+
+  def __init__(self, arguments: list[str], log):
+    """Start the fake and wait for its URL."""
+    self.process = subprocess.Popen(
+      [sys.executable, '-m', 'benchmarks.fake_databricks', '--port', '0', *arguments],
+      cwd=REPO_ROOT,
+      stdout=subprocess.PIPE,
+      stderr=log,
+      text=True,
+    )
+    line = self.process.stdout.readline()
+    if 'listening on ' not in line:
+      self.process.kill()
+      raise RuntimeError('The fake Databricks API did not start')
+    self.url = line.rsplit(' ', 1)[1].strip()
+
+  def stats(self) -> dict:
+    """Request counts per endpoint."""
+    return httpx.get(f'{self.url}/fake/stats').json()['requests']
+
+  def stop(self) -> None:
+    """Stop the fake."""
+    self.process.terminate()
+    self.process.wait(10)
+
+
+class AppProcess:
+  """server.app:app under uvicorn, pointed at the fake workspace.
+
+  The app runs from an empty working directory so a developer's .env.local
+  cannot point it at a real workspace.
+  """
+
+  def __init__(self, databricks_host: str, env: dict, log):
+    """Start the app and wait until it answers."""
+    self.port = _free_port()
+    self.url = f'http://localhost:{self.port}'
+    self._workdir = tempfile.mkdtemp(prefix='mcp-bench-')
+    app_env = {
+      **os.environ,
+      'PYTHONPATH': os.pathsep.join(filter(None, [str(REPO_ROOT), os.environ.get('PYTHONPATH')])),
+      'DATABRICKS_HOST': databricks_host,
+      'DATABRICKS_TOKEN': 'benchmark-token',
+      'DATABRICKS_SQL_WAREHOUSE_ID': WAREHOUSE_ID,
+      'MCP_PROMPTS_DIR': str(REPO_ROOT / 'prompts'),
+      'MCP_PROMPTS_HOT_RELOAD': 'false',
+      'MCP_ARTIFACT_DIR': os.path.join(self._workdir, 'artifacts'),
+      **env,
+    }
+    for name in ('DATABRICKS_CONFIG_PROFILE', 'DATABRICKS_CLIENT_ID', 'DATABRICKS_CLIENT_SECRET'):
+      app_env.pop(name, None)
+    self.process = subprocess.Popen(
+      [
+        sys.executable,
+        '-m',
+        'uvicorn',
+        'server.app:app',
+        '--host',
+        '127.0.0.1',
+        '--port',
+        str(self.port),
+        '--log-level',
+        'warning',
+        '--no-access-log',
+      ],
+      cwd=self._workdir,
+      env=app_env,
+      stdout=log,
+      stderr=log,
+    )
+    try:
+      self._wait_ready()
+    except Exception:
+      self.process.kill()
+      self.process.wait()
+      shutil.rmtree(self._workdir, ignore_errors=True)
+      raise
+
+  def _wait_ready(self) -> None:
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+      if self.process.poll() is not None:
+        raise RuntimeError(f'The app exited during startup with status {self.process.returncode}')
+      try:
+        if httpx.get(f'{self.url}/api/metrics', timeout=2).status_code == 200:
+          return
+      except httpx.HTTPError:
+        pass
+      time.sleep(0.2)
+    raise RuntimeError(f'The app did not start within {STARTUP_TIMEOUT}s')
+
+  def metrics(self) -> dict:
+    """Scrape and parse /api/metrics."""
+    return parse_metrics(httpx.get(f'{self.url}/api/metrics', timeout=30).text)
+
+  def stop(self) -> dict:
+    """Stop the app and return the CPU time and peak memory of its whole life."""
+    self.process.terminate()
+    try:
+      return wait_with_usage(self.process)
+    finally:
+      shutil.rmtree(self._workdir, ignore_errors=True)
+
+
+def run_load(workers: list, call, requests: int) -> tuple[list[float], int, float]:
+  """Make requests calls spread over one thread per worker.
+
+  Args:
+      workers: One client per thread, the same client may appear more than once
+      call: call(client) makes one request and returns whether it failed
+      requests: Total requests to make
+
+  Returns:
+      Tuple of (latency of each request in seconds, failed requests, wall-clock seconds)
+  """
+  latencies = []
+  errors = 0
+  remaining = requests
+  lock = threading.Lock()
+
+  def worker(client):
+    nonlocal remaining, errors
+    local = []
+    failed = 0
+    while True:
+      with lock:
+        if remaining <= 0:
+          break
+        remaining -= 1
+      start = time.perf_counter()
+      try:
+        failed += bool(call(client))
+      except Exception:
+        failed += 1
+      local.append(time.perf_counter() - start)
+    with lock:
+      latencies.extend(local)
+      errors += failed
+
+  threads = [threading.Thread(target=worker, args=(client,)) for client in workers]
+  started = time.perf_counter()
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  return latencies, errors, time.perf_counter() - started
+
+
+def _workspace_arguments(args: argparse.Namespace, scenario: Scenario) -> list[str]:
+  settings = argparse.Namespace(**vars(args))
+  for key, value in scenario.workspace.items():
+    setattr(settings, key, value)
+  return workspace_arguments(settings)
+
+
+def _clients(scenario: Scenario, transport: str, app: AppProcess, fake_url: str, args, log):
+  """Create the clients of a run: (worker clients, call function, proxy or None)."""
+  if scenario.route:
+    workers = [httpx.Client(timeout=300) for _ in range(args.concurrency)]
+    url = f'{app.url}{scenario.route}'
+    return workers, lambda client: client.get(url).status_code >= 400, None
+
+  calls = itertools.count()
+
+  def call(client):
+    return is_error(client.call_tool(scenario.tool, scenario.arguments_for(next(calls))))
+
+  if transport == 'proxy':
+    proxy = StdioProxyClient(
+      app.url, fake_url, max_concurrency=args.concurrency, extra_args=args.proxy_arg, stderr=log
+    )
+    proxy.initialize()
+    return [proxy] * args.concurrency, call, proxy
+
+  workers = []
+  for _ in range(args.concurrency):
+    client = McpHttpClient(f'{app.url}/mcp/')
+    client.initialize()
+    workers.append(client)
+  return workers, call, None
+
+
+def run_scenario(scenario: Scenario, transport: str, args: argparse.Namespace, log) -> dict:
+  """Run one scenario on one transport with a fresh fake workspace and app."""
+  fake = FakeWorkspaceProcess(_workspace_arguments(args, scenario), log)
+  app = proxy = None
+  workers = []
+  try:
+    app = AppProcess(fake.url, {**scenario.app_env, **dict(args.app_env)}, log)
+    workers, call, proxy = _clients(scenario, transport, app, fake.url, args, log)
+
+    # Warm connections, SDK clients and caches before measuring
+    run_load(workers, call, args.warmup)
+
+    before = app.metrics()
+    api_before = fake.stats()
+    proxy_cpu_before = proxy.cpu_seconds() if proxy else None
+    latencies, errors, elapsed = run_load(workers, call, args.requests)
+    proxy_cpu_after = proxy.cpu_seconds() if proxy else None
+    api_after = fake.stats()
+    after = app.metrics()
+  finally:
+    for client in {id(c): c for c in workers}.values():
+      if client is not proxy:
+        client.close()
+    proxy_usage = proxy.close() if proxy else None
+    if app is not None:
+      app.stop()
+    fake.stop()
+
+  if scenario.route:
+    name, labels = 'http_request_duration_seconds', f'{{route="{scenario.route}",method="GET"}}'
+  else:
+    name, labels = 'mcp_tool_duration_seconds', f'{{tool="{scenario.tool}"}}'
+  server_count = _delta(before, after, f'{name}_count{labels}')
+  server_seconds = _delta(before, after, f'{name}_sum{labels}')
+  cpu = _delta(before, after, 'process_cpu_seconds_total')
+  calls = len(latencies)
+
+  api_calls = {
+    endpoint: count - api_before.get(endpoint, 0)
+    for endpoint, count in sorted(api_after.items())
+    if count - api_before.get(endpoint, 0)
+  }
+  result = {
+    'scenario': scenario.name,
+    'transport': transport,
+    'target': scenario.target,
+    'arguments': scenario.arguments,
+    'concurrency': args.concurrency,
+    'requests': calls,
+    'errors': errors,
+    'error_rate': round(errors / calls, 4) if calls else 0.0,
+    'duration_seconds': round(elapsed, 3),
+    'throughput_rps': round(calls / elapsed, 2) if elapsed else None,
+    'latency_ms': latency_summary(latencies),
+    'app': {
+      'server_ms_mean': round(server_seconds / server_count * 1000, 2) if server_count else None,
+      'cpu_seconds': round(cpu, 3),
+      'cpu_ms_per_call': round(cpu / calls * 1000, 3) if calls else None,
+      'baseline_rss_bytes': int(before.get('process_max_resident_memory_bytes', 0)),
+      'peak_rss_bytes': int(after.get('process_max_resident_memory_bytes', 0)),
+    },
+    'api_calls': api_calls,
+    'api_calls_per_request': round(sum(api_calls.values()) / calls, 2) if calls else None,
+    'workspace': scenario.workspace,
+  }
+  if proxy_usage is not None:
+    if proxy_cpu_before is not None and proxy_cpu_after is not None:
+      proxy_cpu, includes_startup = proxy_cpu_after - proxy_cpu_before, False
+    else:
+      proxy_cpu, includes_startup = proxy_usage['cpu_seconds'], True
+    result['proxy'] = {
+      'cpu_seconds': round(proxy_cpu, 3),
+      'cpu_ms_per_call': round(proxy_cpu / calls * 1000, 3) if calls else None,
+      'cpu_includes_startup': includes_startup,
+      'peak_rss_bytes': proxy_usage['peak_rss_bytes'],
+    }
+  return result
+
+
+# (path in a result, higher is worse, smallest change worth reporting)
+REGRESSION_CHECKS = (
+  (('throughput_rps',), False, 0.0),
+  (('latency_ms', 'p95'), True, 1.0),
+  (('app', 'cpu_ms_per_call'), True, 0.05),
+  (('app', 'peak_rss_bytes'), True, 1024 * 1024),
+  (('proxy', 'cpu_ms_per_call'), True, 0.05),
+)
+
+
+def _lookup(result: dict, path: tuple):
+  for key in path:
+    if not isinstance(result, dict):
+      return None
+    result = result.get(key)
+  return result
+
+
+def find_regressions(results: list[dict], baseline: list[dict], tolerance: float) -> list[dict]:
+  """Compare results to a baseline run of the same scenarios.
+
+  A metric regresses when it got worse by more than tolerance (a fraction of
+  the baseline value) and by more than a small absolute amount, so noise in
+  sub-millisecond numbers is not reported.
+  """
+  previous = {(r['scenario'], r['transport']): r for r in baseline}
+  regressions = []
+  for result in results:
+    old = previous.get((result['scenario'], result['transport']))
+    if old is None:
+      continue
+    for path, higher_is_worse, floor in REGRESSION_CHECKS:
+      before, now = _lookup(old, path), _lookup(result, path)
+      if not before or now is None:
+        continue
+      change = (now - before) / before
+      worse = change if higher_is_worse else -change
+      if worse > tolerance and abs(now - before) > floor:
+        regressions.append(
+          {
+            'scenario': result['scenario'],
+            'transport': result['transport'],
+            'metric': '.'.join(path),
+            'baseline': before,
+            'current': now,
+            'change': round(change, 4),
+          }
+        )
+  return regressions
+
+
+def _git_commit() -> str | None:
+  try:
+    return subprocess.run(
+      ['git', 'rev-parse', '--short', 'HEAD'],
+      cwd=REPO_ROOT,
+      capture_output=True,
+      text=True,
+      check=True,
+    ).stdout.strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+
+def _summary_line(result: dict) -> str:
+  latency = result['latency_ms']
+  return (
+    f'{result["scenario"]:<26} {result["transport"]:<6} {result["throughput_rps"]:>8} req/s  '
+    f'p50 {latency["p50"]:>8} ms  p95 {latency["p95"]:>8} ms  p99 {latency["p99"]:>8} ms  '
+    f'cpu {result["app"]["cpu_ms_per_call"]:>7} ms/call  '
+    f'rss {result["app"]["peak_rss_bytes"] / 2**20:>6.1f} MiB  errors {result["errors"]}'
+  )
+
+
+def _key_value(value: str) -> tuple[str, str]:
+  key, sep, val = value.partition('=')
+  if not sep or not key:
+    raise argparse.ArgumentTypeError(f'expected KEY=VALUE, got {value!r}')
+  return key, val
+
+
+def main():
+  """Run the selected scenarios and write the JSON report."""
+  parser = argparse.ArgumentParser(
+    description='Benchmark the MCP app and proxy against a local fake Databricks workspace',
+  )
+  parser.add_argument(
+    '--scenario',
+    action='append',
+    help='Scenario to run, repeat for several (default: all)',
+  )
+  parser.add_argument(
+    '--transport',
+    choices=(*TRANSPORTS, 'both'),
+    default='both',
+    help='Call tools on the app directly (http), through the stdio proxy, or both',
+  )
+  parser.add_argument('--requests', type=int, default=200, help='Measured requests per run')
+  parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients')
+  parser.add_argument('--warmup', type=int, default=16, help='Unmeasured requests first')
+  parser.add_argument(
+    '--app-env',
+    type=_key_value,
+    action='append',
+    default=[],
+    metavar='KEY=VALUE',
+    help='Environment variable for the app, e.g. MCP_BLOCKING_MAX_WORKERS=64',
+  )
+  parser.add_argument(
+    '--proxy-arg',
+    action='append',
+    default=[],
+    help='Extra dba_mcp_proxy argument, e.g. --proxy-arg=--http2',
+  )
+  parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+  parser.add_argument('--baseline', help='Earlier report to check for regressions against')
+  parser.add_argument(
+    '--tolerance',
+    type=float,
+    default=0.2,
+    help='Fraction by which a metric may get worse before it is a regression (default: 0.2)',
+  )
+  parser.add_argument('--log', help='Append app, proxy and fake logs to this file')
+  parser.add_argument('--list', action='store_true', help='List scenarios and exit')
+  add_workspace_arguments(parser)
+  args = parser.parse_args()
+
+  if args.list:
+    for scenario in SCENARIOS:
+      print(f'{scenario.name:<26} {scenario.description}')
+    return
+
+  try:
+    scenarios = [get_scenario(name) for name in args.scenario] if args.scenario else SCENARIOS
+  except KeyError as e:
+    parser.error(str(e.args[0]))
+  transports = TRANSPORTS if args.transport == 'both' else (args.transport,)
+  args.concurrency = max(1, args.concurrency)
+
+  log = open(args.log, 'a') if args.log else subprocess.DEVNULL
+  results = []
+  skipped = []
+  failed = []
+  try:
+    for scenario in scenarios:
+      missing = scenario.missing_requirements()
+      if missing:
+        skipped.append({'scenario': scenario.name, 'reason': f'missing {", ".join(missing)}'})
+        print(f'{scenario.name:<26} skipped, {", ".join(missing)} not installed', file=sys.stderr)
+        continue
+      for transport in transports:
+        if transport not in scenario.transports:
+          continue
+        try:
+          result = run_scenario(scenario, transport, args, log)
+        except Exception as e:
+          failed.append({'scenario': scenario.name, 'transport': transport, 'error': str(e)})
+          print(f'{scenario.name:<26} {transport:<6} failed: {e}', file=sys.stderr)
+          continue
+        results.append(result)
+        print(_summary_line(result), file=sys.stderr)
+  finally:
+    if args.log:
+      log.close()
+
+  report = {
+    'schema_version': SCHEMA_VERSION,
+    'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+    'git_commit': _git_commit(),
+    'environment': {
+      'python': platform.python_version(),
+      'platform': platform.platform(),
+      'cpu_count': os.cpu_count(),
+    },
+    'settings': {
+      'requests': args.requests,
+      'concurrency': args.concurrency,
+      'warmup': args.warmup,
+      'app_env': dict(args.app_env),
+      'proxy_args': args.proxy_arg,
+      'workspace': workspace_from_args(args).config(),
+    },
+    'results': results,
+    'skipped': skipped,
+    'failed': failed,
+  }
+
+  regressions = []
+  if args.baseline:
+    baseline = json.loads(Path(args.baseline).read_text())
+    regressions = find_regressions(results, baseline.get('results', []), args.tolerance)
+    report['baseline'] = {'git_commit': baseline.get('git_commit'), 'tolerance': args.tolerance}
+    report['regressions'] = regressions
+    for regression in regressions:
+      print(
+        f'Regression: {regression["scenario"]} {regression["transport"]} {regression["metric"]} '
+        f'{regression["baseline"]} -> {regression["current"]} ({regression["change"]:+.0%})',
+        file=sys.stderr,
+      )
+
+  output = json.dumps(report, indent=2)
+  if args.output:
+    Path(args.output).write_text(output + '\n')
+  else:
+    print(output)
+  if regressions or failed:
+    sys.exit(1)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,186 @@
+"""Load scenarios: one tool or route, its arguments and the workspace it runs against."""
+
+import importlib.util
+
+TRANSPORTS = ('http', 'proxy')
+
+
+class Scenario:
+  """A single-tool load pattern.
+
+  Each scenario exercises one tool (or API route), so the CPU time the app
+  spends during the measured phase can be attributed to that tool.
+  """
+
+  def __init__(
+    self,
+    name: str,
+    description: str,
+    tool: str = None,
+    arguments: dict = None,
+    route: str = None,
+    workspace: dict = None,
+    app_env: dict = None,
+    transports: tuple = TRANSPORTS,
+    requires: tuple = (),
+  ):
+    """Define a scenario.
+
+    Args:
+        name: Identifier used on the command line and in reports
+        description: What the scenario measures
+        tool: MCP tool to call
+        arguments: Tool arguments; '{n}' in string values is replaced by the call number,
+            so queries can be made unique to defeat result caching and coalescing
+        route: API route to GET instead of calling a tool, e.g. /api/user/me
+        workspace: FakeWorkspace settings that differ from the run's defaults
+        app_env: Environment variables the app runs with for this scenario
+        transports: Transports the scenario can run on
+        requires: Modules that must be importable, the scenario is skipped otherwise
+    """
+    self.name = name
+    self.description = description
+    self.tool = tool
+    self.arguments = arguments or {}
+    self.route = route
+    self.workspace = workspace or {}
+    self.app_env = app_env or {}
+    # Routes are plain HTTP, the proxy only speaks MCP
+    self.transports = ('http',) if route else transports
+    self.requires = requires
+
+  @property
+  def target(self) -> str:
+    """Tool name, or 'GET <route>' for route scenarios."""
+    return self.tool or f'GET {self.route}'
+
+  def arguments_for(self, n: int) -> dict:
+    """Tool arguments of the n-th call."""
+    return _substitute(self.arguments, str(n))
+
+  def missing_requirements(self) -> list[str]:
+    """Required modules that are not installed."""
+    return [module for module in self.requires if importlib.util.find_spec(module) is None]
+
+
+def _substitute(value, n: str):
+  if isinstance(value, str):
+    return value.replace('{n}', n)
+  if isinstance(value, dict):
+    return {k: _substitute(v, n) for k, v in value.items()}
+  if isinstance(value, list):
+    return [_substitute(v, n) for v in value]
+  return value
+
+
+SCENARIOS = [
+  Scenario(
+    'health',
+    'Baseline MCP round trip; the tool makes no Databricks calls',
+    tool='health',
+  ),
+  Scenario(
+    'list_warehouses',
+    'Warehouse listing served from the background-refreshed inventory',
+    tool='list_warehouses',
+  ),
+  Scenario(
+    'list_warehouses_refresh',
+    'Warehouse listing that calls the Warehouses API every time',
+    tool='list_warehouses',
+    arguments={'refresh': True},
+  ),
+  Scenario(
+    'list_dbfs_files',
+    'DBFS directory listing (get-status and list)',
+    tool='list_dbfs_files',
+    arguments={'path': '/benchmark'},
+  ),
+  Scenario(
+    'execute_dbsql',
+    'Small query, 100 rows inline, a distinct statement every call',
+    tool='execute_dbsql',
+    arguments={
+      'query': 'SELECT * FROM bench.small -- {n}',
+      'limit': 100,
+      'max_rows': 100,
+      'use_cache': False,
+    },
+  ),
+  Scenario(
+    'execute_dbsql_coalesced',
+    'The same small query from every client, concurrent calls share one execution',
+    tool='execute_dbsql',
+    arguments={
+      'query': 'SELECT * FROM bench.small',
+      'limit': 100,
+      'max_rows': 100,
+      'use_cache': False,
+    },
+  ),
+  Scenario(
+    'execute_dbsql_cached',
+    'The same small query answered from the query result cache',
+    tool='execute_dbsql',
+    arguments={'query': 'SELECT * FROM bench.small', 'limit': 100, 'max_rows': 100},
+  ),
+  Scenario(
+    'execute_dbsql_large',
+    '5,000-row limit over 2,000-row chunks, the first chunk converted to columnar',
+    tool='execute_dbsql',
+    arguments={
+      'query': 'SELECT * FROM bench.large -- {n}',
+      'limit': 5000,
+      'max_rows': 5000,
+      'result_format': 'columnar',
+      'use_cache': False,
+    },
+    workspace={'rows': 10000, 'chunk_rows': 2000},
+  ),
+  Scenario(
+    'execute_dbsql_arrow',
+    '10,000 rows as ARROW_STREAM external links in 2,000-row chunks',
+    tool='execute_dbsql',
+    arguments={
+      'query': 'SELECT * FROM bench.large -- {n}',
+      'limit': 10000,
+      'result_format': 'arrow',
+      'use_cache': False,
+    },
+    workspace={'rows': 10000, 'chunk_rows': 2000},
+    requires=('pyarrow',),
+  ),
+  Scenario(
+    'execute_dbsql_batch',
+    'Batch of four distinct small queries run concurrently',
+    tool='execute_dbsql_batch',
+    arguments={
+      'queries': [
+        {
+          'query': f'SELECT * FROM bench.t{i} -- {{n}}',
+          'limit': 50,
+          'max_rows': 50,
+          'use_cache': False,
+        }
+        for i in range(4)
+      ]
+    },
+  ),
+  Scenario(
+    'user_me',
+    'GET /api/user/me, a SCIM Me lookup behind the current-user cache',
+    route='/api/user/me',
+  ),
+]
+
+
+def get_scenario(name: str) -> Scenario:
+  """Return the scenario called name.
+
+  Raises:
+      KeyError: If there is no such scenario
+  """
+  for scenario in SCENARIOS:
+    if scenario.name == name:
+      return scenario
+  raise KeyError(f'Unknown scenario {name!r}, expected one of {[s.name for s in SCENARIOS]}')
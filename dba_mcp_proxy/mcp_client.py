@@ -14,42 +14,150 @@ Usage:
 """
 
 import argparse
+import gzip
 import json
+import os
+import random
 import subprocess
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlsplit
 
-import requests
+import httpx
 
 
-def validate_token(token, databricks_host):
-  """Validate if a specific token is still valid."""
-  try:
-    # Use a lightweight endpoint that just checks auth
-    response = requests.get(
-      f'{databricks_host}/api/2.0/preview/scim/v2/Me',
-      headers={'Authorization': f'Bearer {token}'},
-      timeout=5,
-    )
-    return response.status_code == 200
-  except Exception:
-    return False
+def _env_flag(name, default=False):
+  value = os.environ.get(name)
+  return default if value is None else value.lower() in ('1', 'true', 'yes')
+
+
+DEFAULT_MAX_CONCURRENCY = int(os.environ.get('DBA_MCP_PROXY_MAX_CONCURRENCY', 8))
+REPLY_WORKERS = 2  # Forward client responses to server requests, outside max_concurrency
+
+# Transport tuning
+DEFAULT_CONNECT_TIMEOUT = float(os.environ.get('DBA_MCP_PROXY_CONNECT_TIMEOUT', 10))
+DEFAULT_READ_TIMEOUT = float(os.environ.get('DBA_MCP_PROXY_READ_TIMEOUT', 600))
+DEFAULT_KEEPALIVE_SECONDS = float(os.environ.get('DBA_MCP_PROXY_KEEPALIVE_SECONDS', 60))
+REQUEST_COMPRESSION_MIN_BYTES = 1024
+
+DEFAULT_TOKEN_CACHE = os.environ.get(
+  'DBA_MCP_PROXY_TOKEN_CACHE', '~/.cache/dba-mcp-proxy/tokens.json'
+)
+DEFAULT_TOKEN_REFRESH_MARGIN = float(os.environ.get('DBA_MCP_PROXY_TOKEN_REFRESH_MARGIN', 300))
+TOKEN_EXPIRY_SKEW = 30  # Treat tokens this close to expiry as expired
+MIN_TOKEN_REFRESH_INTERVAL = 30
+UNKNOWN_TOKEN_LIFETIME = 900  # Assumed lifetime when the CLI reports no expiry
+
+DEFAULT_MAX_RETRIES = int(os.environ.get('DBA_MCP_PROXY_MAX_RETRIES', 4))
+RETRY_BASE_DELAY = 0.25
+RETRY_MAX_DELAY = 8.0
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('DBA_MCP_PROXY_CIRCUIT_THRESHOLD', 5))
+CIRCUIT_RESET_SECONDS = float(os.environ.get('DBA_MCP_PROXY_CIRCUIT_RESET_SECONDS', 30))
+
+DEFAULT_UPSTREAM_BATCH = _env_flag('DBA_MCP_PROXY_UPSTREAM_BATCH')
+DEFAULT_CACHE_TTL = float(os.environ.get('DBA_MCP_PROXY_CACHE_TTL', 300))
+
+# Tracing
+DEFAULT_TRACE_FILE = os.environ.get('DBA_MCP_PROXY_TRACE_FILE')
+DEFAULT_TOOL_TIMINGS = _env_flag('DBA_MCP_PROXY_TOOL_TIMINGS')
+
+# Cacheable methods and the list_changed group that invalidates them
+CACHEABLE_METHODS = {'tools/list': 'tools', 'prompts/list': 'prompts', 'prompts/get': 'prompts'}
+LIST_CHANGED_NOTIFICATIONS = {
+  'notifications/tools/list_changed': 'tools',
+  'notifications/prompts/list_changed': 'prompts',
+}
+
+# Methods that are safe to replay even if the server may already have processed them
+IDEMPOTENT_METHODS = frozenset(
+  {
+    'initialize',
+    'ping',
+    'tools/list',
+    'prompts/list',
+    'prompts/get',
+    'resources/list',
+    'resources/read',
+    'resources/templates/list',
+    'completion/complete',
+    'logging/setLevel',
+  }
+)
+
+
+def iter_sse_events(chunks):
+  """Yield the data of each server-sent event as it arrives on a streamed response.
+
+  Only the event being parsed is held in memory, never the whole body. Each
+  chunk is scanned for line breaks once, so a large event costs linear time
+  however many chunks it arrives in.
 
+  Args:
+      chunks: Iterable of decoded response body bytes, in arrival order
+  """
+  buffer = bytearray()
+  start = 0  # Start of the first line not yet parsed
+  data_lines = []
 
-def get_oauth_token(databricks_host):
-  """Get OAuth token from Databricks CLI, handling expired tokens automatically."""
+  def parse(line):
+    line = line.rstrip(b'\r').decode('utf-8')
+    if line.startswith('data:'):
+      value = line[5:]
+      data_lines.append(value[1:] if value.startswith(' ') else value)
+    # event:, id:, retry: and comment lines carry nothing the client needs
+
+  for chunk in chunks:
+    scan = len(buffer)
+    buffer += chunk
+    while (end := buffer.find(b'\n', scan)) != -1:
+      line = bytes(buffer[start:end])
+      start = scan = end + 1
+      if line.rstrip(b'\r'):
+        parse(line)
+      elif data_lines:
+        # A blank line ends the event, drop what has been parsed
+        yield '\n'.join(data_lines)
+        data_lines = []
+        del buffer[:start]
+        start = scan = 0
+    if start > len(buffer) // 2:
+      # Lines already parsed into data_lines are dead weight in a long event
+      del buffer[:start]
+      start = 0
+  if buffer[start:].strip():
+    parse(bytes(buffer[start:]))
+  if data_lines:
+    yield '\n'.join(data_lines)
+
+
+def _cli_token(databricks_host):
+  """Run `databricks auth token` and return the parsed token response."""
+  result = subprocess.run(
+    ['uvx', 'databricks', 'auth', 'token', '--host', databricks_host],
+    capture_output=True,
+    text=True,
+    check=True,
+  )
+  response = json.loads(result.stdout)
+  if not response.get('access_token'):
+    raise Exception('No access token in response')
+  return response
+
+
+def fetch_oauth_token(databricks_host):
+  """Get an OAuth token from Databricks CLI, handling expired tokens automatically.
+
+  Returns:
+      The CLI token response: access_token and, when reported, its expiry
+  """
   try:
     # First try to get token directly from Databricks CLI
-    result = subprocess.run(
-      ['uvx', 'databricks', 'auth', 'token', '--host', databricks_host],
-      capture_output=True,
-      text=True,
-      check=True,
-    )
-    token = json.loads(result.stdout).get('access_token')
-    if token:
-      return token
-    else:
-      raise Exception('No access token in response')
+    return _cli_token(databricks_host)
   except Exception:
     # Token might be expired or not exist, try OAuth login which handles token generation
     print(f'Getting fresh OAuth token for {databricks_host}...', file=sys.stderr)
@@ -63,26 +171,575 @@ def get_oauth_token(databricks_host):
       )
 
       # Get the token that was generated during login
-      result = subprocess.run(
-        ['uvx', 'databricks', 'auth', 'token', '--host', databricks_host],
-        capture_output=True,
-        text=True,
-        check=True,
-      )
-      token = json.loads(result.stdout).get('access_token')
-      if token:
-        print('OAuth authentication successful', file=sys.stderr)
-        return token
-      else:
-        raise Exception('No access token after login')
+      response = _cli_token(databricks_host)
+      print('OAuth authentication successful', file=sys.stderr)
+      return response
     except Exception as login_error:
       raise Exception(f'Failed to authenticate: {login_error}')
 
 
+def _parse_expiry(value):
+  """Convert the CLI's ISO 8601 expiry into epoch seconds, None if missing or invalid."""
+  if not value:
+    return None
+  try:
+    return datetime.fromisoformat(value).timestamp()
+  except ValueError:
+    return None
+
+
+class TokenManager:
+  """OAuth token for one workspace, cached on disk and refreshed ahead of expiry.
+
+  Tokens survive proxy restarts in a cache file only the current user can
+  read, so startup and reconnects do not spawn the CLI while the cached token
+  is still good. The token is trusted until its expiry without a validation
+  round trip; a background thread fetches a new one refresh_margin seconds
+  before it expires.
+  """
+
+  def __init__(
+    self,
+    databricks_host,
+    cache_path=DEFAULT_TOKEN_CACHE,
+    refresh_margin=DEFAULT_TOKEN_REFRESH_MARGIN,
+    fetch=fetch_oauth_token,
+  ):
+    """Create a token manager.
+
+    Args:
+        databricks_host: Workspace the token is for, also the cache key
+        cache_path: JSON file tokens are persisted in
+        refresh_margin: Seconds before expiry at which a new token is fetched
+        fetch: Returns a token response (access_token, expiry) for a host
+    """
+    self.databricks_host = databricks_host.rstrip('/')
+    self.cache_path = Path(cache_path).expanduser()
+    self.refresh_margin = refresh_margin
+    self._fetch = fetch
+    self._token = None
+    self._expires_at = 0.0
+    self._loaded = False
+    self._lock = threading.Lock()
+    self._refresh_lock = threading.Lock()
+    self._stop = threading.Event()
+    self._thread = None
+    self.disk_hits = 0
+    self.refreshes = 0
+
+  def get(self):
+    """Return a usable access token, fetching one only if there is none or it expired."""
+    with self._lock:
+      if not self._loaded:
+        self._load()
+      usable = self._token and time.time() < self._expires_at - TOKEN_EXPIRY_SKEW
+    if usable:
+      self.start()
+      return self._token
+    return self.refresh()
+
+  def refresh(self):
+    """Fetch a new token unless another thread already got one that is not expiring."""
+    with self._refresh_lock:
+      with self._lock:
+        if self._token and self._expires_at - time.time() > self.refresh_margin:
+          return self._token
+
+      response = self._fetch(self.databricks_host)
+      expires_at = _parse_expiry(response.get('expiry'))
+      with self._lock:
+        self._token = response['access_token']
+        self._expires_at = expires_at or time.time() + UNKNOWN_TOKEN_LIFETIME
+        self.refreshes += 1
+      self._save()
+    self.start()
+    return self._token
+
+  def invalidate(self):
+    """Forget the current token, e.g. after the server rejected it."""
+    with self._lock:
+      self._token = None
+      self._expires_at = 0.0
+
+  def _load(self):
+    """Load this host's token from the cache file (lock held)."""
+    self._loaded = True
+    try:
+      if self.cache_path.stat().st_mode & 0o077:
+        print(f'Ignoring token cache {self.cache_path}: readable by others', file=sys.stderr)
+        return
+      entry = self._read_entries().get(self.databricks_host)
+    except OSError:
+      return
+    if entry and entry.get('expires_at', 0) > time.time():
+      self._token = entry['access_token']
+      self._expires_at = entry['expires_at']
+      self.disk_hits += 1
+
+  def _read_entries(self):
+    """Return the cache file's well-formed entries by host; a corrupt file has none."""
+    try:
+      entries = json.loads(self.cache_path.read_text())
+    except ValueError:
+      return {}
+    if not isinstance(entries, dict):
+      return {}
+    return {
+      host: e
+      for host, e in entries.items()
+      if isinstance(e, dict)
+      and isinstance(e.get('access_token'), str)
+      and isinstance(e.get('expires_at'), (int, float))
+    }
+
+  def _save(self):
+    """Write this host's token to the cache file, readable only by the current user."""
+    try:
+      self.cache_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+      try:
+        entries = self._read_entries()
+      except OSError:
+        entries = {}
+      now = time.time()
+      entries = {host: e for host, e in entries.items() if e.get('expires_at', 0) > now}
+      with self._lock:
+        entries[self.databricks_host] = {
+          'access_token': self._token,
+          'expires_at': self._expires_at,
+        }
+
+      # Create with 0600 and swap in atomically so the token is never world-readable
+      tmp_path = self.cache_path.with_name(f'.{self.cache_path.name}.{os.getpid()}.tmp')
+      fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+      with os.fdopen(fd, 'w') as f:
+        json.dump(entries, f)
+      os.replace(tmp_path, self.cache_path)
+    except OSError as e:
+      print(f'Could not write token cache {self.cache_path}: {e}', file=sys.stderr)
+
+  def _refresh_loop(self):
+    while True:
+      with self._lock:
+        delay = self._expires_at - self.refresh_margin - time.time()
+      # Never spin if the CLI keeps handing back a token that is about to expire
+      if self._stop.wait(max(delay, MIN_TOKEN_REFRESH_INTERVAL)):
+        return
+      try:
+        self.refresh()
+      except Exception as e:
+        print(f'Background token refresh failed: {e}', file=sys.stderr)
+
+  def start(self):
+    """Start the background refresh thread if it is not running."""
+    if self._thread is not None and self._thread.is_alive():
+      return
+    with self._lock:
+      if self._thread is None or not self._thread.is_alive():
+        self._stop.clear()
+        self._thread = threading.Thread(
+          target=self._refresh_loop, name='token-refresh', daemon=True
+        )
+        self._thread.start()
+
+  def stop(self):
+    """Stop the background refresh thread."""
+    self._stop.set()
+
+
+class UpstreamError(Exception):
+  """The app answered with an HTTP error status."""
+
+  def __init__(self, status, body, retry_after=None):
+    super().__init__(f'HTTP {status}: {body[:100]}')
+    self.status = status
+    self.body = body
+    self.retry_after = retry_after
+
+
+def _never_sent(error):
+  """True if a request failed before reaching the server, so replaying it is always safe."""
+  return isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+
+
+class _RequestTimer:
+  """Collects connection phase timestamps from httpcore trace events."""
+
+  def __init__(self):
+    self.start = time.perf_counter()
+    self.marks = {}
+
+  def __call__(self, event_name, info):
+    # http11.* and http2.* events are recorded under the same phase names
+    self.marks[event_name.split('.', 1)[1]] = time.perf_counter()
+
+  def _span(self, start, end):
+    if start in self.marks and end in self.marks:
+      return round((self.marks[end] - self.marks[start]) * 1000, 1)
+    return None
+
+  def summary(self, response, sent_bytes):
+    """Return per-phase milliseconds; phases skipped on a reused connection are omitted."""
+    done = time.perf_counter()
+    headers_at = self.marks.get('receive_response_headers.complete', done)
+    phases = {
+      'connect': self._span('connect_tcp.started', 'connect_tcp.complete'),
+      'tls': self._span('start_tls.started', 'start_tls.complete'),
+      'ttfb': self._span('send_request_headers.started', 'receive_response_headers.complete'),
+      'transfer': round((done - headers_at) * 1000, 1),
+      'total': round((done - self.start) * 1000, 1),
+    }
+    return {
+      'status': response.status_code,
+      'http_version': response.http_version,
+      'encoding': response.headers.get('content-encoding', 'identity'),
+      'sent_bytes': sent_bytes,
+      'received_bytes': response.num_bytes_downloaded,
+      **{f'{k}_ms': v for k, v in phases.items() if v is not None},
+    }
+
+
+class _ProxySpan:
+  """One timed proxy operation; the root span collects its finished descendants."""
+
+  def __init__(self, name, parent=None, kind=1, **attributes):
+    self.name = name
+    self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+    self.span_id = os.urandom(8).hex()
+    self.parent_id = parent.span_id if parent else None
+    self.root = parent.root if parent else self
+    self.kind = kind
+    self.attributes = {k: v for k, v in attributes.items() if v is not None}
+    self.error = None
+    self.start_ns = time.time_ns()
+    self.end_ns = None
+    if parent is None:
+      self.finished = []
+
+  @property
+  def traceparent(self):
+    """W3C traceparent header naming this span as the parent."""
+    return f'00-{self.trace_id}-{self.span_id}-01'
+
+  def to_otlp(self):
+    """Return the span in OTLP/JSON form."""
+    span = {
+      'traceId': self.trace_id,
+      'spanId': self.span_id,
+      'name': self.name,
+      'kind': self.kind,
+      'startTimeUnixNano': str(self.start_ns),
+      'endTimeUnixNano': str(self.end_ns),
+      'attributes': [
+        {'key': k, 'value': {'stringValue': str(v)}} for k, v in self.attributes.items()
+      ],
+      'status': {'code': 2, 'message': self.error} if self.error else {'code': 1},
+    }
+    if self.parent_id:
+      span['parentSpanId'] = self.parent_id
+    return span
+
+
+class ProxyTracer:
+  """W3C trace context for upstream requests, with optional span export.
+
+  Every HTTP request to the app carries a traceparent header, so the app's
+  spans nest under the proxy's. With trace_file set, the proxy's own spans
+  (each forwarded request, token fetches, the handshake and every HTTP
+  attempt) are appended to it as OTLP/JSON lines, the format the app's file
+  exporter writes, so both files can be loaded into one trace view.
+  """
+
+  def __init__(self, trace_file=None):
+    self.trace_file = os.path.expanduser(trace_file) if trace_file else None
+    self._local = threading.local()
+    self._lock = threading.Lock()
+
+  @contextmanager
+  def span(self, name, kind=1, **attributes):
+    """Time a block as a child of this thread's current span, or as a new trace."""
+    stack = self._local.__dict__.setdefault('stack', [])
+    span = _ProxySpan(name, stack[-1] if stack else None, kind, **attributes)
+    stack.append(span)
+    try:
+      yield span
+    except Exception as e:
+      span.error = str(e)
+      raise
+    finally:
+      stack.pop()
+      span.end_ns = time.time_ns()
+      span.root.finished.append(span)
+      if span.root is span and self.trace_file:
+        self._export(span.finished)
+
+  def _export(self, spans):
+    payload = {
+      'resourceSpans': [
+        {
+          'resource': {
+            'attributes': [{'key': 'service.name', 'value': {'stringValue': 'dba-mcp-proxy'}}]
+          },
+          'scopeSpans': [
+            {'scope': {'name': 'dba-mcp-proxy'}, 'spans': [s.to_otlp() for s in spans]}
+          ],
+        }
+      ]
+    }
+    try:
+      with self._lock, open(self.trace_file, 'a') as f:
+        f.write(json.dumps(payload, separators=(',', ':')) + '\n')
+    except OSError as e:
+      print(f'Failed to write trace: {e}', file=sys.stderr)
+
+
+class HttpTransport:
+  """HTTP client for the app with HTTP/2, compression and pooled keep-alive connections.
+
+  HTTP/2 is used when the optional h2 package is installed, so concurrent
+  requests multiplex over one TLS connection. Responses are accepted gzip
+  (and br when brotli is installed) encoded, and request bodies can be
+  gzipped too. With log_timings each request logs its connect, TLS, time to
+  first byte and transfer times to stderr; name resolution is counted in
+  connect, since httpcore resolves and connects in one step.
+  """
+
+  def __init__(
+    self,
+    max_connections,
+    http2=None,
+    connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+    read_timeout=DEFAULT_READ_TIMEOUT,
+    keepalive_seconds=DEFAULT_KEEPALIVE_SECONDS,
+    compress_requests=False,
+    log_timings=False,
+  ):
+    """Create a transport.
+
+    Args:
+        max_connections: Connection pool size
+        http2: Use HTTP/2, None to enable it when h2 is installed
+        connect_timeout: Seconds to establish a connection
+        read_timeout: Seconds to wait between bytes of a response
+        keepalive_seconds: Seconds an idle connection is kept open
+        compress_requests: Gzip request bodies of 1 KB or more
+        log_timings: Log per-request phase timings to stderr
+    """
+    if http2 is None:
+      try:
+        import h2  # noqa: F401
+
+        http2 = True
+      except ImportError:
+        http2 = False
+    self.http2 = http2
+    self.compress_requests = compress_requests
+    self.log_timings = log_timings
+    self.client = httpx.Client(
+      http2=http2,
+      limits=httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_connections,
+        keepalive_expiry=keepalive_seconds,
+      ),
+      timeout=httpx.Timeout(connect_timeout, read=read_timeout, write=30.0, pool=30.0),
+    )
+
+  def get(self, url, headers):
+    """Send a GET and return the full response."""
+    return self.client.get(url, headers=headers)
+
+  @contextmanager
+  def post(self, url, headers, payload):
+    """POST a JSON payload and yield the streaming response."""
+    body = json.dumps(payload).encode()
+    headers = {**headers, 'Content-Type': 'application/json'}
+    if self.compress_requests and len(body) >= REQUEST_COMPRESSION_MIN_BYTES:
+      body = gzip.compress(body, compresslevel=5)
+      headers['Content-Encoding'] = 'gzip'
+
+    timer = _RequestTimer() if self.log_timings else None
+    extensions = {'trace': timer} if timer else {}
+    with self.client.stream(
+      'POST', url, content=body, headers=headers, extensions=extensions
+    ) as response:
+      try:
+        yield response
+      finally:
+        if timer:
+          timing = timer.summary(response, len(body))
+          print(f'POST {urlsplit(url).path} {json.dumps(timing)}', file=sys.stderr)
+
+  def close(self):
+    """Close pooled connections."""
+    self.client.close()
+
+
+class CircuitBreaker:
+  """Fails fast while the app is down instead of piling retries onto it.
+
+  Opens after failure_threshold consecutive failures; after reset_timeout
+  seconds one probe request is let through, and its outcome closes or
+  re-opens the circuit.
+  """
+
+  def __init__(
+    self, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_timeout=CIRCUIT_RESET_SECONDS
+  ):
+    self.failure_threshold = max(1, failure_threshold)
+    self.reset_timeout = reset_timeout
+    self._failures = 0
+    self._opened_at = None
+    self._probing = False
+    self._lock = threading.Lock()
+    self.trips = 0
+
+  def allow(self):
+    """Return True if a request may be sent now."""
+    with self._lock:
+      if self._opened_at is None:
+        return True
+      if not self._probing and time.monotonic() - self._opened_at >= self.reset_timeout:
+        self._probing = True
+        return True
+      return False
+
+  def retry_after(self):
+    """Seconds until the next probe is allowed."""
+    with self._lock:
+      if self._opened_at is None:
+        return 0.0
+      return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+  def record_success(self):
+    """Close the circuit after a request reached a responsive server."""
+    with self._lock:
+      self._failures = 0
+      self._opened_at = None
+      self._probing = False
+
+  def record_failure(self):
+    """Count a failure, opening the circuit at the threshold or after a failed probe."""
+    with self._lock:
+      self._failures += 1
+      if self._probing or (self._opened_at is None and self._failures >= self.failure_threshold):
+        self._opened_at = time.monotonic()
+        self._probing = False
+        self.trips += 1
+
+  @property
+  def state(self):
+    """Current circuit state: closed, open or half-open."""
+    with self._lock:
+      if self._opened_at is None:
+        return 'closed'
+      return 'half-open' if self._probing else 'open'
+
+
+class ResponseCache:
+  """TTL cache of results for idempotent MCP methods, invalidated by list_changed.
+
+  Clients that re-list tools and prompts every turn are answered locally
+  instead of paying an authenticated round trip to the app.
+  """
+
+  def __init__(self, ttl=DEFAULT_CACHE_TTL):
+    """Create a cache; a ttl of 0 disables it."""
+    self.ttl = ttl
+    self._entries = {}  # (method, params) -> (expires_at, group, result)
+    self._generation = 0
+    self._lock = threading.Lock()
+    self.hits = 0
+    self.misses = 0
+
+  @staticmethod
+  def _key(request_data):
+    method = request_data.get('method')
+    if method not in CACHEABLE_METHODS:
+      return None
+    params = {k: v for k, v in (request_data.get('params') or {}).items() if k != '_meta'}
+    return method, json.dumps(params, sort_keys=True)
+
+  def get(self, request_data):
+    """Return a cached response for the request, re-addressed to its id, or None."""
+    key = self._key(request_data)
+    if key is None or self.ttl <= 0:
+      return None
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None or entry[0] < time.monotonic():
+        self.misses += 1
+        return None
+      self.hits += 1
+    return {'jsonrpc': '2.0', 'id': request_data.get('id'), 'result': entry[2]}
+
+  def generation(self):
+    """Invalidation counter, lets callers skip storing results fetched before a change."""
+    return self._generation
+
+  def put(self, request_data, response, generation):
+    """Store a successful response unless the cache was invalidated since generation."""
+    key = self._key(request_data)
+    if key is None or self.ttl <= 0 or 'result' not in (response or {}):
+      return
+    with self._lock:
+      if generation == self._generation:
+        expires_at = time.monotonic() + self.ttl
+        self._entries[key] = (expires_at, CACHEABLE_METHODS[key[0]], response['result'])
+
+  def invalidate(self, group=None):
+    """Drop cached results for a group ('tools', 'prompts'), or everything."""
+    with self._lock:
+      self._generation += 1
+      if group is None:
+        self._entries.clear()
+      else:
+        self._entries = {k: e for k, e in self._entries.items() if e[1] != group}
+
+  def stats(self):
+    """Return hit/miss counters and the number of cached results."""
+    with self._lock:
+      return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+def _is_response(message):
+  """Whether a message is a JSON-RPC response, e.g. the client's reply to a server request."""
+  return 'method' not in message and ('result' in message or 'error' in message)
+
+
+def _expects_response(message):
+  """Whether the server answers a message: requests do, notifications and responses do not."""
+  return 'id' in message and not _is_response(message)
+
+
+def _request_ids(payload):
+  """IDs of the requests in a message or batch, notifications and responses have none."""
+  messages = payload if isinstance(payload, list) else [payload]
+  return [message['id'] for message in messages if _expects_response(message)]
+
+
+def _error_response(request_id, code, message):
+  return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': code, 'message': message}}
+
+
+def _error_code(error):
+  return error.status if isinstance(error, UpstreamError) else -32000
+
+
 class MCPProxy:
   """Pure MCP Protocol Proxy."""
 
-  def __init__(self, databricks_host, url):
+  def __init__(
+    self,
+    databricks_host,
+    url,
+    max_concurrency=DEFAULT_MAX_CONCURRENCY,
+    max_retries=DEFAULT_MAX_RETRIES,
+    cache_ttl=DEFAULT_CACHE_TTL,
+    transport=None,
+    upstream_batch=DEFAULT_UPSTREAM_BATCH,
+    tracer=None,
+    tool_timings=DEFAULT_TOOL_TIMINGS,
+  ):
     if not url:
       raise ValueError('URL argument is required')
 
@@ -99,32 +756,67 @@ class MCPProxy:
 
     self.session_id = None
     self.initialized = False
-    self.session = requests.Session()
     self.is_local = self.app_url.startswith('http://localhost')
-    self._oauth_token = None  # Cache the OAuth token
+    self.tokens = None if self.is_local else TokenManager(databricks_host)
+
+    # Requests are proxied concurrently, keep one pooled connection per worker
+    self.max_concurrency = max(1, max_concurrency)
+    self.http = transport or HttpTransport(max_connections=self.max_concurrency + REPLY_WORKERS)
+    self.upstream_batch = upstream_batch
+    # Batch members fan out here, not on the stdin workers, so batches cannot deadlock them
+    self._fanout = ThreadPoolExecutor(
+      max_workers=self.max_concurrency, thread_name_prefix='mcp-proxy-batch'
+    )
+    self._init_lock = threading.Lock()
+    self._write_lock = threading.Lock()
+
+    self.cache = ResponseCache(cache_ttl)
+    self.tracer = tracer or ProxyTracer(DEFAULT_TRACE_FILE)
+    self.tool_timings = tool_timings
+
+    # Session recovery and retries
+    self.max_retries = max(0, max_retries)
+    self.breaker = CircuitBreaker()
+    self._stats_lock = threading.Lock()
+    self._recovery = {
+      'retries': 0,
+      'session_renewals': 0,
+      'token_renewals': 0,
+      'recovered': 0,
+      'failed': 0,
+      'recovery_ms_total': 0.0,
+      'recovery_ms_max': 0.0,
+    }
+
+  def _token(self):
+    """Return the bearer token for the app, cached and refreshed by the token manager."""
+    if self.tokens is None:
+      return 'local-test-token'
+    with self.tracer.span('proxy token'):
+      return self.tokens.get()
 
   def _initialize_session(self):
     """Initialize MCP session with proper handshake."""
     if self.initialized:
       return
 
-    # Get appropriate token based on environment
-    if self.is_local:
-      self._oauth_token = 'local-test-token'
-    else:
-      # Check if we have a valid cached token
-      if not self._oauth_token or not validate_token(self._oauth_token, self.databricks_host):
-        self._oauth_token = get_oauth_token(self.databricks_host)
-    oauth_token = self._oauth_token
+    with self._init_lock:
+      # Another worker may have finished the handshake while we waited
+      if not self.initialized:
+        with self.tracer.span('proxy handshake'):
+          self._handshake()
+
+  def _handshake(self):
+    """Authenticate and run the MCP initialize handshake."""
+    oauth_token = self._token()
 
     headers = {
       'Authorization': f'Bearer {oauth_token}',
-      'Content-Type': 'application/json',
       'Accept': 'application/json, text/event-stream',
     }
 
     # Get session ID
-    response = self.session.get(self.app_url, headers=headers)
+    response = self.http.get(self.app_url, headers=headers)
     self.session_id = response.headers.get('mcp-session-id')
 
     if self.session_id:
@@ -142,64 +834,355 @@ class MCPProxy:
       },
     }
 
-    self.session.post(self.app_url, headers=headers, json=init_request)
+    with self.http.post(self.app_url, headers, init_request) as response:
+      response.read()
+      if response.status_code >= 400:
+        raise UpstreamError(response.status_code, response.text)
+      self.session_id = response.headers.get('mcp-session-id', self.session_id)
+    if self.session_id:
+      headers['mcp-session-id'] = self.session_id
 
     # Send initialized notification
     initialized_request = {'jsonrpc': '2.0', 'method': 'notifications/initialized'}
 
-    self.session.post(self.app_url, headers=headers, json=initialized_request)
+    with self.http.post(self.app_url, headers, initialized_request) as response:
+      response.read()
     self.initialized = True
 
+  def _reset_session(self, stale_session_id):
+    """Drop a session the server no longer accepts so the next request re-handshakes."""
+    with self._init_lock:
+      # Only the first worker to notice resets it, others reuse the new session
+      if self.session_id == stale_session_id:
+        self.initialized = False
+        self.session_id = None
+        # A restarted app may be a new deployment with different tools and prompts
+        self.cache.invalidate()
+
+  def _send(self, payload):
+    """POST a message or batch and return the JSON-RPC responses it produced.
+
+    Raises:
+        UpstreamError: If the app answers with an HTTP error status
+    """
+    headers = {
+      'Authorization': f'Bearer {self._token()}',
+      'Accept': 'application/json, text/event-stream',
+    }
+
+    if self.session_id:
+      headers['mcp-session-id'] = self.session_id
+    if self.tool_timings:
+      headers['X-MCP-Timings'] = '1'
+
+    with (
+      self.tracer.span('proxy http', kind=3) as span,
+      self.http.post(
+        self.app_url, {**headers, 'traceparent': span.traceparent}, payload
+      ) as response,
+    ):
+      span.attributes['http.status_code'] = response.status_code
+      if response.status_code >= 400:
+        response.read()
+        retry_after = response.headers.get('retry-after')
+        raise UpstreamError(
+          response.status_code,
+          response.text,
+          float(retry_after) if retry_after and retry_after.isdigit() else None,
+        )
+
+      # Notifications and client responses get no JSON-RPC response, only a 202
+      request_ids = _request_ids(payload)
+      if not request_ids:
+        return []
+
+      if response.headers.get('content-type', '').startswith('text/event-stream'):
+        return self._relay_stream(response, request_ids)
+      response.read()
+      body = response.json()
+      return body if isinstance(body, list) else [body]
+
+  def _plan_retry(self, error, stale_session_id, idempotent, sent):
+    """Decide how to recover from a failed attempt.
+
+    Returns:
+        (retry, delay_hint): delay_hint is 0 to retry at once, None to back off
+    """
+    if isinstance(error, UpstreamError):
+      status = error.status
+      if status in (401, 403):
+        # Token rejected: nothing ran, get a new token and session
+        if self.tokens is not None:
+          self.tokens.invalidate()
+        self._reset_session(stale_session_id)
+        self._count('token_renewals')
+        return True, 0
+      if status == 404 or (status == 400 and 'session' in error.body.lower()):
+        # Session expired or server restarted: nothing ran, re-handshake
+        self._reset_session(stale_session_id)
+        self._count('session_renewals')
+        return True, 0
+      if status in (429, 503):
+        # Server shed the request before running it
+        return True, error.retry_after
+      if status >= 500:
+        self.breaker.record_failure()
+        return idempotent or not sent, None
+      return False, None
+
+    if isinstance(error, (httpx.HTTPError, httpx.StreamError, OSError)):
+      self.breaker.record_failure()
+      return idempotent or not sent or _never_sent(error), None
+    return False, None
+
+  def _count(self, key, value=1):
+    with self._stats_lock:
+      self._recovery[key] += value
+
+  def _exchange(self, payload, idempotent):
+    """Send a message or batch upstream, recovering the session and retrying as needed.
+
+    Expired sessions and rejected tokens are recovered by re-running the
+    handshake and replaying the request. Other failures are retried with
+    exponential backoff and jitter, but a request the server may already have
+    run is only replayed when idempotent, so a tools/call never runs twice.
+    While the circuit breaker is open requests fail fast.
+
+    Returns:
+        The JSON-RPC responses received
+
+    Raises:
+        Exception: The last failure, once retries are exhausted or not allowed
+    """
+    first_failure = None
+    attempts = 0
+
+    while True:
+      attempts += 1
+      stale_session_id = self.session_id
+      sent = False
+
+      if not self.breaker.allow():
+        error = Exception(
+          f'Server unavailable (circuit open), retry in {self.breaker.retry_after():.0f}s'
+        )
+        break
+
+      try:
+        self._initialize_session()
+        sent = True
+        responses = self._send(payload)
+      except Exception as e:
+        error = e
+      else:
+        self.breaker.record_success()
+        if first_failure is not None:
+          self._record_recovery(first_failure, attempts)
+        return responses
+
+      if first_failure is None:
+        first_failure = time.monotonic()
+      if isinstance(error, UpstreamError) and error.status < 500:
+        # The server is up and answering, even if it rejected this request
+        self.breaker.record_success()
+
+      retry, delay = self._plan_retry(error, stale_session_id, idempotent, sent)
+      if not retry or attempts > self.max_retries:
+        break
+      if delay is None:
+        # Full jitter keeps reconnecting clients from retrying in lockstep
+        delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempts - 1)))
+      self._count('retries')
+      time.sleep(delay)
+
+    if attempts > 1:
+      self._count('failed')
+    raise error
+
   def proxy_request(self, request_data):
-    """Proxy an MCP request to the remote server."""
-    try:
-      # Initialize session if needed
-      self._initialize_session()
+    """Proxy an MCP request to the remote server.
 
-      # Use cached token
-      oauth_token = self._oauth_token
+    Returns:
+        The JSON-RPC response, or None for notifications
+    """
+    cached = self.cache.get(request_data)
+    if cached is not None:
+      return cached
+    return self._forward(request_data, self.cache.generation())
 
-      headers = {
-        'Authorization': f'Bearer {oauth_token}',
-        'Content-Type': 'application/json',
-        'Accept': 'application/json, text/event-stream',
-      }
+  def _forward(self, request_data, generation):
+    """Send one request upstream, caching the response if the method allows it."""
+    method = request_data.get('method')
+    expects_response = _expects_response(request_data)
+    try:
+      with self.tracer.span(f'proxy {method or "response"}', **{'mcp.method': method}):
+        responses = self._exchange(request_data, method in IDEMPOTENT_METHODS)
+    except Exception as e:
+      if not expects_response:
+        print(f'Failed to forward {method or "response"}: {e}', file=sys.stderr)
+        return None
+      return _error_response(request_data.get('id'), _error_code(e), str(e))
 
-      if self.session_id:
-        headers['mcp-session-id'] = self.session_id
+    if not expects_response:
+      return None
+    response = responses[0]
+    self.cache.put(request_data, response, generation)
+    return response
 
-      response = self.session.post(self.app_url, headers=headers, json=request_data)
+  def proxy_batch(self, batch):
+    """Proxy a JSON-RPC batch.
 
-      if response.status_code == 200:
-        # Handle SSE response
-        if 'event: message' in response.text:
-          for line in response.text.split('\n'):
-            if line.startswith('data: '):
-              try:
-                return json.loads(line[6:])
-              except json.JSONDecodeError:
-                continue
-        else:
-          return response.json()
+    Cached results are answered locally. With upstream_batch the rest go to
+    the app as one array in a single HTTP request; otherwise, since the MCP
+    Python SDK server rejects arrays, they fan out as concurrent requests.
 
-      return {
-        'jsonrpc': '2.0',
-        'id': request_data.get('id'),
-        'error': {
-          'code': response.status_code,
-          'message': f'HTTP {response.status_code}: {response.text[:100]}',
-        },
-      }
+    Returns:
+        Responses for the batch's requests in request order, empty if it held
+        only notifications
+    """
+    generation = self.cache.generation()
+    responses = [None] * len(batch)
+    pending = []
+    for index, message in enumerate(batch):
+      if not isinstance(message, dict):
+        responses[index] = _error_response(None, -32600, 'Invalid Request')
+        continue
+      responses[index] = self.cache.get(message)
+      if responses[index] is None:
+        pending.append(index)
+
+    messages = [batch[i] for i in pending]
+    if self.upstream_batch and len(messages) > 1:
+      results = self._forward_batch(messages, generation)
+    else:
+      results = self._fanout.map(lambda message: self._forward(message, generation), messages)
+    for index, result in zip(pending, results):
+      responses[index] = result
+    return [response for response in responses if response is not None]
 
+  def _forward_batch(self, messages, generation):
+    """Send messages upstream as one batch, returning a response (or None) per message."""
+    idempotent = all(m.get('method') in IDEMPOTENT_METHODS for m in messages)
+    try:
+      with self.tracer.span('proxy batch', **{'mcp.batch_size': len(messages)}):
+        by_id = {r.get('id'): r for r in self._exchange(messages, idempotent)}
     except Exception as e:
-      return {
-        'jsonrpc': '2.0',
-        'id': request_data.get('id'),
-        'error': {'code': -32000, 'message': str(e)},
-      }
+      print(f'Failed to forward batch: {e}', file=sys.stderr)
+      code = _error_code(e)
+      return [
+        _error_response(m['id'], code, str(e)) if _expects_response(m) else None for m in messages
+      ]
+
+    results = []
+    for message in messages:
+      if not _expects_response(message):
+        results.append(None)
+        continue
+      response = by_id.get(message['id'])
+      if response is None:
+        response = _error_response(message['id'], -32000, 'No response to request in batch')
+      self.cache.put(message, response, generation)
+      results.append(response)
+    return results
+
+  def _record_recovery(self, first_failure, attempts):
+    elapsed_ms = (time.monotonic() - first_failure) * 1000
+    with self._stats_lock:
+      stats = self._recovery
+      stats['recovered'] += 1
+      stats['recovery_ms_total'] += elapsed_ms
+      stats['recovery_ms_max'] = max(stats['recovery_ms_max'], elapsed_ms)
+      recovered = stats['recovered']
+    print(
+      f'Recovered after {attempts} attempts in {elapsed_ms:.0f} ms (recoveries: {recovered})',
+      file=sys.stderr,
+    )
+
+  def stats(self):
+    """Return retry, session recovery and circuit breaker counters."""
+    with self._stats_lock:
+      stats = dict(self._recovery)
+    recovered = stats.pop('recovery_ms_total')
+    stats['recovery_ms_avg'] = (
+      round(recovered / stats['recovered'], 1) if stats['recovered'] else 0.0
+    )
+    stats['recovery_ms_max'] = round(stats['recovery_ms_max'], 1)
+    stats['circuit'] = self.breaker.state
+    stats['circuit_trips'] = self.breaker.trips
+    stats['cache'] = self.cache.stats()
+    return stats
+
+  def _relay_stream(self, response, request_ids):
+    """Forward server messages from an SSE stream and return the responses to request_ids.
+
+    Progress and log notifications (and any other server messages) are written
+    to stdout as soon as their event is parsed, ahead of the final responses.
+    """
+    pending = set(request_ids)
+    responses = []
+    for data in iter_sse_events(response.iter_bytes()):
+      try:
+        message = json.loads(data)
+      except json.JSONDecodeError:
+        print(f'Skipping malformed event: {data[:100]}', file=sys.stderr)
+        continue
+      if _is_response(message) and message.get('id') in pending:
+        pending.discard(message['id'])
+        responses.append(message)
+        if not pending:
+          return responses
+        continue
+      group = LIST_CHANGED_NOTIFICATIONS.get(message.get('method'))
+      if group is not None:
+        self.cache.invalidate(group)
+      self._write(message)
+
+    responses.extend(
+      _error_response(request_id, -32000, 'Stream ended before a response was received')
+      for request_id in request_ids
+      if request_id in pending
+    )
+    return responses
+
+  def _write(self, message):
+    """Write one JSON-RPC message to stdout as a single, uninterleaved line."""
+    line = json.dumps(message)
+    with self._write_lock:
+      print(line, flush=True)
+
+  def _handle(self, request, slots):
+    """Proxy one request or batch on a worker thread and write its response.
+
+    slots is released when done, None for client responses that hold no slot.
+    """
+    try:
+      if isinstance(request, list):
+        # A batch gets one array reply, or none if it held only notifications
+        response = self.proxy_batch(request) or None
+      else:
+        response = self.proxy_request(request)
+      if response is not None:
+        self._write(response)
+    finally:
+      if slots is not None:
+        slots.release()
 
   def run(self):
-    """Run the MCP proxy server using stdio transport."""
+    """Run the MCP proxy server using stdio transport.
+
+    Requests are proxied concurrently on a worker pool, so a slow tool call
+    does not hold up other requests; responses are written as they complete
+    and matched to requests by their JSON-RPC id. At most max_concurrency
+    requests are in flight, after which reading stdin pauses.
+
+    Client responses to server requests (roots/list, sampling) skip that
+    limit, on their own workers and connections: the tool calls holding
+    every slot may be waiting on exactly those responses.
+    """
+    slots = threading.BoundedSemaphore(self.max_concurrency)
+    executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='mcp-proxy')
+    replies = ThreadPoolExecutor(max_workers=REPLY_WORKERS, thread_name_prefix='mcp-proxy-reply')
+
     # Main loop - read from stdin, proxy to remote, write to stdout
     try:
       for line in sys.stdin:
@@ -209,15 +1192,26 @@ class MCPProxy:
 
         try:
           request = json.loads(line)
-          response = self.proxy_request(request)
-          print(json.dumps(response), flush=True)
         except json.JSONDecodeError:
           error_response = {
             'jsonrpc': '2.0',
             'id': None,
             'error': {'code': -32700, 'message': 'Parse error'},
           }
-          print(json.dumps(error_response), flush=True)
+          self._write(error_response)
+          continue
+
+        if not isinstance(request, (dict, list)) or request == []:
+          self._write(_error_response(None, -32600, 'Invalid Request'))
+          continue
+
+        messages = request if isinstance(request, list) else [request]
+        if all(isinstance(m, dict) and _is_response(m) for m in messages):
+          replies.submit(self._handle, request, None)
+          continue
+
+        slots.acquire()
+        executor.submit(self._handle, request, slots)
 
     except KeyboardInterrupt:
       pass
@@ -227,7 +1221,16 @@ class MCPProxy:
         'id': None,
         'error': {'code': -32000, 'message': f'Proxy error: {e}'},
       }
-      print(json.dumps(error_response), flush=True)
+      self._write(error_response)
+    finally:
+      # Let in-flight requests finish and write their responses
+      executor.shutdown(wait=True)
+      replies.shutdown(wait=True)
+      self._fanout.shutdown(wait=True)
+      self.http.close()
+      stats = self.stats()
+      if stats['retries'] or stats['failed']:
+        print(f'Proxy recovery stats: {json.dumps(stats)}', file=sys.stderr)
 
 
 def main():
@@ -257,10 +1260,104 @@ Examples:
     help='The Databricks App URL (e.g., https://myapp.databricksapps.com)',
   )
 
+  parser.add_argument(
+    '--max-retries',
+    type=int,
+    default=DEFAULT_MAX_RETRIES,
+    help=f'Retries after session loss or transient errors (default: {DEFAULT_MAX_RETRIES})',
+  )
+
+  parser.add_argument(
+    '--cache-ttl',
+    type=float,
+    default=DEFAULT_CACHE_TTL,
+    help=f'Seconds to cache tool and prompt listings, 0 disables (default: {DEFAULT_CACHE_TTL:g})',
+  )
+
+  parser.add_argument(
+    '--max-concurrency',
+    type=int,
+    default=DEFAULT_MAX_CONCURRENCY,
+    help=f'Maximum requests proxied at once (default: {DEFAULT_MAX_CONCURRENCY})',
+  )
+
+  parser.add_argument(
+    '--upstream-batch',
+    action='store_true',
+    default=DEFAULT_UPSTREAM_BATCH,
+    help='Send JSON-RPC batches to the app as one request (the server must accept arrays)',
+  )
+
+  parser.add_argument(
+    '--http2',
+    action=argparse.BooleanOptionalAction,
+    default=None,
+    help='Use HTTP/2 (default: when the h2 package is installed)',
+  )
+
+  parser.add_argument(
+    '--compress-requests',
+    action='store_true',
+    default=_env_flag('DBA_MCP_PROXY_COMPRESS_REQUESTS'),
+    help='Gzip request bodies of 1 KB or more',
+  )
+
+  parser.add_argument(
+    '--connect-timeout',
+    type=float,
+    default=DEFAULT_CONNECT_TIMEOUT,
+    help=f'Seconds to establish a connection (default: {DEFAULT_CONNECT_TIMEOUT:g})',
+  )
+
+  parser.add_argument(
+    '--read-timeout',
+    type=float,
+    default=DEFAULT_READ_TIMEOUT,
+    help=f'Seconds to wait between bytes of a response (default: {DEFAULT_READ_TIMEOUT:g})',
+  )
+
+  parser.add_argument(
+    '--log-timings',
+    action='store_true',
+    default=_env_flag('DBA_MCP_PROXY_LOG_TIMINGS'),
+    help='Log connect, TLS, time to first byte and transfer time of each request to stderr',
+  )
+
+  parser.add_argument(
+    '--trace-file',
+    default=DEFAULT_TRACE_FILE,
+    help='Append proxy spans to this file as OTLP/JSON lines (app spans share the trace ids)',
+  )
+
+  parser.add_argument(
+    '--tool-timings',
+    action='store_true',
+    default=DEFAULT_TOOL_TIMINGS,
+    help='Ask the app to add a per-span timing breakdown to tool results',
+  )
+
   args = parser.parse_args()
 
   try:
-    proxy = MCPProxy(args.databricks_host, args.databricks_app_url)
+    transport = HttpTransport(
+      max_connections=max(1, args.max_concurrency) + REPLY_WORKERS,
+      http2=args.http2,
+      connect_timeout=args.connect_timeout,
+      read_timeout=args.read_timeout,
+      compress_requests=args.compress_requests,
+      log_timings=args.log_timings,
+    )
+    proxy = MCPProxy(
+      args.databricks_host,
+      args.databricks_app_url,
+      args.max_concurrency,
+      args.max_retries,
+      args.cache_ttl,
+      transport,
+      args.upstream_batch,
+      ProxyTracer(args.trace_file),
+      args.tool_timings,
+    )
     print(f'Connected to MCP server at: {proxy.app_url}', file=sys.stderr)
     proxy.run()
   except Exception as e:
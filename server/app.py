@@ -1,17 +1,29 @@
 """FastAPI application for Databricks App Template."""
 
+import asyncio
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 import yaml
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastmcp import FastMCP
 
+from server.compression import StreamCompressionMiddleware
+from server.instrumentation import (
+  RouteMetricsMiddleware,
+  ToolMetricsMiddleware,
+  TracingMiddleware,
+)
 from server.prompts import load_prompts
 from server.routers import router
-from server.tools import load_tools
+from server.serialization import tool_serializer
+from server.services.discovery import DiscoveryCache
+from server.services.prompt_registry import get_prompt_registry
+from server.tools import load_tools, start_warehouse_warmer
 
 
 # Load environment variables from .env.local if it exists
@@ -46,24 +58,45 @@ config = load_config()
 servername = config.get('servername', 'databricks-mcp')
 
 # Create MCP server
-mcp_server = FastMCP(name=servername)
+mcp_server = FastMCP(name=servername, tool_serializer=tool_serializer)
 
 # Load prompts and tools
-load_prompts(mcp_server)
+prompt_notifier = load_prompts(mcp_server)
 load_tools(mcp_server)
+mcp_server.add_middleware(TracingMiddleware())
+mcp_server.add_middleware(ToolMetricsMiddleware())
 
 # Create ASGI app from MCP server
 # Note: Setting path='/' here to avoid /mcp/mcp double path
 mcp_asgi_app = mcp_server.http_app(path='/')
 
-# Pass the MCP app's lifespan to FastAPI
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+  """Run the MCP app's lifespan and the warehouse warm-up scheduler with the app.
+
+  Prompt changes are applied on the event loop serving requests from here on.
+  """
+  warmer = start_warehouse_warmer()
+  prompt_notifier.bind(asyncio.get_running_loop())
+  try:
+    async with mcp_asgi_app.lifespan(app):
+      yield
+  finally:
+    warmer.stop()
+
+
 app = FastAPI(
   title='Databricks App API',
   description='Modern FastAPI application template for Databricks Apps with React frontend',
   version='0.1.0',
-  lifespan=mcp_asgi_app.lifespan,
+  lifespan=lifespan,
 )
 
+# Shared with the routers, which must not import this module back
+app.state.servername = servername
+app.state.discovery_cache = DiscoveryCache(mcp_server, servername, get_prompt_registry())
+
 app.add_middleware(
   CORSMiddleware,
   allow_origins=[
@@ -77,10 +110,17 @@ app.add_middleware(
   allow_headers=['*'],
 )
 
+# Compress large responses, including MCP event streams, and accept gzipped requests
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+app.add_middleware(StreamCompressionMiddleware)
+
+# Outermost, so latency covers compression and every other middleware
+app.add_middleware(RouteMetricsMiddleware)
+
 app.include_router(router, prefix='/api', tags=['api'])
 
 # Mount the MCP server
-app.mount('/mcp', mcp_asgi_app)
+app.mount('/mcp', prompt_notifier.track_streams(mcp_asgi_app))
 
 # ============================================================================
 # SERVE STATIC FILES FROM CLIENT BUILD DIRECTORY (MUST BE LAST!)
@@ -0,0 +1,96 @@
+"""Compression for streamed MCP responses and gzipped request bodies."""
+
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Refuse request bodies that inflate beyond this, guards against gzip bombs
+MAX_DECOMPRESSED_BYTES = 16 * 1024 * 1024
+
+
+class StreamCompressionMiddleware:
+  """Gzip server-sent event streams and accept gzip-encoded request bodies.
+
+  Starlette's GZipMiddleware skips text/event-stream, which is how the MCP
+  endpoint returns tool results, so large query results would otherwise
+  travel uncompressed. Each event is flushed with Z_SYNC_FLUSH, so the client
+  can decode it as soon as it arrives and streaming is preserved.
+  """
+
+  def __init__(self, app: ASGIApp, compresslevel: int = 6) -> None:
+    """Wrap an ASGI app.
+
+    Args:
+        app: The ASGI app to wrap
+        compresslevel: zlib compression level for event streams
+    """
+    self.app = app
+    self.compresslevel = compresslevel
+
+  async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+    """Handle one ASGI connection."""
+    if scope['type'] != 'http':
+      await self.app(scope, receive, send)
+      return
+
+    headers = Headers(scope=scope)
+    if headers.get('content-encoding', '').lower() == 'gzip':
+      scope, receive = self._inflate_request(scope, receive)
+    if 'gzip' in headers.get('accept-encoding', ''):
+      send = self._compressing_send(send)
+    await self.app(scope, receive, send)
+
+  def _inflate_request(self, scope: Scope, receive: Receive) -> tuple[Scope, Receive]:
+    decompressor = zlib.decompressobj(wbits=31)
+    inflated = 0
+
+    async def inflating_receive() -> Message:
+      nonlocal inflated
+      message = await receive()
+      if message['type'] == 'http.request':
+        try:
+          # Inflate at most one byte past the limit so a tiny bomb cannot blow up memory
+          limit = MAX_DECOMPRESSED_BYTES - inflated + 1
+          body = decompressor.decompress(message.get('body', b''), limit)
+          if not message.get('more_body', False) and not decompressor.unconsumed_tail:
+            body += decompressor.flush()
+        except zlib.error:
+          body = None
+        inflated += len(body or b'')
+        if body is None or inflated > MAX_DECOMPRESSED_BYTES:
+          # End the body early, the app rejects the truncated payload as malformed
+          return {'type': 'http.request', 'body': b'', 'more_body': False}
+        message = {**message, 'body': body}
+      return message
+
+    # The app sees a plain body, so drop the encoding and the compressed length
+    headers = [
+      (k, v) for k, v in scope['headers'] if k not in (b'content-encoding', b'content-length')
+    ]
+    return {**scope, 'headers': headers}, inflating_receive
+
+  def _compressing_send(self, send: Send) -> Send:
+    compressor = None
+
+    async def compressing_send(message: Message) -> None:
+      nonlocal compressor
+      if message['type'] == 'http.response.start':
+        headers = MutableHeaders(raw=message['headers'])
+        is_stream = headers.get('content-type', '').startswith('text/event-stream')
+        if is_stream and 'content-encoding' not in headers:
+          compressor = zlib.compressobj(self.compresslevel, zlib.DEFLATED, 31)
+          headers['Content-Encoding'] = 'gzip'
+          headers.add_vary_header('Accept-Encoding')
+          if 'content-length' in headers:
+            del headers['Content-Length']
+      elif message['type'] == 'http.response.body' and compressor is not None:
+        body = compressor.compress(message.get('body', b''))
+        if message.get('more_body', False):
+          body += compressor.flush(zlib.Z_SYNC_FLUSH)
+        else:
+          body += compressor.flush(zlib.Z_FINISH)
+        message = {**message, 'body': body}
+      await send(message)
+
+    return compressing_send
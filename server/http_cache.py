@@ -0,0 +1,32 @@
+"""Conditional GET helpers for API responses served from memory."""
+
+from typing import Any
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+  """Return True if the request's If-None-Match header covers etag."""
+  header = request.headers.get('if-none-match')
+  if not header:
+    return False
+  candidates = [tag.strip().removeprefix('W/') for tag in header.split(',')]
+  return '*' in candidates or etag in candidates
+
+
+def conditional_json(request: Request, etag: str, content: Any) -> Response:
+  """Return 304 when the client already has etag, otherwise content as JSON.
+
+  Args:
+      request: The incoming request
+      etag: Strong ETag of content, including the surrounding quotes
+      content: JSON-serializable response body
+
+  Returns:
+      A 304 Not Modified or a JSON response carrying the ETag header
+  """
+  headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+  if etag_matches(request, etag):
+    return Response(status_code=304, headers=headers)
+  return JSONResponse(content, headers=headers)
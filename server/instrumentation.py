@@ -0,0 +1,162 @@
+"""Request and tool call instrumentation: metrics and tracing."""
+
+import time
+from typing import Mapping
+
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+from fastmcp.tools.tool import ToolResult
+from mcp.types import TextContent
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from server.serialization import tool_serializer
+from server.services.metrics import (
+  HTTP_ERRORS,
+  HTTP_LATENCY,
+  HTTP_REQUESTS,
+  TOOL_CALLS,
+  TOOL_ERRORS,
+  TOOL_LATENCY,
+)
+from server.services.tracing import Tracer, get_tracer, timing_breakdown, trace_span
+
+# Request header asking for a timing breakdown in tool results
+TIMINGS_HEADER = 'x-mcp-timings'
+
+
+def _route_label(scope: Scope) -> str:
+  """Label requests by route template so path parameters do not explode cardinality."""
+  route = scope.get('route')
+  if route is not None and getattr(route, 'path', None):
+    return route.path
+  path = scope.get('path', '')
+  if path.startswith('/mcp'):
+    return '/mcp'
+  if path.startswith('/api'):
+    return 'unmatched'
+  return 'static'
+
+
+class RouteMetricsMiddleware:
+  """Count and time every HTTP request by route template, method and status."""
+
+  def __init__(self, app: ASGIApp) -> None:
+    """Wrap an ASGI app."""
+    self.app = app
+
+  async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+    """Handle one ASGI connection."""
+    if scope['type'] != 'http':
+      await self.app(scope, receive, send)
+      return
+
+    status = 500
+    start = time.perf_counter()
+
+    async def recording_send(message: Message) -> None:
+      nonlocal status
+      if message['type'] == 'http.response.start':
+        status = message['status']
+      await send(message)
+
+    try:
+      await self.app(scope, receive, recording_send)
+    finally:
+      route = _route_label(scope)
+      method = scope['method']
+      HTTP_REQUESTS.inc(route=route, method=method, status=status)
+      HTTP_LATENCY.observe(time.perf_counter() - start, route=route, method=method)
+      if status >= 500:
+        HTTP_ERRORS.inc(route=route, method=method)
+
+
+class ToolMetricsMiddleware(Middleware):
+  """Count and time MCP tool calls.
+
+  Tools report most failures as {'success': False, ...} rather than raising,
+  so those results count as errors too.
+  """
+
+  async def on_call_tool(self, context: MiddlewareContext, call_next):
+    """Record one tool call."""
+    tool = context.message.name
+    start = time.perf_counter()
+    failed = True
+    try:
+      result = await call_next(context)
+      structured = getattr(result, 'structured_content', None)
+      failed = isinstance(structured, dict) and structured.get('success') is False
+      return result
+    finally:
+      TOOL_CALLS.inc(tool=tool)
+      TOOL_LATENCY.observe(time.perf_counter() - start, tool=tool)
+      if failed:
+        TOOL_ERRORS.inc(tool=tool)
+
+
+def _request_headers(context: MiddlewareContext) -> Mapping[str, str]:
+  """Headers of the HTTP request that carried this MCP message.
+
+  get_http_headers() reflects the request that started the session's task,
+  so per-message headers such as traceparent come from the request context.
+  """
+  try:
+    request = context.fastmcp_context.request_context.request
+  except (AttributeError, LookupError, ValueError):
+    request = None
+  return request.headers if request is not None else {}
+
+
+def _wants_timings(headers: Mapping[str, str]) -> bool:
+  return headers.get(TIMINGS_HEADER, '').lower() in ('1', 'true', 'yes')
+
+
+def _with_timings(result: ToolResult, timings: dict) -> ToolResult:
+  """Return the tool result with a 'timings' entry added to its structured content."""
+  structured = result.structured_content
+  if not isinstance(structured, dict):
+    return result
+  structured = {**structured, 'timings': timings}
+  return ToolResult(
+    content=[TextContent(type='text', text=tool_serializer(structured))],
+    structured_content=structured,
+  )
+
+
+class TracingMiddleware(Middleware):
+  """Trace MCP requests, continuing the trace context sent by the caller.
+
+  The root span of each request is a child of the caller's traceparent (the
+  proxy sends one per HTTP request), and tool calls get their own span under
+  which services open spans around Databricks API calls and result
+  conversion. Callers sending 'X-MCP-Timings: 1' get a per-span timing
+  breakdown under 'timings' in tool results, even when no exporter is set.
+  """
+
+  def __init__(self, tracer: Tracer = None):
+    """Create the middleware.
+
+    Args:
+        tracer: Tracer to record with, the process-wide tracer by default
+    """
+    self.tracer = tracer or get_tracer()
+
+  async def on_request(self, context: MiddlewareContext, call_next):
+    """Open the root span of the request."""
+    headers = _request_headers(context)
+    record = context.method == 'tools/call' and _wants_timings(headers)
+    with self.tracer.start_trace(
+      f'mcp {context.method}',
+      headers.get('traceparent'),
+      record=record,
+      **{'mcp.method': context.method, 'mcp.session_id': headers.get('mcp-session-id')},
+    ):
+      return await call_next(context)
+
+  async def on_call_tool(self, context: MiddlewareContext, call_next):
+    """Open the tool span and attach the timing breakdown if it was asked for."""
+    tool = context.message.name
+    with trace_span(f'tool {tool}', **{'mcp.tool': tool}) as span:
+      result = await call_next(context)
+    if span is not None and _wants_timings(_request_headers(context)):
+      result = _with_timings(result, timing_breakdown(span))
+    return result
@@ -1,36 +1,158 @@
 """MCP Prompts loader for Databricks operations."""
 
-import glob
-import os
+import asyncio
+import weakref
+from collections import Counter
+from typing import Callable
 
+import mcp.types
+from fastmcp.prompts import Prompt
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
 
-def load_prompts(mcp_server):
-  """Dynamically load prompts from the prompts directory.
+from server.services.prompt_registry import PromptRegistry, get_prompt_registry
 
-  Args:
-      mcp_server: The FastMCP server instance to register prompts with
+
+class PromptListChangedNotifier(Middleware):
+  """Applies prompt changes picked up by the registry and tells MCP sessions.
+
+  The registry reports changes from its watcher thread. They are handed to
+  the server's event loop, so the prompts FastMCP is listing are never
+  changed under it, and are applied there before anyone is told.
+
+  Sessions listening on the standalone GET stream are notified right away.
+  Clients that only POST (like dba_mcp_proxy) never open that stream, so
+  every session that has not yet seen the current registry version gets
+  prompts/list_changed on its next request's stream instead.
   """
-  prompt_files = glob.glob('prompts/*.md')
 
-  for prompt_file in prompt_files:
-    prompt_name = os.path.splitext(os.path.basename(prompt_file))[0]
+  def __init__(self, registry: PromptRegistry, apply: Callable[[set[str]], None] = None):
+    """Create a notifier.
+
+    Args:
+        registry: The prompt registry whose changes are announced
+        apply: Updates the server's prompts for the changed names, on the event loop
+    """
+    self.registry = registry
+    self.apply = apply
+    self._seen = weakref.WeakKeyDictionary()  # session -> registry version announced
+    self._session_ids = weakref.WeakKeyDictionary()  # session -> mcp-session-id
+    self._streams = Counter()  # mcp-session-id -> open GET streams
+    self._tasks = set()
+    self._loop = None
+    registry.subscribe(self._on_change)
+
+  def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+    """Apply and announce changes on loop, the event loop serving MCP requests."""
+    self._loop = loop
+
+  def track_streams(self, app: ASGIApp) -> ASGIApp:
+    """Wrap the MCP ASGI app to note which sessions hold a GET stream open."""
+
+    async def tracked(scope: Scope, receive: Receive, send: Send) -> None:
+      session_id = None
+      if scope['type'] == 'http' and scope['method'] == 'GET':
+        session_id = Headers(scope=scope).get('mcp-session-id')
+      if session_id is None:
+        await app(scope, receive, send)
+        return
+      self._streams[session_id] += 1
+      try:
+        await app(scope, receive, send)
+      finally:
+        self._streams[session_id] -= 1
+        if not self._streams[session_id]:
+          del self._streams[session_id]
+
+    return tracked
+
+  async def on_request(self, context: MiddlewareContext, call_next):
+    """Announce a pending prompt change on the request's own stream."""
+    ctx = context.fastmcp_context
+    session = ctx.session if ctx is not None else None
+    if session is not None:
+      if self._loop is None:
+        self._loop = asyncio.get_running_loop()
+      # The request carrying this message; ctx.session_id reads the one that opened the session
+      request = ctx.request_context.request
+      session_id = request.headers.get('mcp-session-id') if request is not None else None
+      if session_id:
+        self._session_ids[session] = session_id
+      version = self.registry.version
+      seen = self._seen.setdefault(session, version)
+      self._seen[session] = version
+      if seen < version:
+        notification = mcp.types.ServerNotification(
+          mcp.types.PromptListChangedNotification(method='notifications/prompts/list_changed')
+        )
+        try:
+          await session.send_notification(notification, related_request_id=ctx.request_id)
+        except Exception as e:
+          print(f'⚠️ Failed to send prompts/list_changed: {str(e)}')
+    return await call_next(context)
 
-    # Read the prompt file
-    with open(prompt_file, 'r') as f:
-      content = f.read()
-      lines = content.strip().split('\n')
+  def _on_change(self, changed: set[str]) -> None:
+    """Hand a registry change from the watcher thread to the event loop."""
+    loop = self._loop
+    if loop is None or loop.is_closed():
+      # Nothing is being served yet, so there is nobody to race with or tell
+      if self.apply is not None:
+        self.apply(changed)
+      return
+    loop.call_soon_threadsafe(self._changed, changed)
 
-      # First line is the title (skip the # prefix)
-      title = lines[0].strip().lstrip('#').strip() if lines else prompt_name
-      # Full content is what gets returned
+  def _changed(self, changed: set[str]) -> None:
+    """Apply a change and push prompts/list_changed to every known session's GET stream."""
+    if self.apply is not None:
+      self.apply(changed)
+    version = self.registry.version
+    for session in list(self._seen):
+      if self._session_ids.get(session) in self._streams:
+        # Told on its GET stream, so its next request need not repeat it
+        self._seen[session] = version
+      task = self._loop.create_task(session.send_prompt_list_changed())
+      self._tasks.add(task)
+      task.add_done_callback(self._tasks.discard)
 
-    # Create a closure to capture the current values
-    def make_prompt_handler(prompt_content, prompt_name, prompt_title):
-      @mcp_server.prompt(name=prompt_name, description=prompt_title)
-      async def handle_prompt():
-        return prompt_content
 
-      return handle_prompt
+def _register(mcp_server, registry: PromptRegistry, entry: dict) -> None:
+  name = entry['name']
+
+  async def handle_prompt():
+    # Read at call time so content edits apply without re-registering
+    current = registry.get(name)
+    return current['content'] if current else ''
+
+  prompt = Prompt.from_function(handle_prompt, name=name, description=entry['description'])
+  # Drop the old version first, re-adding would log a duplicate warning
+  mcp_server._prompt_manager._prompts.pop(name, None)
+  mcp_server.add_prompt(prompt)
+
+
+def load_prompts(mcp_server) -> PromptListChangedNotifier:
+  """Register prompts from the shared prompt registry and keep them in sync.
+
+  Args:
+      mcp_server: The FastMCP server instance to register prompts with
+
+  Returns:
+      The notifier applying changes; bind it to the serving event loop at startup
+  """
+  registry = get_prompt_registry()
+  for entry in registry.list():
+    _register(mcp_server, registry, entry)
+
+  def sync(changed: set[str]) -> None:
+    for name in changed:
+      entry = registry.get(name)
+      if entry is None:
+        # FastMCP has no public way to remove a prompt
+        mcp_server._prompt_manager._prompts.pop(name, None)
+      else:
+        _register(mcp_server, registry, entry)
+    mcp_server._cache.clear()
 
-    # Register the prompt
-    make_prompt_handler(content, prompt_name, title)
+  notifier = PromptListChangedNotifier(registry, apply=sync)
+  mcp_server.add_middleware(notifier)
+  return notifier
@@ -3,7 +3,9 @@
 
 from fastapi import APIRouter
 
+from .artifacts import router as artifacts_router
 from .mcp_info import router as mcp_info_router
+from .metrics import router as metrics_router
 from .prompts import router as prompts_router
 from .user import router as user_router
 
@@ -11,3 +13,5 @@ router = APIRouter()
 router.include_router(user_router, prefix='/user', tags=['user'])
 router.include_router(prompts_router, prefix='/prompts', tags=['prompts'])
 router.include_router(mcp_info_router, prefix='/mcp_info', tags=['mcp'])
+router.include_router(metrics_router, prefix='/metrics', tags=['metrics'])
+router.include_router(artifacts_router, prefix='/artifacts', tags=['artifacts'])
@@ -0,0 +1,28 @@
+"""Downloads of query result artifacts, such as Parquet files written by execute_dbsql."""
+
+import os
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse
+
+from server.services.artifact_store import get_artifact_store, request_user
+from server.services.blocking import run_blocking
+
+router = APIRouter()
+
+MEDIA_TYPES = {'.parquet': 'application/vnd.apache.parquet'}
+
+
+@router.get('/{artifact_id}')
+async def download_artifact(artifact_id: str, request: Request) -> FileResponse:
+  """Download an artifact; only the workspace user it was written for may fetch it."""
+  path = await run_blocking(get_artifact_store().open, artifact_id, request_user(request.headers))
+  if path is None:
+    # Also for artifacts of other users, so their IDs cannot be probed
+    raise HTTPException(status_code=404, detail='Artifact not found or expired')
+  suffix = os.path.splitext(path)[1]
+  return FileResponse(
+    path,
+    media_type=MEDIA_TYPES.get(suffix, 'application/octet-stream'),
+    filename=f'{artifact_id}{suffix}',
+  )
@@ -4,11 +4,20 @@ import os
 from pathlib import Path
 from typing import Any, Dict
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request, Response
+
+from server.http_cache import conditional_json, etag_matches
+from server.services.discovery import DiscoveryCache
+from server.services.prompt_registry import get_prompt_registry
 
 router = APIRouter()
 
 
+def _discovery_cache(request: Request) -> DiscoveryCache:
+  # Set by server.app when it builds the MCP server
+  return request.app.state.discovery_cache
+
+
 @router.get('/info')
 async def get_mcp_info() -> Dict[str, Any]:
   """Get MCP server information including URL and capabilities.
@@ -40,53 +49,48 @@ async def get_mcp_info() -> Dict[str, Any]:
   }
 
 
-@router.get('/discovery')
-async def get_mcp_discovery() -> Dict[str, Any]:
+@router.get('/discovery', response_model=Dict[str, Any])
+async def get_mcp_discovery(request: Request) -> Response:
   """Get MCP discovery information including prompts and tools.
 
-  This endpoint dynamically discovers available prompts and tools
-  from the FastMCP server instance.
+  The document is cached and rebuilt only when prompts or tools change.
+  Responses carry a strong ETag; send it back in If-None-Match to get a 304.
 
   Returns:
       Dictionary with prompts and tools lists and servername
   """
-  from server.app import mcp_server as mcp
-  from server.app import servername
-
-  prompts_list = []
-  tools_list = []
-
-  # Get prompts dynamically from FastMCP
-  if hasattr(mcp, '_prompt_manager'):
-    prompts = await mcp._prompt_manager.list_prompts()
-    prompts_list = [
-      {
-        'name': prompt.key,
-        'description': prompt.description or f'{prompt.key.replace("_", " ").title()}',
-      }
-      for prompt in prompts
-    ]
-
-  # Get tools dynamically from FastMCP
-  if hasattr(mcp, '_tool_manager'):
-    tools = await mcp._tool_manager.list_tools()
-    tools_list = [
-      {'name': tool.key, 'description': tool.description or f'{tool.key.replace("_", " ").title()}'}
-      for tool in tools
-    ]
-
-  return {'prompts': prompts_list, 'tools': tools_list, 'servername': servername}
+  cache = _discovery_cache(request)
+  snapshot = await cache.get()
+  if etag_matches(request, snapshot['etag']):
+    cache.record_not_modified()
+  response = conditional_json(request, snapshot['etag'], snapshot['document'])
+  response.headers['X-Discovery-Version'] = str(snapshot['version'])
+  return response
+
+
+@router.get('/discovery/metrics')
+async def get_mcp_discovery_metrics(request: Request) -> Dict[str, Any]:
+  """Get discovery snapshot version and cache hit metrics.
+
+  Args:
+      request: The incoming request, whose app holds the discovery cache
+
+  Returns:
+      Dictionary with the snapshot version, request, hit and rebuild counts
+  """
+  return _discovery_cache(request).stats()
 
 
 @router.get('/config')
-async def get_mcp_config() -> Dict[str, Any]:
+async def get_mcp_config(request: Request) -> Dict[str, Any]:
   """Get MCP configuration for Claude Code setup.
 
+  Args:
+      request: The incoming request, whose app holds the server name
+
   Returns:
       Dictionary with configuration needed for Claude MCP setup
   """
-  from server.app import servername
-
   # Get environment variables
   databricks_host = os.environ.get('DATABRICKS_HOST', '')
   is_databricks_app = os.environ.get('DATABRICKS_APP_PORT') is not None
@@ -96,31 +100,28 @@ async def get_mcp_config() -> Dict[str, Any]:
   client_path = str(base_dir / 'mcp_databricks_client.py')
 
   return {
-    'servername': servername,
+    'servername': request.app.state.servername,
     'databricks_host': databricks_host,
     'is_databricks_app': is_databricks_app,
     'client_path': client_path,
   }
 
 
-@router.get('/prompt/{prompt_name}')
-async def get_mcp_prompt_content(prompt_name: str) -> Dict[str, str]:
+@router.get('/prompt/{prompt_name}', response_model=Dict[str, str])
+async def get_mcp_prompt_content(prompt_name: str, request: Request) -> Response:
   """Get the content of a specific MCP prompt.
 
   Args:
       prompt_name: The name of the prompt
+      request: The incoming request, checked for If-None-Match
 
   Returns:
-      Dictionary with prompt name and content
+      Dictionary with prompt name and content, or 304 if unchanged
   """
-  prompt_file = Path(f'prompts/{prompt_name}.md')
-
-  if not prompt_file.exists():
-    from fastapi import HTTPException
-
+  prompt = get_prompt_registry().get(prompt_name)
+  if prompt is None:
     raise HTTPException(status_code=404, detail=f"Prompt '{prompt_name}' not found")
 
-  with open(prompt_file, 'r') as f:
-    content = f.read()
-
-  return {'name': prompt_name, 'content': content}
+  return conditional_json(
+    request, prompt['etag'], {'name': prompt_name, 'content': prompt['content']}
+  )
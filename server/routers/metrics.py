@@ -0,0 +1,16 @@
+"""Prometheus metrics endpoint."""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from server.services.metrics import get_metrics_registry
+
+router = APIRouter()
+
+
+@router.get('', response_class=PlainTextResponse)
+async def get_metrics() -> PlainTextResponse:
+  """Get tool, route and SQL metrics in the Prometheus text format."""
+  return PlainTextResponse(
+    get_metrics_registry().render(), media_type='text/plain; version=0.0.4; charset=utf-8'
+  )
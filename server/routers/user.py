@@ -1,8 +1,11 @@
 """User router for Databricks user information."""
 
-from fastapi import APIRouter, HTTPException
+import os
+
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 
+from server.services.blocking import run_blocking
 from server.services.user_service import UserService
 
 router = APIRouter()
@@ -24,12 +27,23 @@ class UserWorkspaceInfo(BaseModel):
   workspace: dict
 
 
+def _user_service(request: Request) -> UserService:
+  """UserService for the caller.
+
+  On Databricks Apps with user authorization the caller's token is forwarded
+  in X-Forwarded-Access-Token; without it the app's own credentials are used.
+  """
+  token = request.headers.get('x-forwarded-access-token')
+  if token:
+    return UserService(host=os.environ.get('DATABRICKS_HOST'), token=token)
+  return UserService()
+
+
 @router.get('/me', response_model=UserInfo)
-async def get_current_user():
+async def get_current_user(request: Request):
   """Get current user information from Databricks."""
   try:
-    service = UserService()
-    user_info = service.get_user_info()
+    user_info = await run_blocking(lambda: _user_service(request).get_user_info())
 
     return UserInfo(
       userName=user_info['userName'],
@@ -42,11 +56,10 @@ async def get_current_user():
 
 
 @router.get('/me/workspace', response_model=UserWorkspaceInfo)
-async def get_user_workspace_info():
+async def get_user_workspace_info(request: Request):
   """Get user information along with workspace details."""
   try:
-    service = UserService()
-    info = service.get_user_workspace_info()
+    info = await run_blocking(lambda: _user_service(request).get_user_workspace_info())
 
     return UserWorkspaceInfo(
       user=UserInfo(
@@ -0,0 +1,27 @@
+"""Fast JSON serialization for MCP tool results."""
+
+from typing import Any
+
+import orjson
+import pydantic_core
+
+
+def _default(obj: Any) -> Any:
+  """Fallback for types orjson does not handle natively (Decimal, pydantic models, ...)."""
+  return pydantic_core.to_jsonable_python(obj, fallback=str)
+
+
+def tool_serializer(data: Any) -> str:
+  """Serialize a tool result to JSON text with orjson.
+
+  Args:
+      data: Tool return value
+
+  Returns:
+      Compact JSON string
+  """
+  try:
+    return orjson.dumps(data, default=_default).decode()
+  except TypeError:
+    # e.g. non-string dict keys, which orjson rejects by default
+    return pydantic_core.to_json(data, fallback=str).decode()
@@ -0,0 +1,306 @@
+"""Per-warehouse admission control with fair queueing across callers."""
+
+import asyncio
+import os
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from contextlib import contextmanager
+
+
+class AdmissionRejected(Exception):
+  """Raised when a warehouse queue is full or the wait for a slot timed out."""
+
+  def __init__(self, warehouse_id: str, reason: str, retry_after: float):
+    super().__init__(f'Warehouse {warehouse_id} is busy ({reason}), retry in {retry_after:.0f}s')
+    self.warehouse_id = warehouse_id
+    self.reason = reason
+    self.retry_after = retry_after
+
+
+class _Ticket:
+  def __init__(self, caller: str, loop: asyncio.AbstractEventLoop = None):
+    self.caller = caller
+    self.granted = threading.Event()
+    self.enqueued_at = time.monotonic()
+    # Coroutines wait on a future of their event loop instead of blocking a thread
+    self.loop = loop
+    self.future = loop.create_future() if loop else None
+
+  def grant(self) -> None:
+    self.granted.set()
+    if self.future is not None:
+      self.loop.call_soon_threadsafe(_resolve, self.future)
+
+
+def _resolve(future: asyncio.Future) -> None:
+  if not future.done():
+    future.set_result(True)
+
+
+class _WarehouseState:
+  def __init__(self):
+    self.in_flight = 0
+    self.waiting = OrderedDict()  # caller -> deque of tickets, in round-robin order
+    self.queued = 0
+    self.admitted = 0
+    self.rejected = 0
+    self.wait_total = 0.0
+    self.wait_max = 0.0
+    self.hold_avg = 1.0  # EWMA of seconds a slot is held, seeds retry-after hints
+    self.expired = 0  # Slots of running statements freed by hold_timeout
+
+
+class AdmissionController:
+  """Limits in-flight statements per warehouse and queues the rest fairly.
+
+  Each warehouse runs at most max_in_flight statements. Further callers wait
+  in a bounded queue; when a slot frees up, callers are served round-robin so
+  one chatty caller cannot starve the others, and no caller may hold more
+  than its fair share of queue slots while others are waiting. Requests that
+  do not fit are rejected immediately with a retry-after hint.
+
+  A statement still running on the warehouse when its call returns, such as
+  an async submission or a query that outlived its wait, keeps its slot
+  through hold() until settle() is called for a terminal state, or until
+  hold_timeout passes without anyone looking at it.
+  """
+
+  def __init__(
+    self,
+    max_in_flight: int = 10,
+    max_queue: int = 50,
+    queue_timeout: float = 60,
+    hold_timeout: float = 1800,
+  ):
+    """Create a controller.
+
+    Args:
+        max_in_flight: Maximum concurrently executing statements per warehouse
+        max_queue: Maximum waiting requests per warehouse
+        queue_timeout: Seconds a request may wait for a slot before it is rejected
+        hold_timeout: Seconds a running statement keeps its slot without being settled
+    """
+    self.max_in_flight = max(1, max_in_flight)
+    self.max_queue = max(0, max_queue)
+    self.queue_timeout = queue_timeout
+    self.hold_timeout = hold_timeout
+    self._warehouses = {}
+    self._held = {}  # statement_id -> (warehouse_id, monotonic time the hold started)
+    self._lock = threading.Lock()
+
+  def _retry_after(self, state: _WarehouseState) -> float:
+    backlog = (state.queued + state.in_flight) / self.max_in_flight
+    return max(1.0, round(backlog * state.hold_avg, 1))
+
+  def _check_queue_space(self, warehouse_id: str, state: _WarehouseState, caller: str) -> None:
+    if state.queued >= self.max_queue:
+      state.rejected += 1
+      raise AdmissionRejected(warehouse_id, 'queue full', self._retry_after(state))
+
+    # Even a lone caller only gets half the queue, keeping room for newcomers
+    callers = len(state.waiting) + (0 if caller in state.waiting else 1)
+    fair_share = max(1, self.max_queue // max(2, callers))
+    mine = len(state.waiting.get(caller, ()))
+    if mine >= fair_share:
+      state.rejected += 1
+      raise AdmissionRejected(warehouse_id, 'caller queue share used', self._retry_after(state))
+
+  def _grant_next(self, state: _WarehouseState) -> None:
+    """Hand free slots to waiting callers in round-robin order (lock held)."""
+    while state.in_flight < self.max_in_flight and state.waiting:
+      caller, tickets = next(iter(state.waiting.items()))
+      ticket = tickets.popleft()
+      if tickets:
+        state.waiting.move_to_end(caller)
+      else:
+        del state.waiting[caller]
+      state.queued -= 1
+      state.in_flight += 1
+      ticket.grant()
+
+  def _record_wait(self, state: _WarehouseState, waited: float) -> None:
+    state.admitted += 1
+    state.wait_total += waited
+    state.wait_max = max(state.wait_max, waited)
+
+  def _enqueue(self, warehouse_id: str, caller: str, loop=None) -> tuple:
+    """Take a free slot, or queue a ticket for one.
+
+    Returns:
+        Tuple of (state, ticket), ticket is None if a slot was taken at once
+    """
+    with self._lock:
+      self._expire_holds()
+      state = self._warehouses.setdefault(warehouse_id, _WarehouseState())
+      if state.in_flight < self.max_in_flight and not state.waiting:
+        state.in_flight += 1
+        self._record_wait(state, 0.0)
+        return state, None
+      self._check_queue_space(warehouse_id, state, caller)
+      ticket = _Ticket(caller, loop)
+      state.waiting.setdefault(caller, deque()).append(ticket)
+      state.queued += 1
+      return state, ticket
+
+  def _dequeue(self, state: _WarehouseState, ticket: _Ticket) -> None:
+    """Remove a ticket that was not granted from the queue (lock held)."""
+    tickets = state.waiting.get(ticket.caller)
+    tickets.remove(ticket)
+    if not tickets:
+      del state.waiting[ticket.caller]
+    state.queued -= 1
+
+  def _finish_wait(self, warehouse_id: str, state: _WarehouseState, ticket: _Ticket) -> None:
+    """Account for a finished wait, rejecting it if the ticket was never granted."""
+    with self._lock:
+      if not ticket.granted.is_set():
+        self._dequeue(state, ticket)
+        state.rejected += 1
+        raise AdmissionRejected(warehouse_id, 'queue wait timed out', self._retry_after(state))
+      self._record_wait(state, time.monotonic() - ticket.enqueued_at)
+
+  def acquire(self, warehouse_id: str, caller: str = None) -> None:
+    """Block until a slot on the warehouse is available.
+
+    Raises:
+        AdmissionRejected: If the queue is full or the wait times out
+    """
+    state, ticket = self._enqueue(warehouse_id, caller or 'anonymous')
+    if ticket is not None:
+      ticket.granted.wait(self.queue_timeout)
+      self._finish_wait(warehouse_id, state, ticket)
+
+  async def acquire_async(self, warehouse_id: str, caller: str = None) -> None:
+    """Wait for a slot on the warehouse without blocking a thread.
+
+    Async callers share the queues, fairness and limits of acquire(), but
+    wait on the event loop, so queued statements do not tie up the blocking
+    executor's workers.
+
+    Raises:
+        AdmissionRejected: If the queue is full or the wait times out
+    """
+    state, ticket = self._enqueue(warehouse_id, caller or 'anonymous', asyncio.get_running_loop())
+    if ticket is None:
+      return
+    try:
+      await asyncio.wait_for(ticket.future, self.queue_timeout)
+    except asyncio.TimeoutError:
+      pass
+    except asyncio.CancelledError:
+      # The caller went away; give back the slot if it was granted in the meantime
+      with self._lock:
+        granted = ticket.granted.is_set()
+        if not granted:
+          self._dequeue(state, ticket)
+      if granted:
+        self.release(warehouse_id)
+      raise
+    self._finish_wait(warehouse_id, state, ticket)
+
+  def _release(self, warehouse_id: str, held: float = None) -> None:
+    """Free a slot and admit the next waiting caller (lock held)."""
+    state = self._warehouses[warehouse_id]
+    state.in_flight -= 1
+    if held is not None:
+      state.hold_avg = 0.8 * state.hold_avg + 0.2 * held
+    self._grant_next(state)
+
+  def release(self, warehouse_id: str, held: float = None) -> None:
+    """Free a slot on the warehouse and admit the next waiting caller."""
+    with self._lock:
+      self._release(warehouse_id, held)
+
+  def hold(self, warehouse_id: str, statement_id: str, acquired_at: float = None) -> None:
+    """Keep an acquired slot for a statement that is still running on the warehouse.
+
+    Args:
+        warehouse_id: Warehouse the slot was acquired on
+        statement_id: Statement that keeps the slot until it is settled
+        acquired_at: time.monotonic() when the slot was acquired, for hold statistics
+    """
+    with self._lock:
+      self._held[statement_id] = (warehouse_id, acquired_at or time.monotonic())
+
+  def settle(self, statement_id: str) -> None:
+    """Free the slot held by a statement that reached a terminal state, if it holds one."""
+    with self._lock:
+      held = self._held.pop(statement_id, None)
+      if held is not None:
+        warehouse_id, since = held
+        self._release(warehouse_id, time.monotonic() - since)
+
+  def _expire_holds(self) -> None:
+    """Free the slots of statements held longer than hold_timeout (lock held)."""
+    cutoff = time.monotonic() - self.hold_timeout
+    for statement_id, (warehouse_id, since) in list(self._held.items()):
+      if since < cutoff:
+        del self._held[statement_id]
+        self._warehouses[warehouse_id].expired += 1
+        self._release(warehouse_id)
+
+  def estimated_wait(self, warehouse_id: str) -> float:
+    """Expected seconds a new request would queue on the warehouse (0 if unknown)."""
+    with self._lock:
+      state = self._warehouses.get(warehouse_id)
+      if state is None or state.in_flight < self.max_in_flight:
+        return 0.0
+      return (state.queued + 1) / self.max_in_flight * state.hold_avg
+
+  @contextmanager
+  def admit(self, warehouse_id: str, caller: str = None):
+    """Hold a warehouse slot for the duration of the block."""
+    self.acquire(warehouse_id, caller)
+    start = time.monotonic()
+    try:
+      yield
+    finally:
+      self.release(warehouse_id, time.monotonic() - start)
+
+  def stats(self) -> dict:
+    """Return queue depth, wait time and rejection metrics per warehouse."""
+    with self._lock:
+      self._expire_holds()
+      held = Counter(warehouse_id for warehouse_id, _ in self._held.values())
+      warehouses = {}
+      for warehouse_id, state in self._warehouses.items():
+        warehouses[warehouse_id] = {
+          'in_flight': state.in_flight,
+          'held_by_running_statements': held[warehouse_id],
+          'expired_holds': state.expired,
+          'queued': state.queued,
+          'waiting_callers': len(state.waiting),
+          'admitted': state.admitted,
+          'rejected': state.rejected,
+          'avg_wait_ms': round(state.wait_total / state.admitted * 1000, 1)
+          if state.admitted
+          else 0.0,
+          'max_wait_ms': round(state.wait_max * 1000, 1),
+        }
+      return {
+        'max_in_flight': self.max_in_flight,
+        'max_queue': self.max_queue,
+        'queue_timeout_seconds': self.queue_timeout,
+        'hold_timeout_seconds': self.hold_timeout,
+        'warehouses': warehouses,
+      }
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+  """Return the process-wide admission controller, configured from the environment."""
+  global _controller
+  if _controller is None:
+    with _controller_lock:
+      if _controller is None:
+        _controller = AdmissionController(
+          max_in_flight=int(os.environ.get('MCP_WAREHOUSE_MAX_IN_FLIGHT', 10)),
+          max_queue=int(os.environ.get('MCP_WAREHOUSE_MAX_QUEUE', 50)),
+          queue_timeout=float(os.environ.get('MCP_WAREHOUSE_QUEUE_TIMEOUT_SECONDS', 60)),
+          hold_timeout=float(os.environ.get('MCP_WAREHOUSE_HOLD_TIMEOUT_SECONDS', 1800)),
+        )
+  return _controller
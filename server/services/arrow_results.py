@@ -0,0 +1,117 @@
+"""Arrow result download and decoding for EXTERNAL_LINKS statement results."""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from server.services.artifact_store import ArtifactStore, get_artifact_store
+
+DOWNLOAD_WORKERS = int(os.environ.get('MCP_ARROW_DOWNLOAD_WORKERS', 8))
+
+# External links point at cloud storage, not the workspace, so they get their
+# own keep-alive session without Databricks auth headers.
+_session = None
+_session_lock = threading.Lock()
+
+
+def _require_pyarrow():
+  try:
+    import pyarrow
+    import pyarrow.ipc  # noqa: F401
+  except ImportError:
+    raise RuntimeError(
+      'pyarrow is required for Arrow results. Install with: pip install pyarrow'
+    ) from None
+  return pyarrow
+
+
+def _download_session() -> requests.Session:
+  global _session
+  if _session is None:
+    with _session_lock:
+      if _session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=DOWNLOAD_WORKERS, pool_maxsize=DOWNLOAD_WORKERS)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        _session = session
+  return _session
+
+
+class ArrowResultFetcher:
+  """Downloads ARROW_STREAM external link chunks in parallel and decodes them."""
+
+  def __init__(self, client, max_workers: int = DOWNLOAD_WORKERS, timeout: float = 60):
+    """Initialize the fetcher with a Databricks workspace client."""
+    self.client = client
+    self.max_workers = max_workers
+    self.timeout = timeout
+
+  def _chunk_links(self, response, chunk_index: int) -> list:
+    first = response.result
+    if first and first.external_links and (first.chunk_index or 0) == chunk_index:
+      return first.external_links
+    chunk = self.client.statement_execution.get_statement_result_chunk_n(
+      response.statement_id, chunk_index
+    )
+    return chunk.external_links or []
+
+  def _download(self, link):
+    pa = _require_pyarrow()
+    # Presigned URLs must not carry the workspace Authorization header
+    resp = _download_session().get(
+      link.external_link, headers=link.http_headers or {}, timeout=self.timeout
+    )
+    resp.raise_for_status()
+    return pa.ipc.open_stream(pa.py_buffer(resp.content)).read_all()
+
+  def _load_chunk(self, response, chunk_index: int) -> list:
+    return [self._download(link) for link in self._chunk_links(response, chunk_index)]
+
+  def fetch_table(self, response):
+    """Download every result chunk of a statement into a single Arrow table."""
+    pa = _require_pyarrow()
+    manifest = response.manifest
+    if manifest.chunks:
+      chunk_indexes = [chunk.chunk_index for chunk in manifest.chunks]
+    else:
+      chunk_indexes = list(range(manifest.total_chunk_count or 0))
+
+    with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(chunk_indexes)))) as pool:
+      tables = [
+        table
+        for chunk_tables in pool.map(lambda i: self._load_chunk(response, i), chunk_indexes)
+        for table in chunk_tables
+      ]
+
+    if not tables:
+      return None
+    return pa.concat_tables(tables)
+
+
+def table_to_columnar(table) -> dict:
+  """Convert an Arrow table into a compact column-oriented payload."""
+  return {
+    'columns': table.column_names,
+    'types': [str(field.type) for field in table.schema],
+    'arrays': [column.to_pylist() for column in table.columns],
+  }
+
+
+def write_parquet(table, owner: str = None, store: ArtifactStore = None) -> dict:
+  """Write an Arrow table to a Parquet artifact only owner may download, and describe it."""
+  _require_pyarrow()
+  import pyarrow.parquet as pq
+
+  artifact = (store or get_artifact_store()).save(
+    lambda path: pq.write_table(table, path), '.parquet', owner
+  )
+  return {
+    **artifact,
+    'format': 'parquet',
+    'columns': table.column_names,
+    'types': [str(field.type) for field in table.schema],
+  }
@@ -0,0 +1,180 @@
+"""Storage, retention and lookup of files produced for query results."""
+
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from typing import Callable, Mapping
+
+# Artifact IDs are random hex, which also keeps lookups from escaping the directory
+_ARTIFACT_FILE = re.compile(r'^([0-9a-f]{32})(\.[a-z0-9]+)$')
+
+
+def request_user(headers: Mapping[str, str]) -> str | None:
+  """Workspace user of a request as forwarded by Databricks Apps, None when running locally."""
+  return headers.get('x-forwarded-email') or headers.get('x-forwarded-user') or None
+
+
+class ArtifactStore:
+  """Files written for query results, kept for a bounded time and total size.
+
+  Artifacts are named by random IDs and downloaded through the
+  /api/artifacts/{id} route instead of by filesystem path. An artifact
+  written for a workspace user can only be downloaded by that user. Each
+  write sweeps the directory: files older than ttl seconds are deleted, then
+  the oldest ones until the rest fit in max_bytes. The artifact just written
+  is never swept, even if it alone is larger than max_bytes.
+  """
+
+  def __init__(self, directory: str, ttl: float = 3600, max_bytes: int = 1024 * 1024 * 1024):
+    """Create a store.
+
+    Args:
+        directory: Where artifact files are written
+        ttl: Seconds an artifact can be downloaded after it was written
+        max_bytes: Total size of the artifacts kept, the oldest are deleted beyond it
+    """
+    self.directory = directory
+    self.ttl = ttl
+    self.max_bytes = max_bytes
+    self._owners = {}  # artifact_id -> user it was written for, None if anyone
+    self._lock = threading.Lock()
+    self.written = 0
+    self.downloads = 0
+    self.deleted = 0
+
+  def _files(self) -> list[tuple[float, int, str, str]]:
+    """(mtime, size, artifact_id, path) of every artifact file, oldest first."""
+    try:
+      entries = list(os.scandir(self.directory))
+    except FileNotFoundError:
+      return []
+    files = []
+    for entry in entries:
+      match = _ARTIFACT_FILE.match(entry.name)
+      if match is None:
+        continue
+      try:
+        stat = entry.stat()
+      except FileNotFoundError:
+        continue
+      files.append((stat.st_mtime, stat.st_size, match.group(1), entry.path))
+    files.sort()
+    return files
+
+  def _delete(self, artifact_id: str, path: str) -> None:
+    try:
+      os.remove(path)
+    except FileNotFoundError:
+      pass
+    with self._lock:
+      self._owners.pop(artifact_id, None)
+      self.deleted += 1
+
+  def sweep(self, keep: str = None) -> int:
+    """Delete expired artifacts, then the oldest until the rest fit; return how many went.
+
+    Args:
+        keep: ID of an artifact never to delete, the one whose URL is being returned
+    """
+    with self._lock:
+      known = set(self._owners)
+    files = self._files()
+    total = sum(size for _, size, _, _ in files)
+    cutoff = time.time() - self.ttl
+    deleted = 0
+    for mtime, size, artifact_id, path in files:
+      if mtime >= cutoff and total <= self.max_bytes:
+        break
+      if artifact_id == keep:
+        continue
+      self._delete(artifact_id, path)
+      total -= size
+      deleted += 1
+
+    # Forget artifacts whose files were removed behind the store's back; IDs
+    # saved since the snapshot may not be listed yet, so only older ones go
+    with self._lock:
+      for artifact_id in known - {candidate for _, _, candidate, _ in files}:
+        self._owners.pop(artifact_id, None)
+    return deleted
+
+  def save(self, write: Callable[[str], None], suffix: str, owner: str = None) -> dict:
+    """Write a new artifact with write(path) and describe it.
+
+    Args:
+        write: Writes the artifact to the path it is given
+        suffix: File extension, e.g. '.parquet'
+        owner: Workspace user allowed to download it, None to allow anyone
+
+    Returns:
+        Dictionary with the artifact id, its download url, size and expiry
+    """
+    os.makedirs(self.directory, exist_ok=True)
+    artifact_id = uuid.uuid4().hex
+    path = os.path.join(self.directory, artifact_id + suffix)
+    write(path)
+    with self._lock:
+      self._owners[artifact_id] = owner
+      self.written += 1
+    size = os.path.getsize(path)
+    self.sweep(keep=artifact_id)
+    return {
+      'id': artifact_id,
+      'url': f'/api/artifacts/{artifact_id}',
+      'bytes': size,
+      'expires_in_seconds': self.ttl,
+    }
+
+  def open(self, artifact_id: str, user: str = None) -> str | None:
+    """Return the path of an artifact user may download, None if there is none."""
+    with self._lock:
+      if artifact_id not in self._owners:
+        return None
+      owner = self._owners[artifact_id]
+    if owner is not None and owner != user:
+      return None
+    for mtime, _, candidate, path in self._files():
+      if candidate == artifact_id:
+        if mtime < time.time() - self.ttl:
+          self._delete(artifact_id, path)
+          return None
+        with self._lock:
+          self.downloads += 1
+        return path
+    return None
+
+  def stats(self) -> dict:
+    """Return the number and size of artifacts on disk and lifetime counters."""
+    files = self._files()
+    return {
+      'artifacts': len(files),
+      'bytes': sum(size for _, size, _, _ in files),
+      'max_bytes': self.max_bytes,
+      'ttl_seconds': self.ttl,
+      'written': self.written,
+      'downloads': self.downloads,
+      'deleted': self.deleted,
+    }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> ArtifactStore:
+  """Return the process-wide artifact store, configured from the environment."""
+  global _store
+  if _store is None:
+    with _store_lock:
+      if _store is None:
+        _store = ArtifactStore(
+          directory=os.environ.get(
+            'MCP_ARTIFACT_DIR', os.path.join(tempfile.gettempdir(), 'mcp-artifacts')
+          ),
+          ttl=float(os.environ.get('MCP_ARTIFACT_TTL_SECONDS', 3600)),
+          max_bytes=int(os.environ.get('MCP_ARTIFACT_MAX_BYTES', 1024 * 1024 * 1024)),
+        )
+  return _store
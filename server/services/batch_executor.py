@@ -0,0 +1,68 @@
+"""Bounded-concurrency execution of query batches."""
+
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable
+
+MAX_CONCURRENCY = int(os.environ.get('MCP_BATCH_MAX_CONCURRENCY', 8))
+
+
+class BatchExecutor:
+  """Runs the jobs of one batch concurrently, at most max_concurrency at a time.
+
+  Jobs are coroutines that offload their own blocking calls, so the event
+  loop stays free. How many statements run on each warehouse is left to the
+  process-wide admission controller the jobs go through, which also sees
+  every other caller's queries; a per-batch warehouse limit would only
+  duplicate it without knowing about the rest of the load.
+  """
+
+  def __init__(self, max_concurrency: int = MAX_CONCURRENCY):
+    """Create an executor.
+
+    Args:
+        max_concurrency: Maximum jobs of the batch running at once
+    """
+    self.max_concurrency = max(1, max_concurrency)
+
+  async def run(
+    self,
+    jobs: list[tuple[str, Callable[[], Awaitable[dict]]]],
+    on_result: Callable[[dict], Awaitable[None]] = None,
+  ) -> list[dict]:
+    """Run (warehouse_id, fn) jobs and return one entry per job, in job order.
+
+    Args:
+        jobs: Pairs of warehouse ID and a zero-argument coroutine function
+        on_result: Optional coroutine called with each entry as soon as it finishes
+
+    Returns:
+        Entries with index, warehouse_id, queued_ms, execution_ms and result
+    """
+    slots = asyncio.Semaphore(self.max_concurrency)
+    batch_start = time.perf_counter()
+
+    async def run_one(index: int, warehouse_id: str, fn: Callable[[], Awaitable[dict]]) -> dict:
+      async with slots:
+        started = time.perf_counter()
+        try:
+          result = await fn()
+        except Exception as e:
+          result = {'success': False, 'error': f'Error: {str(e)}'}
+        finished = time.perf_counter()
+
+      entry = {
+        'index': index,
+        'warehouse_id': warehouse_id,
+        'queued_ms': round((started - batch_start) * 1000, 1),
+        'execution_ms': round((finished - started) * 1000, 1),
+        'result': result,
+      }
+      if on_result is not None:
+        await on_result(entry)
+      return entry
+
+    return await asyncio.gather(
+      *(run_one(i, warehouse_id, fn) for i, (warehouse_id, fn) in enumerate(jobs))
+    )
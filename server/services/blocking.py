@@ -0,0 +1,134 @@
+"""Managed thread pool for blocking Databricks SDK calls made from async code."""
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+
+class BlockingExecutor:
+  """Bounded thread pool that keeps synchronous SDK calls off the event loop.
+
+  FastMCP runs sync tools and FastAPI runs async routes directly on the
+  event loop, so a single slow HTTP round trip to Databricks would stall
+  every other request and MCP stream in the process. Calls submitted here
+  run on at most max_workers threads with the caller's contextvars (request
+  headers, MCP context), and the executor tracks how often it is saturated.
+  """
+
+  def __init__(self, max_workers: int = 32):
+    """Create an executor.
+
+    Args:
+        max_workers: Maximum blocking calls running at once, further calls queue
+    """
+    self.max_workers = max(1, max_workers)
+    self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='sdk')
+    self._lock = threading.Lock()
+    self.submitted = 0
+    self.completed = 0
+    self.failed = 0
+    self.active = 0
+    self.queued = 0
+    self.peak_active = 0
+    self.peak_queued = 0
+    self.saturated = 0  # submissions that found every worker busy
+    self.wait_total = 0.0
+    self.wait_max = 0.0
+    self.run_total = 0.0
+
+  async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run fn(*args, **kwargs) on a worker thread and await its result."""
+    context = contextvars.copy_context()
+    submitted_at = time.perf_counter()
+    with self._lock:
+      self.submitted += 1
+      if self.active + self.queued >= self.max_workers:
+        self.saturated += 1
+      self.queued += 1
+      self.peak_queued = max(self.peak_queued, self.queued)
+
+    def call():
+      started = time.perf_counter()
+      with self._lock:
+        self.queued -= 1
+        self.active += 1
+        self.peak_active = max(self.peak_active, self.active)
+        waited = started - submitted_at
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+      failed = False
+      try:
+        return context.run(fn, *args, **kwargs)
+      except BaseException:
+        failed = True
+        raise
+      finally:
+        with self._lock:
+          self.active -= 1
+          self.completed += 1
+          self.failed += failed
+          self.run_total += time.perf_counter() - started
+
+    return await asyncio.get_running_loop().run_in_executor(self._pool, call)
+
+  def shutdown(self) -> None:
+    """Stop accepting work and let running calls finish."""
+    self._pool.shutdown(wait=False)
+
+  def stats(self) -> dict:
+    """Return pool size, utilization and queueing metrics."""
+    with self._lock:
+      return {
+        'max_workers': self.max_workers,
+        'active': self.active,
+        'queued': self.queued,
+        'peak_active': self.peak_active,
+        'peak_queued': self.peak_queued,
+        'submitted': self.submitted,
+        'completed': self.completed,
+        'failed': self.failed,
+        'saturated': self.saturated,
+        'avg_wait_ms': round(self.wait_total / self.completed * 1000, 2) if self.completed else 0.0,
+        'max_wait_ms': round(self.wait_max * 1000, 2),
+        'avg_run_ms': round(self.run_total / self.completed * 1000, 2) if self.completed else 0.0,
+      }
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_blocking_executor() -> BlockingExecutor:
+  """Return the process-wide blocking executor, configured from the environment."""
+  global _executor
+  if _executor is None:
+    with _executor_lock:
+      if _executor is None:
+        _executor = BlockingExecutor(
+          max_workers=int(os.environ.get('MCP_BLOCKING_MAX_WORKERS', 32)),
+        )
+  return _executor
+
+
+async def run_blocking(fn: Callable[..., Any], *args, **kwargs) -> Any:
+  """Run a blocking callable on the shared executor."""
+  return await get_blocking_executor().run(fn, *args, **kwargs)
+
+
+def offload(fn: Callable[..., Any]) -> Callable[..., Any]:
+  """Turn a blocking function into a coroutine function that runs on the shared executor.
+
+  The wrapper keeps fn's name, docstring and signature, so it can be
+  registered as an MCP tool with the same schema.
+  """
+
+  @functools.wraps(fn)
+  async def wrapper(*args, **kwargs):
+    return await run_blocking(fn, *args, **kwargs)
+
+  return wrapper
@@ -0,0 +1,123 @@
+"""Byte-bounded cache of the result chunk each statement is being paged through."""
+
+import os
+import threading
+from collections import OrderedDict
+
+from databricks.sdk.service.sql import ResultData
+
+
+def chunk_size(chunk: ResultData) -> int:
+  """Approximate bytes a chunk holds; INLINE chunks carry no byte_count, so count the cells."""
+  if chunk.byte_count:
+    return chunk.byte_count
+  return sum(len(value) for row in chunk.data_array or () for value in row if value)
+
+
+class ResultChunkCache:
+  """Column schemas and current chunks of statements being paged, per user.
+
+  Entries are keyed on (user, statement_id), so a statement's pages are only
+  served from memory to the user who fetched them. Each statement holds at
+  most one chunk, the one its pages are being read from: the next chunk
+  replaces it and the chunk's last page drops it. Chunks are evicted least
+  recently used beyond max_bytes, and a chunk larger than max_bytes is never
+  kept, so it is simply downloaded again for its next page.
+  """
+
+  def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_statements: int = 256):
+    """Create a cache.
+
+    Args:
+        max_bytes: Total size of the chunks kept, 0 disables chunk caching
+        max_statements: Statements whose column schema is kept
+    """
+    self.max_bytes = max_bytes
+    self.max_statements = max_statements
+    self._columns = OrderedDict()  # (user, statement_id) -> columns
+    self._chunks = OrderedDict()  # (user, statement_id) -> (chunk, size)
+    self._bytes = 0
+    self._lock = threading.Lock()
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+
+  def remember_columns(self, user: str | None, statement_id: str, columns: list) -> None:
+    """Keep the column schema of a statement for its later pages."""
+    with self._lock:
+      self._columns[(user, statement_id)] = columns
+      self._columns.move_to_end((user, statement_id))
+      while len(self._columns) > self.max_statements:
+        self._columns.popitem(last=False)
+
+  def columns(self, user: str | None, statement_id: str) -> list | None:
+    """Return the column schema of a statement, if kept."""
+    with self._lock:
+      return self._columns.get((user, statement_id))
+
+  def _drop(self, key: tuple) -> None:
+    _, size = self._chunks.pop(key)
+    self._bytes -= size
+
+  def put(self, user: str | None, statement_id: str, chunk: ResultData) -> None:
+    """Keep chunk as the one the statement is being paged through."""
+    size = chunk_size(chunk)
+    key = (user, statement_id)
+    with self._lock:
+      if key in self._chunks:
+        self._drop(key)
+      if size > self.max_bytes:
+        return
+      self._chunks[key] = (chunk, size)
+      self._bytes += size
+      while self._bytes > self.max_bytes:
+        self._drop(next(iter(self._chunks)))
+        self.evictions += 1
+
+  def get(self, user: str | None, statement_id: str, chunk_index: int) -> ResultData | None:
+    """Return the statement's kept chunk if it is chunk_index, None otherwise."""
+    key = (user, statement_id)
+    with self._lock:
+      entry = self._chunks.get(key)
+      if entry is None or (entry[0].chunk_index or 0) != chunk_index:
+        self.misses += 1
+        return None
+      self._chunks.move_to_end(key)
+      self.hits += 1
+      return entry[0]
+
+  def forget(self, user: str | None, statement_id: str) -> None:
+    """Drop the statement's kept chunk, once its last page has been served."""
+    with self._lock:
+      if (user, statement_id) in self._chunks:
+        self._drop((user, statement_id))
+
+  def stats(self) -> dict:
+    """Return the number and size of kept chunks and hit counters."""
+    with self._lock:
+      lookups = self.hits + self.misses
+      return {
+        'statements': len(self._chunks),
+        'bytes': self._bytes,
+        'max_bytes': self.max_bytes,
+        'hits': self.hits,
+        'misses': self.misses,
+        'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+        'evictions': self.evictions,
+      }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_chunk_cache() -> ResultChunkCache:
+  """Return the process-wide result chunk cache, configured from the environment."""
+  global _cache
+  if _cache is None:
+    with _cache_lock:
+      if _cache is None:
+        _cache = ResultChunkCache(
+          max_bytes=int(os.environ.get('MCP_RESULT_CHUNK_CACHE_BYTES', 64 * 1024 * 1024))
+        )
+  return _cache
@@ -0,0 +1,116 @@
+"""Cached MCP discovery document (prompts, tools and server name)."""
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+
+from fastmcp import FastMCP
+
+from server.services.prompt_registry import PromptRegistry
+
+
+def _describe(key: str, description: str | None) -> dict:
+  return {'name': key, 'description': description or key.replace('_', ' ').title()}
+
+
+class DiscoveryCache:
+  """Discovery document computed once and rebuilt only when it can have changed.
+
+  Prompt changes arrive through the prompt registry. Tools are fingerprinted
+  by the key and description of each tool the server lists, a cheap check
+  per request that catches tools added, removed or redescribed at runtime,
+  including those of mounted servers. Concurrent requests after a change
+  share one rebuild.
+  """
+
+  def __init__(self, mcp_server: FastMCP, servername: str, prompt_registry: PromptRegistry):
+    """Create a cache.
+
+    Args:
+        mcp_server: The FastMCP server whose prompts and tools are described
+        servername: Server name reported in the document
+        prompt_registry: Registry whose changes invalidate the document
+    """
+    self.mcp_server = mcp_server
+    self.servername = servername
+    self._snapshot = None
+    self._key = None
+    self._rebuild_lock = asyncio.Lock()
+    self._lock = threading.Lock()
+    self.version = 0
+    self.requests = 0
+    self.hits = 0
+    self.rebuilds = 0
+    self.not_modified = 0
+    self.last_rebuild_ms = None
+    self._prompt_registry = prompt_registry
+    prompt_registry.subscribe(lambda changed: self.invalidate())
+
+  async def _fingerprint(self) -> tuple:
+    tools = await self.mcp_server.get_tools()
+    described = tuple((key, tool.description) for key, tool in tools.items())
+    return (self._prompt_registry.version, described)
+
+  def invalidate(self) -> None:
+    """Force the next request to rebuild the document."""
+    with self._lock:
+      self._key = None
+
+  async def _build(self) -> dict:
+    prompts = await self.mcp_server.get_prompts()
+    tools = await self.mcp_server.get_tools()
+    return {
+      'prompts': [_describe(key, p.description) for key, p in prompts.items()],
+      'tools': [_describe(key, t.description) for key, t in tools.items()],
+      'servername': self.servername,
+    }
+
+  async def get(self) -> dict:
+    """Return the current snapshot as {'version', 'etag', 'document'}."""
+    with self._lock:
+      self.requests += 1
+    key = await self._fingerprint()
+    if self._snapshot is not None and self._key == key:
+      with self._lock:
+        self.hits += 1
+      return self._snapshot
+
+    async with self._rebuild_lock:
+      key = await self._fingerprint()
+      if self._snapshot is not None and self._key == key:
+        with self._lock:
+          self.hits += 1
+        return self._snapshot
+      start = time.perf_counter()
+      document = await self._build()
+      body = json.dumps(document, sort_keys=True, separators=(',', ':'))
+      etag = '"' + hashlib.sha256(body.encode()).hexdigest()[:32] + '"'
+      with self._lock:
+        if self._snapshot is None or self._snapshot['etag'] != etag:
+          self.version += 1
+        self._snapshot = {'version': self.version, 'etag': etag, 'document': document}
+        self._key = key
+        self.rebuilds += 1
+        self.last_rebuild_ms = round((time.perf_counter() - start) * 1000, 2)
+      return self._snapshot
+
+  def record_not_modified(self) -> None:
+    """Count a conditional request answered with 304."""
+    with self._lock:
+      self.not_modified += 1
+
+  def stats(self) -> dict:
+    """Return snapshot version and cache hit metrics."""
+    with self._lock:
+      return {
+        'version': self.version,
+        'etag': self._snapshot['etag'] if self._snapshot else None,
+        'requests': self.requests,
+        'hits': self.hits,
+        'rebuilds': self.rebuilds,
+        'hit_rate': round(self.hits / self.requests, 3) if self.requests else None,
+        'not_modified': self.not_modified,
+        'last_rebuild_ms': self.last_rebuild_ms,
+      }
@@ -0,0 +1,237 @@
+"""In-process metrics with Prometheus text exposition."""
+
+import sys
+import threading
+from bisect import bisect_left
+
+try:
+  import resource
+except ImportError:  # Windows
+  resource = None
+
+# Seconds; covers fast API calls up to long-running warehouse queries
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _escape(value) -> str:
+  return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = '') -> str:
+  pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+  if extra:
+    pairs.append(extra)
+  return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+  """Base for metrics whose values are sharded per thread.
+
+  Each thread only ever writes to its own shard, so recording takes no lock;
+  the lock is taken once per thread to register its shard and when a scrape
+  merges the shards. Shards of threads that have exited are folded into a
+  retired shard so short-lived threads do not accumulate.
+  """
+
+  kind = ''
+
+  def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+    self.name = name
+    self.documentation = documentation
+    self.labelnames = tuple(labelnames)
+    self._local = threading.local()
+    self._shards = []  # (thread, shard)
+    self._retired = {}
+    self._lock = threading.Lock()
+
+  def _shard(self) -> dict:
+    shard = getattr(self._local, 'shard', None)
+    if shard is None:
+      shard = self._local.shard = {}
+      with self._lock:
+        self._shards.append((threading.current_thread(), shard))
+    return shard
+
+  def _key(self, labels: dict) -> tuple:
+    return tuple(labels.get(name, '') for name in self.labelnames)
+
+  def _merge_into(self, target: dict, shard: dict) -> None:
+    raise NotImplementedError
+
+  def collect(self) -> dict:
+    """Return merged values keyed by label values."""
+    with self._lock:
+      live = []
+      for thread, shard in self._shards:
+        if thread.is_alive():
+          live.append((thread, shard))
+        else:
+          self._merge_into(self._retired, dict(shard))
+      self._shards = live
+      merged = {}
+      self._merge_into(merged, self._retired)
+      for _, shard in live:
+        # dict() copies atomically under the GIL while the owner keeps writing
+        self._merge_into(merged, dict(shard))
+      return merged
+
+
+class Counter(_Metric):
+  """Monotonically increasing count."""
+
+  kind = 'counter'
+
+  def inc(self, amount: float = 1, **labels) -> None:
+    """Add amount to the counter for the given labels."""
+    shard = self._shard()
+    key = self._key(labels)
+    shard[key] = shard.get(key, 0) + amount
+
+  def _merge_into(self, target: dict, shard: dict) -> None:
+    for key, value in shard.items():
+      target[key] = target.get(key, 0) + value
+
+  def render(self) -> list[str]:
+    """Return the exposition lines for this counter."""
+    return [
+      f'{self.name}{_format_labels(self.labelnames, key)} {value}'
+      for key, value in sorted(self.collect().items())
+    ]
+
+
+class Histogram(_Metric):
+  """Distribution of observed values in cumulative buckets."""
+
+  kind = 'histogram'
+
+  def __init__(
+    self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS
+  ):
+    super().__init__(name, documentation, labelnames)
+    self.buckets = tuple(sorted(buckets))
+
+  def observe(self, value: float, **labels) -> None:
+    """Record one observation for the given labels."""
+    shard = self._shard()
+    key = self._key(labels)
+    # Per-bucket counts followed by the +Inf count and the sum
+    counts = shard.get(key)
+    if counts is None:
+      counts = shard[key] = [0] * (len(self.buckets) + 2)
+    counts[bisect_left(self.buckets, value)] += 1
+    counts[-1] += value
+
+  def _merge_into(self, target: dict, shard: dict) -> None:
+    for key, counts in shard.items():
+      counts = list(counts)
+      existing = target.get(key)
+      target[key] = [a + b for a, b in zip(existing, counts)] if existing else counts
+
+  def render(self) -> list[str]:
+    """Return the exposition lines for this histogram."""
+    lines = []
+    for key, counts in sorted(self.collect().items()):
+      cumulative = 0
+      for bound, count in zip(self.buckets + ('+Inf',), counts[:-1]):
+        cumulative += count
+        le = f'le="{bound}"'
+        lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}')
+      labels = _format_labels(self.labelnames, key)
+      lines.append(f'{self.name}_sum{labels} {counts[-1]}')
+      lines.append(f'{self.name}_count{labels} {cumulative}')
+    return lines
+
+
+def _process_lines() -> list[str]:
+  """Exposition lines for the CPU time and peak memory of this process."""
+  if resource is None:
+    return []
+  usage = resource.getrusage(resource.RUSAGE_SELF)
+  # ru_maxrss is in kilobytes on Linux and bytes on macOS
+  max_rss = usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+  return [
+    '# HELP process_cpu_seconds_total User and system CPU time of the process.',
+    '# TYPE process_cpu_seconds_total counter',
+    f'process_cpu_seconds_total {usage.ru_utime + usage.ru_stime}',
+    '# HELP process_max_resident_memory_bytes Peak resident set size of the process.',
+    '# TYPE process_max_resident_memory_bytes gauge',
+    f'process_max_resident_memory_bytes {max_rss}',
+  ]
+
+
+class MetricsRegistry:
+  """Named metrics rendered together in the Prometheus text format."""
+
+  def __init__(self):
+    """Create an empty registry."""
+    self._metrics = {}
+    self._lock = threading.Lock()
+
+  def _register(self, metric: _Metric) -> _Metric:
+    with self._lock:
+      existing = self._metrics.get(metric.name)
+      if existing is not None:
+        return existing
+      self._metrics[metric.name] = metric
+      return metric
+
+  def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+    """Return the counter registered under name, creating it if needed."""
+    return self._register(Counter(name, documentation, labelnames))
+
+  def histogram(
+    self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS
+  ) -> Histogram:
+    """Return the histogram registered under name, creating it if needed."""
+    return self._register(Histogram(name, documentation, labelnames, buckets))
+
+  def render(self) -> str:
+    """Render every metric, and the process metrics, in the Prometheus text format."""
+    with self._lock:
+      metrics = list(self._metrics.values())
+    lines = []
+    for metric in metrics:
+      lines.append(f'# HELP {metric.name} {metric.documentation}')
+      lines.append(f'# TYPE {metric.name} {metric.kind}')
+      lines.extend(metric.render())
+    lines.extend(_process_lines())
+    return '\n'.join(lines) + '\n'
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+  """Return the process-wide metrics registry."""
+  return _registry
+
+
+TOOL_CALLS = _registry.counter('mcp_tool_calls_total', 'MCP tool calls.', ('tool',))
+TOOL_ERRORS = _registry.counter(
+  'mcp_tool_errors_total', 'MCP tool calls that raised or returned success=false.', ('tool',)
+)
+TOOL_LATENCY = _registry.histogram('mcp_tool_duration_seconds', 'MCP tool call latency.', ('tool',))
+HTTP_REQUESTS = _registry.counter(
+  'http_requests_total', 'HTTP requests by route template.', ('route', 'method', 'status')
+)
+HTTP_ERRORS = _registry.counter(
+  'http_request_errors_total', 'HTTP requests that failed with a 5xx.', ('route', 'method')
+)
+HTTP_LATENCY = _registry.histogram(
+  'http_request_duration_seconds', 'HTTP request latency.', ('route', 'method')
+)
+SQL_ADMISSION_WAIT = _registry.histogram(
+  'sql_admission_wait_seconds', 'Time queued for a warehouse slot.', ('warehouse',)
+)
+SQL_EXECUTE = _registry.histogram(
+  'sql_execute_seconds',
+  'execute_statement round trip, i.e. time waiting on the warehouse.',
+  ('warehouse',),
+)
+SQL_FETCH = _registry.histogram(
+  'sql_fetch_seconds', 'Time downloading and converting results.', ('operation',)
+)
+SQL_ROWS = _registry.counter('sql_rows_returned_total', 'Rows returned to callers.', ('operation',))
+SQL_BYTES = _registry.counter(
+  'sql_bytes_returned_total', 'Result bytes reported by the warehouse.', ('operation',)
+)
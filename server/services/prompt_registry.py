@@ -0,0 +1,226 @@
+"""In-memory prompt registry with hot reload of prompts/*.md."""
+
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Callable
+
+try:
+  from watchdog.events import FileSystemEventHandler
+  from watchdog.observers import Observer
+except ImportError:  # watchdog is optional, fall back to polling
+  FileSystemEventHandler = object
+  Observer = None
+
+
+def _etag(text: str) -> str:
+  return '"' + hashlib.sha256(text.encode()).hexdigest()[:32] + '"'
+
+
+def parse_prompt(path: Path) -> dict:
+  """Read a prompt file into the entry served by the API and the MCP server.
+
+  The description is the first line when it is a markdown heading, otherwise
+  the prompt name in title case.
+  """
+  content = path.read_text()
+  lines = content.strip().split('\n')
+  description = path.stem.replace('_', ' ').title()
+  if lines and lines[0].startswith('#'):
+    description = lines[0].strip('#').strip() or description
+  return {
+    'name': path.stem,
+    'description': description,
+    'filename': path.name,
+    'content': content,
+    'etag': _etag(content),
+  }
+
+
+class _ChangeHandler(FileSystemEventHandler):
+  def __init__(self, registry: 'PromptRegistry'):
+    self.registry = registry
+
+  def on_any_event(self, event) -> None:
+    paths = [getattr(event, 'src_path', ''), getattr(event, 'dest_path', '')]
+    if any(str(p).endswith('.md') for p in paths):
+      self.registry.schedule_reload()
+
+
+class PromptRegistry:
+  """Prompts parsed once and served from memory.
+
+  Files are re-read only when their mtime or size changes. A watchdog
+  observer (or a polling thread when watchdog is not installed) reloads the
+  directory on change; each effective change bumps version and notifies the
+  subscribers with the names that were added, changed or removed.
+  """
+
+  def __init__(self, directory: str = 'prompts', poll_interval: float = 2.0, debounce: float = 0.2):
+    """Create a registry.
+
+    Args:
+        directory: Directory holding the *.md prompt files
+        poll_interval: Seconds between directory scans when watchdog is unavailable
+        debounce: Seconds to wait after a file event before reloading
+    """
+    self.directory = Path(directory)
+    self.poll_interval = poll_interval
+    self.debounce = debounce
+    self._prompts = {}  # name -> entry
+    self._signatures = {}  # name -> (mtime_ns, size)
+    self._subscribers = []
+    self._lock = threading.RLock()
+    self._timer = None
+    self._observer = None
+    self._poller = None
+    self._stop = threading.Event()
+    self.version = 0
+    self.etag = _etag('')
+    self.reloads = 0
+    self.reload_errors = 0
+    self.reload()
+
+  def reload(self) -> set[str]:
+    """Rescan the directory and re-parse changed files.
+
+    Returns:
+        Names of prompts that were added, changed or removed
+    """
+    with self._lock:
+      files = {p.stem: p for p in self.directory.glob('*.md')} if self.directory.exists() else {}
+      changed = set(self._prompts) - set(files)
+      for name in changed:
+        del self._prompts[name]
+        del self._signatures[name]
+
+      for name, path in files.items():
+        try:
+          stat = path.stat()
+          signature = (stat.st_mtime_ns, stat.st_size)
+          if self._signatures.get(name) == signature:
+            continue
+          entry = parse_prompt(path)
+        except (OSError, UnicodeDecodeError) as e:
+          # Keep serving the last good version, the next event retries
+          self.reload_errors += 1
+          print(f'⚠️ Failed to load prompt {path}: {str(e)}')
+          continue
+        self._signatures[name] = signature
+        previous = self._prompts.get(name)
+        # A touched but unchanged file is not a change
+        if previous is None or previous['etag'] != entry['etag']:
+          self._prompts[name] = entry
+          changed.add(name)
+
+      self.reloads += 1
+      if not changed:
+        return changed
+      self.version += 1
+      self.etag = _etag('\n'.join(f'{n}:{e["etag"]}' for n, e in sorted(self._prompts.items())))
+      subscribers = list(self._subscribers)
+
+    if self.reloads > 1:
+      print(f'🔄 Reloaded prompts: {", ".join(sorted(changed))}')
+    for callback in subscribers:
+      try:
+        callback(changed)
+      except Exception as e:
+        print(f'⚠️ Prompt change subscriber failed: {str(e)}')
+    return changed
+
+  def schedule_reload(self) -> None:
+    """Reload after the debounce delay, coalescing bursts of file events."""
+    with self._lock:
+      if self._timer is not None:
+        self._timer.cancel()
+      self._timer = threading.Timer(self.debounce, self._safe_reload)
+      self._timer.daemon = True
+      self._timer.start()
+
+  def _safe_reload(self) -> None:
+    try:
+      self.reload()
+    except Exception as e:
+      self.reload_errors += 1
+      print(f'⚠️ Prompt reload failed: {str(e)}')
+
+  def _poll_loop(self) -> None:
+    while not self._stop.wait(self.poll_interval):
+      self._safe_reload()
+
+  def subscribe(self, callback: Callable[[set[str]], None]) -> None:
+    """Call callback(changed_names) after every reload that changed something."""
+    with self._lock:
+      self._subscribers.append(callback)
+
+  def list(self) -> list[dict]:
+    """Return all prompt entries sorted by name."""
+    with self._lock:
+      return [self._prompts[name] for name in sorted(self._prompts)]
+
+  def get(self, name: str) -> dict | None:
+    """Return the entry for a prompt, accepting an optional .md suffix."""
+    with self._lock:
+      return self._prompts.get(name) or self._prompts.get(name.removesuffix('.md'))
+
+  def start(self) -> None:
+    """Start watching the directory for changes if not already watching."""
+    with self._lock:
+      if self._observer is not None or (self._poller is not None and self._poller.is_alive()):
+        return
+      self._stop.clear()
+      if Observer is not None and self.directory.exists():
+        self._observer = Observer()
+        self._observer.schedule(_ChangeHandler(self), str(self.directory), recursive=False)
+        self._observer.daemon = True
+        self._observer.start()
+      else:
+        self._poller = threading.Thread(target=self._poll_loop, name='prompt-poller', daemon=True)
+        self._poller.start()
+
+  def stop(self) -> None:
+    """Stop watching the directory."""
+    with self._lock:
+      self._stop.set()
+      if self._observer is not None:
+        self._observer.stop()
+        self._observer = None
+      if self._timer is not None:
+        self._timer.cancel()
+
+  def stats(self) -> dict:
+    """Return prompt count, version and reload counters."""
+    with self._lock:
+      return {
+        'prompts': len(self._prompts),
+        'version': self.version,
+        'etag': self.etag,
+        'reloads': self.reloads,
+        'reload_errors': self.reload_errors,
+        'watcher': 'watchdog'
+        if self._observer is not None
+        else 'polling'
+        if self._poller is not None
+        else None,
+      }
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_prompt_registry() -> PromptRegistry:
+  """Return the process-wide prompt registry, configured from the environment."""
+  global _registry
+  if _registry is None:
+    with _registry_lock:
+      if _registry is None:
+        _registry = PromptRegistry(
+          directory=os.environ.get('MCP_PROMPTS_DIR', 'prompts'),
+          poll_interval=float(os.environ.get('MCP_PROMPTS_POLL_SECONDS', 2)),
+        )
+        if os.environ.get('MCP_PROMPTS_HOT_RELOAD', 'true').lower() in ('1', 'true', 'yes'):
+          _registry.start()
+  return _registry
@@ -0,0 +1,178 @@
+"""TTL + byte-bounded LRU cache for SQL query results."""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import orjson
+
+from server.serialization import tool_serializer
+
+# Whitespace outside of quoted literals/identifiers is collapsed, literals are kept as is
+_TOKEN_RE = re.compile(r"('(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|`[^`]*`)|\s+")
+_READ_ONLY_RE = re.compile(r'^\(*\s*(select|with|show|describe|desc|explain)\b', re.IGNORECASE)
+# Literals, quoted identifiers and comments, which may hold anything without it being SQL
+_OPAQUE_RE = re.compile(
+  r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|`[^`]*`|--[^\n]*|/\*.*?\*/", re.DOTALL
+)
+# A CTE can precede a write: WITH src AS (...) INSERT INTO / MERGE INTO ...
+_WRITE_RE = re.compile(
+  r'\b(insert|update|delete|merge|create|drop|alter|truncate|copy|optimize|vacuum|grant|revoke)\b',
+  re.IGNORECASE,
+)
+
+
+def normalize_sql(query: str) -> str:
+  """Normalize SQL text for cache keys: collapse whitespace and drop trailing semicolons."""
+  normalized = _TOKEN_RE.sub(lambda m: m.group(1) or ' ', query).strip()
+  return normalized.rstrip(';').rstrip()
+
+
+def is_cacheable_query(query: str) -> bool:
+  """Only read-only statements are cached.
+
+  A WITH statement counts as read-only only if it holds no write keyword
+  outside literals and comments (WITH ... INSERT or MERGE writes), and text
+  holding more than one statement never does.
+  """
+  match = _READ_ONLY_RE.match(query)
+  if not match:
+    return False
+  code = _OPAQUE_RE.sub(' ', query).strip().rstrip(';')
+  if ';' in code:
+    return False
+  return match.group(1).lower() != 'with' or not _WRITE_RE.search(code)
+
+
+class QueryResultCache:
+  """Cache of tool responses keyed on normalized SQL and execution context.
+
+  Entries expire after ttl_seconds; when the total serialized size exceeds
+  max_bytes the least recently used entries are evicted. Values are stored
+  serialized, so callers always get their own copy back.
+  """
+
+  def __init__(self, ttl_seconds: float = 300, max_bytes: int = 64 * 1024 * 1024):
+    """Create a cache.
+
+    Args:
+        ttl_seconds: Lifetime of each entry, 0 disables caching
+        max_bytes: Total serialized size budget across entries
+    """
+    self.ttl_seconds = ttl_seconds
+    self.max_bytes = max_bytes
+    self._entries = OrderedDict()  # key -> (payload, stored_at)
+    self._bytes = 0
+    self._lock = threading.Lock()
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+
+  @property
+  def enabled(self) -> bool:
+    """Whether the cache stores anything at all."""
+    return self.ttl_seconds > 0 and self.max_bytes > 0
+
+  @staticmethod
+  def make_key(query: str, warehouse_id: str, catalog: str, schema: str, *options) -> tuple:
+    """Build a cache key from the statement and everything that shapes its result."""
+    return (normalize_sql(query), warehouse_id, catalog or '', schema or '', *options)
+
+  def _drop(self, key) -> None:
+    payload, _ = self._entries.pop(key)
+    self._bytes -= len(payload)
+
+  def get(self, key) -> tuple[dict, float] | None:
+    """Return (value, age_seconds) for a live entry, or None."""
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None:
+        self.misses += 1
+        return None
+      payload, stored_at = entry
+      age = time.monotonic() - stored_at
+      if age > self.ttl_seconds:
+        self._drop(key)
+        self.evictions += 1
+        self.misses += 1
+        return None
+      self._entries.move_to_end(key)
+      self.hits += 1
+    return orjson.loads(payload), age
+
+  def put(self, key, value: dict) -> None:
+    """Store a value, evicting least recently used entries beyond the byte budget."""
+    if not self.enabled:
+      return
+    payload = tool_serializer(value).encode()
+    if len(payload) > self.max_bytes:
+      return
+    with self._lock:
+      if key in self._entries:
+        self._drop(key)
+      self._entries[key] = (payload, time.monotonic())
+      self._bytes += len(payload)
+      while self._bytes > self.max_bytes:
+        self._drop(next(iter(self._entries)))
+        self.evictions += 1
+
+  def invalidate(self, table: str = None, prefix: str = None) -> int:
+    """Drop entries whose SQL references table or starts with prefix (all if neither).
+
+    Args:
+        table: Table name, matched as a whole identifier anywhere in the SQL
+            (so 'orders' also matches 'sales.orders')
+        prefix: Normalized SQL prefix, matched case-insensitively
+
+    Returns:
+        Number of entries removed
+    """
+    table_re = None
+    if table:
+      table_re = re.compile(r'(?<!\w)' + re.escape(table.replace('`', '').lower()) + r'(?!\w)')
+    prefix = normalize_sql(prefix).lower() if prefix else None
+
+    with self._lock:
+      doomed = []
+      for key in self._entries:
+        sql = key[0].replace('`', '').lower()
+        if table_re and not table_re.search(sql):
+          continue
+        if prefix and not sql.startswith(prefix):
+          continue
+        doomed.append(key)
+      for key in doomed:
+        self._drop(key)
+      return len(doomed)
+
+  def stats(self) -> dict:
+    """Return hit/miss counters and current usage."""
+    with self._lock:
+      return {
+        'entries': len(self._entries),
+        'bytes': self._bytes,
+        'max_bytes': self.max_bytes,
+        'ttl_seconds': self.ttl_seconds,
+        'hits': self.hits,
+        'misses': self.misses,
+        'evictions': self.evictions,
+      }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_query_cache() -> QueryResultCache:
+  """Return the process-wide query result cache, configured from the environment."""
+  global _cache
+  if _cache is None:
+    with _cache_lock:
+      if _cache is None:
+        _cache = QueryResultCache(
+          ttl_seconds=float(os.environ.get('MCP_QUERY_CACHE_TTL_SECONDS', 300)),
+          max_bytes=int(os.environ.get('MCP_QUERY_CACHE_MAX_BYTES', 64 * 1024 * 1024)),
+        )
+  return _cache
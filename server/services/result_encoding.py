@@ -0,0 +1,76 @@
+"""Compact column-oriented encoding for inline JSON_ARRAY statement results."""
+
+from databricks.sdk.service.sql import ColumnInfo
+
+_INT_TYPES = {'BYTE', 'SHORT', 'INT', 'LONG'}
+_FLOAT_TYPES = {'FLOAT', 'DOUBLE'}
+
+
+def _to_bool(value: str) -> bool:
+  return value.lower() == 'true'
+
+
+def _converter(column: ColumnInfo):
+  """Return the cast applied to a column's string cells, or None to keep strings.
+
+  DECIMAL stays a string so no precision is lost.
+  """
+  type_name = column.type_name.value if column.type_name else 'STRING'
+  if type_name in _INT_TYPES:
+    return int
+  if type_name in _FLOAT_TYPES:
+    return float
+  if type_name == 'BOOLEAN':
+    return _to_bool
+  return None
+
+
+def _dictionary_encode(values: list) -> tuple[list, list] | None:
+  """Encode values as (dictionary, indices) when that is smaller, else None."""
+  dictionary = {}
+  indices = []
+  for value in values:
+    if value is None:
+      indices.append(None)
+      continue
+    index = dictionary.get(value)
+    if index is None:
+      index = dictionary[value] = len(dictionary)
+    indices.append(index)
+    if len(dictionary) * 2 > len(values):
+      return None
+  return list(dictionary), indices
+
+
+def encode_columnar(columns: list[ColumnInfo], rows: list, dictionary_encode: bool = False) -> dict:
+  """Encode row-major string cells as typed per-column arrays.
+
+  Args:
+      columns: Column schema from the statement manifest
+      rows: Row-major cells as returned in data_array
+      dictionary_encode: Replace repetitive string columns with indices into a
+          per-column dictionary
+
+  Returns:
+      Dictionary with columns, types, arrays and (optionally) dictionaries
+  """
+  arrays = [list(values) for values in zip(*rows)] if rows else [[] for _ in columns]
+  dictionaries = {}
+
+  for i, column in enumerate(columns):
+    convert = _converter(column)
+    if convert is not None:
+      arrays[i] = [None if value is None else convert(value) for value in arrays[i]]
+    elif dictionary_encode:
+      encoded = _dictionary_encode(arrays[i])
+      if encoded is not None:
+        dictionaries[column.name], arrays[i] = encoded
+
+  data = {
+    'columns': [column.name for column in columns],
+    'types': [column.type_name.value if column.type_name else 'STRING' for column in columns],
+    'arrays': arrays,
+  }
+  if dictionaries:
+    data['dictionaries'] = dictionaries
+  return data
@@ -0,0 +1,176 @@
+"""Single-flight coalescing of identical concurrent calls."""
+
+import asyncio
+import copy
+import threading
+
+
+class SharedCallError(Exception):
+  """Raised to a follower when the leader's exception cannot be copied; chains it."""
+
+
+class _Call:
+  """An in-flight call that followers wait on."""
+
+  def __init__(self):
+    self.done = threading.Event()
+    self.waiters = 0
+    self.result = None  # Private snapshot, only set when there are waiters
+    self.error = None
+    self.cancelled = False  # The leader's task was cancelled, not the call
+    self.futures = []  # (loop, future) of followers waiting in coroutines
+
+  def finish(self) -> None:
+    self.done.set()
+    for loop, future in self.futures:
+      loop.call_soon_threadsafe(_resolve, future)
+
+
+def _resolve(future: asyncio.Future) -> None:
+  if not future.done():
+    future.set_result(None)
+
+
+def _fresh_error(error: Exception) -> Exception:
+  """A new exception of error's type and attributes, for one follower to raise.
+
+  Raising the leader's instance from every follower would share one traceback
+  that grows with each raise. The copy skips __init__, whose signature may not
+  match the exception's args.
+  """
+  cls = type(error)
+  try:
+    fresh = cls.__new__(cls, *error.args)
+    fresh.__dict__.update(error.__dict__)
+  except Exception:
+    return SharedCallError(f'The shared call failed: {error}')
+  return fresh
+
+
+class SingleFlight:
+  """Runs at most one call per key at a time and shares its result.
+
+  The first caller for a key executes the function; callers arriving with the
+  same key while it runs block until it finishes and receive a copy of its
+  result, or a new exception of the same type chained to its exception.
+  do_async() does the same for coroutines, whose followers wait on the event
+  loop instead of blocking a thread; if the leader's task is cancelled, its
+  followers run the call again, the first of them leading.
+  """
+
+  def __init__(self):
+    """Create an empty single-flight group."""
+    self._calls = {}
+    self._lock = threading.Lock()
+    self.executions = 0
+    self.shared = 0
+
+  def do(self, key, fn) -> tuple:
+    """Run fn for key, or wait for the identical call already in flight.
+
+    Args:
+        key: Hashable identity of the call
+        fn: Zero-argument callable to execute
+
+    Returns:
+        Tuple of (result, shared), shared is True if another caller executed fn
+    """
+    with self._lock:
+      call = self._calls.get(key)
+      leader = call is None
+      if leader:
+        call = self._calls[key] = _Call()
+      else:
+        call.waiters += 1
+
+    if not leader:
+      call.done.wait()
+      return self._follow(call)
+
+    result = None
+    try:
+      result = fn()
+      return result, False
+    except Exception as e:
+      call.error = e
+      raise
+    finally:
+      self._finish(key, call, result)
+
+  async def do_async(self, key, fn) -> tuple:
+    """Await fn() for key, or wait for the identical call already in flight.
+
+    Args:
+        key: Hashable identity of the call
+        fn: Zero-argument coroutine function to execute
+
+    Returns:
+        Tuple of (result, shared), shared is True if another caller executed fn
+    """
+    while True:
+      with self._lock:
+        call = self._calls.get(key)
+        leader = call is None
+        if leader:
+          call = self._calls[key] = _Call()
+        else:
+          call.waiters += 1
+          future = asyncio.get_running_loop().create_future()
+          call.futures.append((future.get_loop(), future))
+
+      if leader:
+        break
+      await future
+      if not call.cancelled:
+        return self._follow(call)
+      # Nobody cancelled this caller, so run the call again instead of failing
+
+    result = None
+    try:
+      result = await fn()
+      return result, False
+    except Exception as e:
+      call.error = e
+      raise
+    except asyncio.CancelledError:
+      call.cancelled = True
+      raise
+    finally:
+      self._finish(key, call, result)
+
+  def _follow(self, call: _Call) -> tuple:
+    """Return a follower's copy of the leader's result, or raise its error anew."""
+    with self._lock:
+      self.shared += 1
+    if call.error is not None:
+      raise _fresh_error(call.error) from call.error
+    # Followers get their own copy so callers can annotate results freely
+    return copy.deepcopy(call.result), True
+
+  def _finish(self, key, call: _Call, result) -> None:
+    """Retire the leader's call and wake its followers."""
+    with self._lock:
+      del self._calls[key]
+      self.executions += 1
+      waiters = call.waiters
+    if waiters and call.error is None and not call.cancelled:
+      # Snapshot before the leader's caller can annotate its result
+      call.result = copy.deepcopy(result)
+    call.finish()
+
+  def stats(self) -> dict:
+    """Return execution counters, 'saved' is the number of executions avoided."""
+    with self._lock:
+      return {
+        'in_flight': len(self._calls),
+        'executions': self.executions,
+        'saved': self.shared,
+      }
+
+
+_query_flight = SingleFlight()
+
+
+def get_query_flight() -> SingleFlight:
+  """Return the process-wide single-flight group for SQL queries."""
+  return _query_flight
@@ -0,0 +1,519 @@
+"""Statement service for Databricks SQL statement execution."""
+
+import base64
+import json
+import os
+import time
+
+from databricks.sdk import WorkspaceClient
+from databricks.sdk.service.sql import (
+  Disposition,
+  ExecuteStatementRequestOnWaitTimeout,
+  Format,
+  ResultData,
+  StatementResponse,
+  StatementState,
+)
+
+from server.services.admission import (
+  AdmissionController,
+  AdmissionRejected,
+  get_admission_controller,
+)
+from server.services.arrow_results import ArrowResultFetcher, table_to_columnar, write_parquet
+from server.services.blocking import run_blocking
+from server.services.chunk_cache import ResultChunkCache, get_chunk_cache
+from server.services.metrics import SQL_ADMISSION_WAIT, SQL_BYTES, SQL_EXECUTE, SQL_FETCH, SQL_ROWS
+from server.services.result_cache import QueryResultCache, get_query_cache, is_cacheable_query
+from server.services.result_encoding import encode_columnar
+from server.services.single_flight import SingleFlight, get_query_flight
+from server.services.tracing import trace_span
+
+# States after which a statement will not change any more
+TERMINAL_STATES = {
+  StatementState.SUCCEEDED,
+  StatementState.FAILED,
+  StatementState.CANCELED,
+  StatementState.CLOSED,
+}
+
+# 'rows' and 'columnar' are inline JSON; 'arrow' and 'parquet' use EXTERNAL_LINKS + ARROW_STREAM
+RESULT_FORMATS = ('rows', 'columnar', 'arrow', 'parquet')
+ARROW_RESULT_FORMATS = ('arrow', 'parquet')
+
+# Rows a statement may produce when the caller gives no max_rows. INLINE results
+# are limited to 25 MiB by the warehouse, so an uncapped large result fails.
+DEFAULT_MAX_ROWS = int(os.environ.get('MCP_RESULT_MAX_ROWS', 10000))
+
+
+def _record_result(operation: str, result: dict, byte_count: int | None, started: float) -> None:
+  """Record fetch time, rows and bytes of a formatted result."""
+  SQL_FETCH.observe(time.perf_counter() - started, operation=operation)
+  SQL_ROWS.inc(result.get('row_count') or 0, operation=operation)
+  if byte_count:
+    SQL_BYTES.inc(byte_count, operation=operation)
+
+
+def _byte_count(response: StatementResponse) -> int | None:
+  """Bytes of the result as reported by the warehouse, if known."""
+  if response.result is not None and response.result.byte_count:
+    return response.result.byte_count
+  return response.manifest.total_byte_count if response.manifest else None
+
+
+def _row_limit(limit: int, max_rows: int | None, result_format: str) -> int:
+  """Rows the warehouse may produce.
+
+  Arrow results are not paged, so limit caps them. Paged results are capped
+  by max_rows, or by DEFAULT_MAX_ROWS (never below the first page) without it.
+  """
+  if result_format in ARROW_RESULT_FORMATS:
+    return limit if max_rows is None else min(limit, max_rows)
+  return max_rows if max_rows is not None else max(limit, DEFAULT_MAX_ROWS)
+
+
+def encode_page_token(statement_id: str, chunk_index: int, offset: int) -> str:
+  """Encode a position in a statement result as an opaque continuation token."""
+  payload = json.dumps({'s': statement_id, 'c': chunk_index, 'o': offset}, separators=(',', ':'))
+  return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_page_token(page_token: str) -> tuple[str, int, int]:
+  """Decode a continuation token into (statement_id, chunk_index, offset)."""
+  try:
+    payload = json.loads(base64.urlsafe_b64decode(page_token.encode()))
+    return payload['s'], int(payload['c']), int(payload['o'])
+  except Exception:
+    raise ValueError('Invalid page token') from None
+
+
+class StatementService:
+  """Service for submitting, polling and fetching SQL statements."""
+
+  def __init__(
+    self,
+    client: WorkspaceClient,
+    cache: QueryResultCache = None,
+    flight: SingleFlight = None,
+    admission: AdmissionController = None,
+    user: str = None,
+    chunks: ResultChunkCache = None,
+  ):
+    """Initialize the statement service with a Databricks workspace client.
+
+    user is the workspace user Parquet artifacts are written for; only they
+    can download them. Result chunks kept for paging are also kept per user.
+    """
+    self.client = client
+    self.cache = cache or get_query_cache()
+    self.flight = flight or get_query_flight()
+    self.admission = admission or get_admission_controller()
+    self.user = user
+    self.chunks = chunks or get_chunk_cache()
+
+  @staticmethod
+  def build_statement(query: str, catalog: str = None, schema: str = None) -> str:
+    """Build the full statement text with catalog/schema if provided."""
+    if catalog and schema:
+      return f'USE CATALOG {catalog}; USE SCHEMA {schema}; {query}'
+    return query
+
+  def execute(
+    self,
+    warehouse_id: str,
+    query: str,
+    catalog: str = None,
+    schema: str = None,
+    wait_timeout: str = '30s',
+    row_limit: int = None,
+    result_format: str = 'rows',
+  ) -> StatementResponse:
+    """Execute a statement, waiting up to wait_timeout for it to finish.
+
+    Statements still running after the timeout keep running on the warehouse
+    and can be polled with get_status/fetch. row_limit is applied by the
+    warehouse, so rows beyond it are never produced or transferred.
+    """
+    if result_format not in RESULT_FORMATS:
+      raise ValueError(f'Unknown result_format {result_format!r}, expected one of {RESULT_FORMATS}')
+
+    arrow = result_format in ARROW_RESULT_FORMATS
+    with trace_span(
+      'databricks.execute_statement', warehouse_id=warehouse_id, wait_timeout=wait_timeout
+    ) as span:
+      response = self.client.statement_execution.execute_statement(
+        warehouse_id=warehouse_id,
+        statement=self.build_statement(query, catalog, schema),
+        wait_timeout=wait_timeout,
+        on_wait_timeout=ExecuteStatementRequestOnWaitTimeout.CONTINUE,
+        row_limit=row_limit,
+        disposition=Disposition.EXTERNAL_LINKS if arrow else None,
+        format=Format.ARROW_STREAM if arrow else None,
+      )
+      if span is not None:
+        span.set_attribute('statement_id', response.statement_id)
+        state = self.state_of(response)
+        span.set_attribute('state', state.value if state else None)
+      return response
+
+  def submit(
+    self,
+    warehouse_id: str,
+    query: str,
+    catalog: str = None,
+    schema: str = None,
+    row_limit: int = None,
+    result_format: str = 'rows',
+  ) -> StatementResponse:
+    """Submit a statement and return immediately without waiting for results."""
+    return self.execute(
+      warehouse_id,
+      query,
+      catalog,
+      schema,
+      wait_timeout='0s',
+      row_limit=row_limit,
+      result_format=result_format,
+    )
+
+  async def query(
+    self,
+    warehouse_id: str,
+    query: str,
+    catalog: str = None,
+    schema: str = None,
+    limit: int = 100,
+    async_mode: bool = False,
+    result_format: str = 'rows',
+    dictionary_encode: bool = False,
+    use_cache: bool = True,
+    caller: str = None,
+    max_rows: int = None,
+  ) -> dict:
+    """Run a query end to end and return the tool response.
+
+    limit is the size of the first page, the rest is fetched with
+    next_page_token; max_rows caps the rows the warehouse produces at all,
+    DEFAULT_MAX_ROWS when it is not given.
+
+    Finished results of read-only queries, other than Parquet artifacts, are
+    served from and stored in the query result cache unless use_cache is
+    False. Every response carries a 'cache' entry describing whether it was a
+    hit, miss or bypass. Identical read-only queries running concurrently
+    share a single execution, and the callers that waited on another's
+    execution get 'coalesced': True.
+
+    Every execution, async submissions included, takes a slot from the
+    warehouse's admission controller, queued fairly per caller; when the
+    warehouse is saturated the response is an error with retry_after_seconds.
+    A statement still running when this returns keeps its slot until
+    get_status, fetch or cancel sees it finish. Waiting for a slot or for a coalesced
+    execution happens on the event loop; only the SDK calls of an admitted
+    statement run on the blocking executor.
+    """
+    read_only = not async_mode and is_cacheable_query(query)
+    # Artifacts are not cached, their files may be swept before the entry expires
+    cacheable = read_only and use_cache and self.cache.enabled and result_format != 'parquet'
+    # Artifacts belong to a user, so only that user's identical queries may share one
+    owner = self.user if result_format == 'parquet' else None
+    key = self.cache.make_key(
+      query, warehouse_id, catalog, schema, limit, max_rows, result_format, dictionary_encode, owner
+    )
+    row_limit = _row_limit(limit, max_rows, result_format)
+    if cacheable:
+      cached = self.cache.get(key)
+      if cached is not None:
+        result, age = cached
+        result['cache'] = {'status': 'hit', 'age_seconds': round(age, 3)}
+        return result
+
+    async def run() -> dict:
+      queued_at = time.monotonic()
+      with trace_span('sql.admission_wait', warehouse_id=warehouse_id):
+        await self.admission.acquire_async(warehouse_id, caller)
+      admitted_at = time.monotonic()
+      SQL_ADMISSION_WAIT.observe(admitted_at - queued_at, warehouse=warehouse_id)
+      result = None
+      try:
+        result = await run_blocking(
+          self._run,
+          warehouse_id,
+          query,
+          catalog,
+          schema,
+          limit,
+          row_limit,
+          async_mode,
+          result_format,
+          dictionary_encode,
+        )
+      finally:
+        if result is not None and result.get('done') is False:
+          # Still running on the warehouse: the slot is freed once a terminal state is seen
+          self.admission.hold(warehouse_id, result['statement_id'], admitted_at)
+        else:
+          self.admission.release(warehouse_id, time.monotonic() - admitted_at)
+      if cacheable and result.get('success') and 'data' in result:
+        self.cache.put(key, result)
+      return result
+
+    try:
+      if read_only:
+        result, shared = await self.flight.do_async(key, run)
+        if shared:
+          result['coalesced'] = True
+      else:
+        result = await run()
+    except AdmissionRejected as e:
+      return {
+        'success': False,
+        'error': f'Error: {str(e)}',
+        'retry_after_seconds': e.retry_after,
+      }
+
+    result['cache'] = {'status': 'miss' if cacheable else 'bypass'}
+    return result
+
+  def _run(
+    self,
+    warehouse_id: str,
+    query: str,
+    catalog: str,
+    schema: str,
+    limit: int,
+    row_limit: int | None,
+    async_mode: bool,
+    result_format: str,
+    dictionary_encode: bool,
+  ) -> dict:
+    """Execute (or submit) a statement and format the response."""
+    if async_mode:
+      return self.format_status(
+        self.submit(
+          warehouse_id, query, catalog, schema, row_limit=row_limit, result_format=result_format
+        )
+      )
+
+    # Execute the query, leaving it running on the warehouse if it outlives the wait
+    started = time.perf_counter()
+    response = self.execute(
+      warehouse_id, query, catalog, schema, row_limit=row_limit, result_format=result_format
+    )
+    SQL_EXECUTE.observe(time.perf_counter() - started, warehouse=warehouse_id)
+    if self.state_of(response) not in TERMINAL_STATES:
+      result = self.format_status(response)
+      result['message'] = 'Query still running, poll with fetch_statement_result'
+      return result
+    started = time.perf_counter()
+    with trace_span('sql.format_result', result_format=result_format) as span:
+      result = self.format_result(response, limit, result_format, dictionary_encode)
+      if span is not None:
+        span.set_attribute('row_count', result.get('row_count'))
+    _record_result('execute', result, _byte_count(response), started)
+    return result
+
+  def get_status(self, statement_id: str) -> dict:
+    """Get the current state of a statement."""
+    with trace_span('databricks.get_statement', statement_id=statement_id):
+      response = self.client.statement_execution.get_statement(statement_id)
+    self._settle_if_done(response)
+    return self.format_status(response)
+
+  def fetch(
+    self,
+    statement_id: str,
+    limit: int = 100,
+    result_format: str = 'rows',
+    dictionary_encode: bool = False,
+  ) -> dict:
+    """Fetch the results of a statement, or its state if it has not finished."""
+    started = time.perf_counter()
+    with trace_span('databricks.get_statement', statement_id=statement_id):
+      response = self.client.statement_execution.get_statement(statement_id)
+    self._settle_if_done(response)
+    if self.state_of(response) != StatementState.SUCCEEDED:
+      return self.format_status(response)
+    with trace_span('sql.format_result', result_format=result_format):
+      result = self.format_result(response, limit, result_format, dictionary_encode)
+    _record_result('fetch', result, _byte_count(response), started)
+    return result
+
+  def fetch_page(
+    self,
+    page_token: str,
+    limit: int = 100,
+    result_format: str = 'rows',
+    dictionary_encode: bool = False,
+  ) -> dict:
+    """Fetch the next page of rows from a continuation token.
+
+    Only the result chunk the token points at is fetched, so large results are
+    walked chunk by chunk instead of being loaded at once. The chunk is kept
+    for this user until its last page is served, so the pages of one chunk
+    cost a single download.
+    """
+    statement_id, chunk_index, offset = decode_page_token(page_token)
+    started = time.perf_counter()
+    columns = self.chunks.columns(self.user, statement_id)
+    if columns is None:
+      with trace_span('databricks.get_statement', statement_id=statement_id):
+        response = self.client.statement_execution.get_statement(statement_id)
+      columns = response.manifest.schema.columns
+      self.chunks.remember_columns(self.user, statement_id, columns)
+
+    chunk = self.chunks.get(self.user, statement_id, chunk_index)
+    downloaded = chunk is None
+    if downloaded:
+      with trace_span(
+        'databricks.get_statement_result_chunk_n',
+        statement_id=statement_id,
+        chunk_index=chunk_index,
+      ):
+        chunk = self.client.statement_execution.get_statement_result_chunk_n(
+          statement_id, chunk_index
+        )
+    with trace_span('sql.format_page', result_format=result_format, cached=not downloaded):
+      result = self._page(
+        statement_id, columns, chunk, offset, limit, result_format, dictionary_encode
+      )
+    if offset + limit < len(chunk.data_array or ()):
+      if downloaded:
+        self.chunks.put(self.user, statement_id, chunk)
+    else:
+      self.chunks.forget(self.user, statement_id)
+    _record_result('page', result, chunk.byte_count if downloaded else None, started)
+    return result
+
+  def cancel(self, statement_id: str) -> dict:
+    """Request cancellation of a running statement."""
+    with trace_span('databricks.cancel_execution', statement_id=statement_id):
+      self.client.statement_execution.cancel_execution(statement_id)
+    # A cancelled statement stops using the warehouse, its slot can go to the next caller
+    self.admission.settle(statement_id)
+    return {'success': True, 'statement_id': statement_id, 'state': 'CANCEL_REQUESTED'}
+
+  def _settle_if_done(self, response: StatementResponse) -> None:
+    """Free the admission slot of a statement seen in a terminal state."""
+    if self.state_of(response) in TERMINAL_STATES:
+      self.admission.settle(response.statement_id)
+
+  @staticmethod
+  def state_of(response: StatementResponse) -> StatementState | None:
+    """Return the statement state from a response, if any."""
+    return response.status.state if response.status else None
+
+  @classmethod
+  def format_status(cls, response: StatementResponse) -> dict:
+    """Format a statement response as a status dictionary."""
+    state = cls.state_of(response)
+    status = {
+      'success': state not in (StatementState.FAILED, StatementState.CANCELED),
+      'statement_id': response.statement_id,
+      'state': state.value if state else 'UNKNOWN',
+      'done': state in TERMINAL_STATES,
+    }
+    if response.status and response.status.error:
+      status['error'] = f'Error: {response.status.error.message}'
+    if response.manifest and response.manifest.total_row_count is not None:
+      status['total_row_count'] = response.manifest.total_row_count
+    return status
+
+  def format_result(
+    self,
+    response: StatementResponse,
+    limit: int = 100,
+    result_format: str = 'rows',
+    dictionary_encode: bool = False,
+  ) -> dict:
+    """Format a finished statement response as query results."""
+    state = self.state_of(response)
+    if state is not None and state != StatementState.SUCCEEDED:
+      return self.format_status(response)
+
+    if response.manifest and response.manifest.format == Format.ARROW_STREAM:
+      return self.format_arrow_result(response, result_format)
+
+    if response.result and response.result.data_array:
+      columns = response.manifest.schema.columns
+      self.chunks.remember_columns(self.user, response.statement_id, columns)
+      page = self._page(
+        response.statement_id,
+        columns,
+        response.result,
+        0,
+        limit,
+        result_format,
+        dictionary_encode,
+      )
+      if limit < len(response.result.data_array):
+        # The next page starts in this chunk, keep it for fetch_page
+        self.chunks.put(self.user, response.statement_id, response.result)
+      if response.manifest.total_row_count is not None:
+        page['total_row_count'] = response.manifest.total_row_count
+      if response.manifest.truncated:
+        page['truncated'] = True
+      return page
+    else:
+      return {
+        'success': True,
+        'statement_id': response.statement_id,
+        'data': {'message': 'Query executed successfully with no results'},
+        'row_count': 0,
+      }
+
+  def format_arrow_result(self, response: StatementResponse, result_format: str = 'arrow') -> dict:
+    """Download ARROW_STREAM chunks and return them columnar or as a Parquet artifact."""
+    with trace_span('databricks.download_arrow_chunks', statement_id=response.statement_id):
+      table = ArrowResultFetcher(self.client).fetch_table(response)
+    if table is None or table.num_rows == 0:
+      return {
+        'success': True,
+        'statement_id': response.statement_id,
+        'data': {'message': 'Query executed successfully with no results'},
+        'row_count': 0,
+      }
+
+    result = {'success': True, 'statement_id': response.statement_id}
+    if result_format == 'parquet':
+      result['artifact'] = write_parquet(table, owner=self.user)
+    else:
+      result['data'] = table_to_columnar(table)
+    result['row_count'] = table.num_rows
+    if response.manifest.truncated:
+      result['truncated'] = True
+    return result
+
+  @staticmethod
+  def _page(
+    statement_id: str,
+    columns: list,
+    chunk: ResultData,
+    offset: int,
+    limit: int,
+    result_format: str = 'rows',
+    dictionary_encode: bool = False,
+  ) -> dict:
+    """Convert up to limit rows of a chunk, starting at offset, into a result page."""
+    data_array = chunk.data_array or []
+    end = offset + limit
+    rows = data_array[offset:end]
+
+    if result_format == 'columnar':
+      data = encode_columnar(columns, rows, dictionary_encode)
+    else:
+      names = [col.name for col in columns]
+      data = {'columns': names, 'rows': [dict(zip(names, row)) for row in rows]}
+
+    next_page_token = None
+    if end < len(data_array):
+      next_page_token = encode_page_token(statement_id, chunk.chunk_index or 0, end)
+    elif chunk.next_chunk_index is not None:
+      next_page_token = encode_page_token(statement_id, chunk.next_chunk_index, 0)
+
+    return {
+      'success': True,
+      'statement_id': statement_id,
+      'data': data,
+      'row_count': len(rows),
+      'next_page_token': next_page_token,
+    }
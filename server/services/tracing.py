@@ -0,0 +1,332 @@
+"""Span-based tracing with W3C trace context and OTLP/JSON export."""
+
+import atexit
+import contextvars
+import json
+import os
+import threading
+import time
+import urllib.request
+from collections import deque
+from contextlib import contextmanager
+
+_current_span = contextvars.ContextVar('mcp_current_span', default=None)
+
+
+def new_trace_id() -> str:
+  """Return a random 128-bit trace id as 32 hex characters."""
+  return os.urandom(16).hex()
+
+
+def new_span_id() -> str:
+  """Return a random 64-bit span id as 16 hex characters."""
+  return os.urandom(8).hex()
+
+
+def parse_traceparent(value: str | None) -> tuple[str, str] | None:
+  """Parse a W3C traceparent header into (trace_id, parent_span_id), None if invalid."""
+  parts = (value or '').strip().lower().split('-')
+  if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+    return None
+  trace_id, span_id = parts[1], parts[2]
+  try:
+    if int(trace_id, 16) == 0 or int(span_id, 16) == 0:
+      return None
+  except ValueError:
+    return None
+  return trace_id, span_id
+
+
+def format_traceparent(trace_id: str, span_id: str) -> str:
+  """Format a sampled W3C traceparent header."""
+  return f'00-{trace_id}-{span_id}-01'
+
+
+def _otlp_value(value) -> dict:
+  if isinstance(value, bool):
+    return {'boolValue': value}
+  if isinstance(value, int):
+    return {'intValue': str(value)}
+  if isinstance(value, float):
+    return {'doubleValue': value}
+  return {'stringValue': str(value)}
+
+
+class Span:
+  """One timed operation within a trace.
+
+  The root span of a trace collects every finished span of the trace, so the
+  whole tree can be exported, or summarized in a tool response, in one go.
+  """
+
+  def __init__(self, name: str, trace_id: str, parent_id: str = None, root: 'Span' = None, **attrs):
+    self.name = name
+    self.trace_id = trace_id
+    self.span_id = new_span_id()
+    self.parent_id = parent_id
+    self.root = root or self
+    self.attributes = {k: v for k, v in attrs.items() if v is not None}
+    self.error = None
+    self.start_ns = time.time_ns()
+    self._start = time.perf_counter()
+    self.duration = None
+    if root is None:
+      self.finished = []
+
+  def set_attribute(self, key: str, value) -> None:
+    """Attach an attribute to the span."""
+    if value is not None:
+      self.attributes[key] = value
+
+  def end(self) -> None:
+    """Finish the span and hand it to its root."""
+    self.duration = time.perf_counter() - self._start
+    self.root.finished.append(self)
+
+  @property
+  def duration_ms(self) -> float | None:
+    """Span duration in milliseconds, None while it is running."""
+    return round(self.duration * 1000, 2) if self.duration is not None else None
+
+  def to_otlp(self) -> dict:
+    """Return the span in OTLP/JSON form."""
+    span = {
+      'traceId': self.trace_id,
+      'spanId': self.span_id,
+      'name': self.name,
+      'kind': 2 if self.root is self else 1,  # SERVER for the root, INTERNAL otherwise
+      'startTimeUnixNano': str(self.start_ns),
+      'endTimeUnixNano': str(self.start_ns + int((self.duration or 0) * 1e9)),
+      'attributes': [{'key': k, 'value': _otlp_value(v)} for k, v in self.attributes.items()],
+      'status': {'code': 2, 'message': self.error} if self.error else {'code': 1},
+    }
+    if self.parent_id:
+      span['parentSpanId'] = self.parent_id
+    return span
+
+
+def otlp_payload(spans: list[Span], service_name: str) -> dict:
+  """Wrap spans in an OTLP ExportTraceServiceRequest (JSON encoding)."""
+  return {
+    'resourceSpans': [
+      {
+        'resource': {
+          'attributes': [{'key': 'service.name', 'value': {'stringValue': service_name}}]
+        },
+        'scopeSpans': [
+          {'scope': {'name': 'databricks-mcp'}, 'spans': [s.to_otlp() for s in spans]}
+        ],
+      }
+    ]
+  }
+
+
+class FileSpanExporter:
+  """Append OTLP/JSON export requests to a file, one per line.
+
+  This is the format the OpenTelemetry collector's otlpjsonfile receiver reads.
+  """
+
+  def __init__(self, path: str):
+    self.path = path
+    self._lock = threading.Lock()
+
+  def export(self, payload: dict) -> None:
+    """Write one export request."""
+    line = json.dumps(payload, separators=(',', ':'))
+    with self._lock, open(self.path, 'a') as f:
+      f.write(line + '\n')
+
+
+class OtlpHttpSpanExporter:
+  """POST OTLP/JSON export requests to a collector's /v1/traces endpoint."""
+
+  def __init__(self, endpoint: str, timeout: float = 5):
+    self.endpoint = endpoint
+    self.timeout = timeout
+
+  def export(self, payload: dict) -> None:
+    """Send one export request."""
+    request = urllib.request.Request(
+      self.endpoint,
+      data=json.dumps(payload).encode(),
+      headers={'Content-Type': 'application/json'},
+      method='POST',
+    )
+    with urllib.request.urlopen(request, timeout=self.timeout) as response:
+      response.read()
+
+
+class Tracer:
+  """Starts traces and exports finished ones on a background thread.
+
+  Traces are only recorded when an exporter is configured or the caller asks
+  for a timing breakdown, so tracing costs nothing when it is off. Requests
+  never wait on the exporter: finished traces are queued (oldest dropped when
+  the queue is full) and flushed in batches.
+  """
+
+  def __init__(
+    self,
+    exporter=None,
+    service_name: str = 'databricks-mcp',
+    max_queue: int = 2048,
+    flush_interval: float = 2.0,
+  ):
+    """Create a tracer.
+
+    Args:
+        exporter: Object with export(payload), None to only record on demand
+        service_name: service.name resource attribute of exported spans
+        max_queue: Maximum finished traces waiting for export
+        flush_interval: Seconds between export batches
+    """
+    self.exporter = exporter
+    self.service_name = service_name
+    self.flush_interval = flush_interval
+    self._queue = deque(maxlen=max_queue)
+    self._lock = threading.Lock()
+    self._thread = None
+    self.traces = 0
+    self.exported = 0
+    self.export_errors = 0
+
+  @contextmanager
+  def start_trace(self, name: str, traceparent: str = None, record: bool = False, **attributes):
+    """Open the root span of a trace, continuing the caller's trace if traceparent is valid.
+
+    Yields:
+        The root span, or None when nothing is being recorded
+    """
+    if _current_span.get() is not None:
+      # A request dispatched while handling another one nests under it
+      with trace_span(name, **attributes) as span:
+        yield span
+      return
+    if self.exporter is None and not record:
+      yield None
+      return
+    remote = parse_traceparent(traceparent)
+    trace_id, parent_id = remote or (new_trace_id(), None)
+    span = Span(name, trace_id, parent_id, **attributes)
+    token = _current_span.set(span)
+    try:
+      yield span
+    except Exception as e:
+      span.error = str(e)
+      raise
+    finally:
+      _current_span.reset(token)
+      span.end()
+      if self.exporter is not None:
+        self._enqueue(span.finished)
+
+  def _enqueue(self, spans: list[Span]) -> None:
+    with self._lock:
+      self.traces += 1
+      self._queue.append(spans)
+      if self._thread is None or not self._thread.is_alive():
+        self._thread = threading.Thread(target=self._export_loop, name='trace-export', daemon=True)
+        self._thread.start()
+
+  def _export_loop(self) -> None:
+    while True:
+      time.sleep(self.flush_interval)
+      self.flush()
+
+  def flush(self) -> None:
+    """Export every queued trace now."""
+    with self._lock:
+      batch = [span for spans in self._queue for span in spans]
+      self._queue.clear()
+    if not batch:
+      return
+    try:
+      self.exporter.export(otlp_payload(batch, self.service_name))
+      self.exported += len(batch)
+    except Exception as e:
+      self.export_errors += 1
+      print(f'⚠️ Trace export failed: {str(e)}')
+
+  def stats(self) -> dict:
+    """Return export counters."""
+    return {
+      'exporter': type(self.exporter).__name__ if self.exporter else None,
+      'traces': self.traces,
+      'exported_spans': self.exported,
+      'export_errors': self.export_errors,
+      'queued_traces': len(self._queue),
+    }
+
+
+def current_span() -> Span | None:
+  """Return the innermost open span of the current context."""
+  return _current_span.get()
+
+
+@contextmanager
+def trace_span(name: str, **attributes):
+  """Open a child of the current span; does nothing outside a recorded trace.
+
+  Yields:
+      The span, or None when no trace is being recorded
+  """
+  parent = _current_span.get()
+  if parent is None:
+    yield None
+    return
+  span = Span(name, parent.trace_id, parent.span_id, parent.root, **attributes)
+  token = _current_span.set(span)
+  try:
+    yield span
+  except Exception as e:
+    span.error = str(e)
+    raise
+  finally:
+    _current_span.reset(token)
+    span.end()
+
+
+def timing_breakdown(span: Span) -> dict:
+  """Summarize a finished span and the spans finished below it, in start order."""
+  root = span.root
+  below = {span.span_id}
+  children = []
+  for child in sorted(root.finished, key=lambda s: s.start_ns):
+    if child.parent_id in below:
+      below.add(child.span_id)
+      children.append(
+        {
+          'name': child.name,
+          'ms': child.duration_ms,
+          'offset_ms': round((child.start_ns - span.start_ns) / 1e6, 2),
+        }
+      )
+  return {'trace_id': span.trace_id, 'total_ms': span.duration_ms, 'spans': children}
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+  """Return the process-wide tracer, configured from the environment."""
+  global _tracer
+  if _tracer is None:
+    with _tracer_lock:
+      if _tracer is None:
+        kind = os.environ.get('MCP_TRACE_EXPORTER', 'none').lower()
+        if kind == 'file':
+          exporter = FileSpanExporter(os.environ.get('MCP_TRACE_FILE', 'mcp-traces.jsonl'))
+        elif kind == 'otlp':
+          exporter = OtlpHttpSpanExporter(
+            os.environ.get('MCP_TRACE_OTLP_ENDPOINT', 'http://localhost:4318/v1/traces')
+          )
+        else:
+          exporter = None
+        _tracer = Tracer(
+          exporter, service_name=os.environ.get('MCP_TRACE_SERVICE_NAME', 'databricks-mcp')
+        )
+        if exporter is not None:
+          atexit.register(_tracer.flush)
+  return _tracer
@@ -1,19 +1,142 @@
 """User service for Databricks user operations."""
 
-from databricks.sdk import WorkspaceClient
+import os
+import threading
+import time
+
+from databricks.sdk.errors import PermissionDenied, Unauthenticated
 from databricks.sdk.service.iam import User
 
+from server.services.single_flight import SingleFlight
+from server.services.workspace_client import WorkspaceClientRegistry, get_workspace_client
+
+# Failures that will not fix themselves on retry, cached briefly to shed load
+_AUTH_ERRORS = (Unauthenticated, PermissionDenied)
+
+
+class CurrentUserCache:
+  """Per-identity cache of current_user.me() results.
+
+  Entries are keyed by host and a hash of the credential, so different
+  callers never see each other's user. Successful lookups live for ttl
+  seconds, authentication failures for negative_ttl seconds, and concurrent
+  misses for the same identity share a single SCIM call.
+  """
+
+  def __init__(self, ttl: float = 300, negative_ttl: float = 30, max_entries: int = 1024):
+    """Create a cache.
+
+    Args:
+        ttl: Seconds a successful lookup is reused, 0 disables caching
+        negative_ttl: Seconds an authentication failure is reused
+        max_entries: Maximum identities kept, expired and oldest entries go first
+    """
+    self.ttl = ttl
+    self.negative_ttl = negative_ttl
+    self.max_entries = max_entries
+    self._entries = {}  # identity -> (expires_at, user, (error type, message, error_code))
+    self._lock = threading.Lock()
+    self._flight = SingleFlight()
+    self.hits = 0
+    self.negative_hits = 0
+    self.misses = 0
+
+  def _store(self, identity: tuple, ttl: float, user: User = None, error: tuple = None):
+    if ttl <= 0:
+      return
+    with self._lock:
+      now = time.monotonic()
+      if len(self._entries) >= self.max_entries:
+        for key in [k for k, (expires, _, _) in self._entries.items() if expires <= now]:
+          del self._entries[key]
+        while len(self._entries) >= self.max_entries:
+          del self._entries[next(iter(self._entries))]
+      self._entries[identity] = (now + ttl, user, error)
+
+  def get(self, identity: tuple, fetch) -> User:
+    """Return the cached user for identity, calling fetch() on a miss.
+
+    Raises:
+        Unauthenticated, PermissionDenied: Also when a recent failure is cached
+    """
+    with self._lock:
+      entry = self._entries.get(identity)
+      if entry is not None and entry[0] > time.monotonic():
+        if entry[2] is not None:
+          self.negative_hits += 1
+          # A new exception per caller, re-raising one instance would grow its traceback
+          error_type, message, error_code = entry[2]
+          raise error_type(message, error_code=error_code)
+        self.hits += 1
+        return entry[1]
+      self.misses += 1
+
+    def load() -> User:
+      try:
+        user = fetch()
+      except _AUTH_ERRORS as e:
+        self._store(identity, self.negative_ttl, error=(type(e), str(e), e.error_code))
+        raise
+      self._store(identity, self.ttl, user=user)
+      return user
+
+    user, _ = self._flight.do(identity, load)
+    return user
+
+  def invalidate(self, identity: tuple = None) -> None:
+    """Drop one identity, or every entry when identity is None."""
+    with self._lock:
+      if identity is None:
+        self._entries.clear()
+      else:
+        self._entries.pop(identity, None)
+
+  def stats(self) -> dict:
+    """Return hit/miss counters and the number of cached identities."""
+    with self._lock:
+      return {
+        'identities': len(self._entries),
+        'hits': self.hits,
+        'negative_hits': self.negative_hits,
+        'misses': self.misses,
+        'coalesced': self._flight.stats()['saved'],
+        'ttl_seconds': self.ttl,
+      }
+
+
+_user_cache = None
+_user_cache_lock = threading.Lock()
+
+
+def get_user_cache() -> CurrentUserCache:
+  """Return the process-wide current-user cache, configured from the environment."""
+  global _user_cache
+  if _user_cache is None:
+    with _user_cache_lock:
+      if _user_cache is None:
+        _user_cache = CurrentUserCache(
+          ttl=float(os.environ.get('MCP_USER_CACHE_TTL_SECONDS', 300)),
+          negative_ttl=float(os.environ.get('MCP_USER_CACHE_NEGATIVE_TTL_SECONDS', 30)),
+        )
+  return _user_cache
+
 
 class UserService:
   """Service for managing Databricks user operations."""
 
-  def __init__(self):
-    """Initialize the user service with Databricks workspace client."""
-    self.client = WorkspaceClient()
+  def __init__(self, host: str | None = None, token: str | None = None):
+    """Initialize the user service with the shared Databricks workspace client.
+
+    Args:
+        host: Workspace URL (optional, SDK default resolution if omitted)
+        token: Access token of the caller (optional, SDK default auth if omitted)
+    """
+    self.client = get_workspace_client(host=host, token=token)
+    self.identity = WorkspaceClientRegistry._make_key(host, token)
 
   def get_current_user(self) -> User:
-    """Get the current authenticated user."""
-    return self.client.current_user.me()
+    """Get the current authenticated user, cached per identity."""
+    return get_user_cache().get(self.identity, self.client.current_user.me)
 
   def get_user_info(self) -> dict:
     """Get formatted user information."""
@@ -0,0 +1,192 @@
+"""Cached SQL warehouse inventory with background refresh."""
+
+import os
+import threading
+import time
+from typing import Callable
+
+from databricks.sdk import WorkspaceClient
+
+from server.services.tracing import trace_span
+
+# Lower is better: running warehouses first, stopped ones need a cold start
+_STATE_RANK = {'RUNNING': 0, 'STARTING': 1, 'STOPPED': 2, 'STOPPING': 3}
+_UNUSABLE_STATES = {'DELETED', 'DELETING'}
+_SIZES = [
+  '2X-Small',
+  'X-Small',
+  'Small',
+  'Medium',
+  'Large',
+  'X-Large',
+  '2X-Large',
+  '3X-Large',
+  '4X-Large',
+]
+
+
+def warehouse_to_dict(warehouse) -> dict:
+  """Convert an SDK warehouse into the dictionary returned by the tools."""
+  return {
+    'id': warehouse.id,
+    'name': warehouse.name,
+    'state': warehouse.state.value if warehouse.state else 'UNKNOWN',
+    'size': warehouse.cluster_size,
+    'type': warehouse.warehouse_type.value if warehouse.warehouse_type else 'UNKNOWN',
+    'creator': warehouse.creator_name if hasattr(warehouse, 'creator_name') else None,
+    'auto_stop_mins': warehouse.auto_stop_mins if hasattr(warehouse, 'auto_stop_mins') else None,
+  }
+
+
+class WarehouseInventory:
+  """In-memory list of SQL warehouses, refreshed on a background thread.
+
+  Reads never wait on the API once the inventory has loaded: stale data is
+  served while a refresh runs (stale-while-revalidate), and only data older
+  than max_stale_seconds forces a synchronous reload.
+  """
+
+  def __init__(
+    self,
+    client_factory: Callable[[], WorkspaceClient],
+    refresh_interval: float = 60,
+    max_stale_seconds: float = 600,
+  ):
+    """Create an inventory.
+
+    Args:
+        client_factory: Returns the WorkspaceClient used to list warehouses
+        refresh_interval: Seconds between background refreshes
+        max_stale_seconds: Age beyond which reads refresh synchronously
+    """
+    self.client_factory = client_factory
+    self.refresh_interval = refresh_interval
+    self.max_stale_seconds = max_stale_seconds
+    self._warehouses = None
+    self._loaded_at = 0.0
+    self._lock = threading.Lock()
+    self._refresh_lock = threading.Lock()
+    self._stop = threading.Event()
+    self._thread = None
+    self.refreshes = 0
+    self.refresh_errors = 0
+
+  def refresh(self) -> list[dict]:
+    """List warehouses from the API and replace the cached inventory."""
+    with self._refresh_lock:
+      try:
+        with trace_span('databricks.warehouses.list'):
+          warehouses = [warehouse_to_dict(w) for w in self.client_factory().warehouses.list()]
+      except Exception:
+        self.refresh_errors += 1
+        raise
+      with self._lock:
+        self._warehouses = warehouses
+        self._loaded_at = time.monotonic()
+        self.refreshes += 1
+      return warehouses
+
+  def _refresh_loop(self) -> None:
+    while not self._stop.wait(self.refresh_interval):
+      try:
+        self.refresh()
+      except Exception as e:
+        print(f'⚠️ Warehouse inventory refresh failed: {str(e)}')
+
+  def start(self) -> None:
+    """Start the background refresh thread if it is not running."""
+    with self._lock:
+      if self._thread is None or not self._thread.is_alive():
+        self._stop.clear()
+        self._thread = threading.Thread(
+          target=self._refresh_loop, name='warehouse-inventory', daemon=True
+        )
+        self._thread.start()
+
+  def stop(self) -> None:
+    """Stop the background refresh thread."""
+    self._stop.set()
+
+  @property
+  def age_seconds(self) -> float | None:
+    """Seconds since the last successful refresh, None if never loaded."""
+    return time.monotonic() - self._loaded_at if self._warehouses is not None else None
+
+  def list(self, force_refresh: bool = False) -> list[dict]:
+    """Return the cached warehouses, loading them on first use or when too stale."""
+    self.start()
+    age = self.age_seconds
+    if force_refresh or age is None or age > self.max_stale_seconds:
+      return self.refresh()
+    if age > self.refresh_interval and not self._refresh_lock.locked():
+      # Serve what we have and revalidate in the background
+      threading.Thread(target=self._safe_refresh, daemon=True).start()
+    return self._warehouses
+
+  def _safe_refresh(self) -> None:
+    try:
+      self.refresh()
+    except Exception as e:
+      print(f'⚠️ Warehouse inventory refresh failed: {str(e)}')
+
+  def get(self, warehouse_id: str) -> dict | None:
+    """Return the cached entry for a warehouse, if known."""
+    return next((w for w in self.list() if w['id'] == warehouse_id), None)
+
+  def cached(self, warehouse_id: str) -> dict | None:
+    """Return the entry for a warehouse from whatever is loaded, never calling the API."""
+    with self._lock:
+      warehouses = self._warehouses or []
+    return next((w for w in warehouses if w['id'] == warehouse_id), None)
+
+  def select(self, queue_latency: Callable[[str], float] = None) -> dict | None:
+    """Pick the best warehouse for a new query.
+
+    Ranks by state (RUNNING first, stopped warehouses last since they need a
+    cold start), then by size (larger first), then by observed queue latency.
+
+    Args:
+        queue_latency: Returns the expected queue wait in seconds for a warehouse ID
+
+    Returns:
+        The chosen warehouse dictionary, or None if there is none usable
+    """
+    candidates = [w for w in self.list() if w['state'] not in _UNUSABLE_STATES]
+    if not candidates:
+      return None
+
+    def rank(warehouse: dict) -> tuple:
+      size = _SIZES.index(warehouse['size']) if warehouse['size'] in _SIZES else -1
+      latency = queue_latency(warehouse['id']) if queue_latency else 0.0
+      return (_STATE_RANK.get(warehouse['state'], len(_STATE_RANK)), -size, latency)
+
+    return min(candidates, key=rank)
+
+  def stats(self) -> dict:
+    """Return refresh counters and inventory age."""
+    age = self.age_seconds
+    return {
+      'warehouses': len(self._warehouses or []),
+      'age_seconds': round(age, 1) if age is not None else None,
+      'refresh_interval': self.refresh_interval,
+      'refreshes': self.refreshes,
+      'refresh_errors': self.refresh_errors,
+    }
+
+
+_inventory = None
+_inventory_lock = threading.Lock()
+
+
+def get_warehouse_inventory(client_factory: Callable[[], WorkspaceClient]) -> WarehouseInventory:
+  """Return the process-wide warehouse inventory, configured from the environment."""
+  global _inventory
+  if _inventory is None:
+    with _inventory_lock:
+      if _inventory is None:
+        _inventory = WarehouseInventory(
+          client_factory,
+          refresh_interval=float(os.environ.get('MCP_WAREHOUSE_REFRESH_SECONDS', 60)),
+          max_stale_seconds=float(os.environ.get('MCP_WAREHOUSE_MAX_STALE_SECONDS', 600)),
+        )
+  return _inventory
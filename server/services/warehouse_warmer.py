@@ -0,0 +1,256 @@
+"""Warehouse pre-warming and keep-warm scheduling."""
+
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Callable
+
+from databricks.sdk import WorkspaceClient
+
+from server.services.warehouse_inventory import WarehouseInventory
+
+_COLD_STATES = {'STOPPED', 'STOPPING'}
+
+
+def parse_schedule(spec: str) -> list[tuple[str, int, int]]:
+  """Parse 'warehouse_id@HH:MM-HH:MM,...' (UTC) into (warehouse_id, start_min, end_min).
+
+  Windows may wrap past midnight, e.g. 'abc@22:00-02:00'.
+  """
+  windows = []
+  for part in (spec or '').split(','):
+    part = part.strip()
+    if not part:
+      continue
+    warehouse_id, _, hours = part.partition('@')
+    start, _, end = hours.partition('-')
+    try:
+      start_h, start_m = (int(x) for x in start.split(':'))
+      end_h, end_m = (int(x) for x in end.split(':'))
+    except ValueError:
+      raise ValueError(f'Invalid warm schedule entry {part!r}, expected id@HH:MM-HH:MM') from None
+    windows.append((warehouse_id.strip(), start_h * 60 + start_m, end_h * 60 + end_m))
+  return windows
+
+
+class WarehouseWarmer:
+  """Starts warehouses ahead of demand and keeps busy ones from auto-stopping.
+
+  A warehouse is kept warm while it is inside a configured schedule window or
+  has served queries within the last active_window seconds. Kept-warm
+  warehouses that are stopped get started; running ones get a cheap
+  'SELECT 1' shortly before auto-stop would kick in.
+  """
+
+  def __init__(
+    self,
+    client_factory: Callable[[], WorkspaceClient],
+    inventory: WarehouseInventory,
+    schedule: list[tuple[str, int, int]] = None,
+    active_window: float = 900,
+    interval: float = 60,
+  ):
+    """Create a warmer.
+
+    Args:
+        client_factory: Returns the WorkspaceClient used to start/ping warehouses
+        inventory: Warehouse inventory used to read warehouse states
+        schedule: (warehouse_id, start_minute, end_minute) UTC windows to keep warm
+        active_window: Seconds after the last query during which a warehouse stays warm
+        interval: Seconds between scheduler passes
+    """
+    self.client_factory = client_factory
+    self.inventory = inventory
+    self.schedule = schedule or []
+    self.active_window = active_window
+    self.interval = interval
+    self._last_query = {}  # warehouse_id -> monotonic time of last query
+    self._last_ping = {}
+    self._pending_starts = {}  # warehouse_id -> monotonic time start was requested/observed
+    self._cold_starts = deque(maxlen=100)  # seconds from cold to RUNNING
+    self._lock = threading.Lock()
+    self._stop = threading.Event()
+    self._thread = None
+    self.warm_hits = 0
+    self.cold_hits = 0
+    self.starts_issued = 0
+    self.keepalive_pings = 0
+    self.idle_warm_seconds = 0.0  # time kept warm by pings rather than real traffic
+
+  def record_query(self, warehouse_id: str) -> None:
+    """Note a query on a warehouse and whether it found the warehouse warm.
+
+    Runs on the request path, so it only reads the inventory already loaded;
+    loading and refreshing it is left to the scheduler.
+    """
+    warehouse = self.inventory.cached(warehouse_id)
+    now = time.monotonic()
+    with self._lock:
+      self._last_query[warehouse_id] = now
+      if warehouse is None:
+        return
+      if warehouse['state'] == 'RUNNING':
+        self.warm_hits += 1
+      else:
+        self.cold_hits += 1
+        self._pending_starts.setdefault(warehouse_id, now)
+
+  def warm(self, warehouse_id: str, wait: bool = False, timeout: float = 600) -> dict:
+    """Start a warehouse if it is not running.
+
+    Args:
+        warehouse_id: Warehouse to warm
+        wait: Block until the warehouse is RUNNING
+        timeout: Maximum seconds to wait when wait is True
+
+    Returns:
+        Dictionary with the warehouse state and whether a start was issued
+    """
+    client = self.client_factory()
+    state = client.warehouses.get(warehouse_id).state
+    state = state.value if state else 'UNKNOWN'
+    started = False
+    if state in _COLD_STATES:
+      client.warehouses.start(warehouse_id)
+      started = True
+      with self._lock:
+        self.starts_issued += 1
+        self._pending_starts.setdefault(warehouse_id, time.monotonic())
+    if wait and state != 'RUNNING':
+      deadline = time.monotonic() + timeout
+      while state != 'RUNNING' and time.monotonic() < deadline:
+        time.sleep(5)
+        state = client.warehouses.get(warehouse_id).state
+        state = state.value if state else 'UNKNOWN'
+      self._observe(warehouse_id, state)
+    return {'warehouse_id': warehouse_id, 'state': state, 'start_issued': started}
+
+  def _observe(self, warehouse_id: str, state: str) -> None:
+    """Record cold-start latency once a pending warehouse reaches RUNNING."""
+    if state != 'RUNNING':
+      return
+    with self._lock:
+      requested = self._pending_starts.pop(warehouse_id, None)
+      if requested is not None:
+        self._cold_starts.append(time.monotonic() - requested)
+
+  def _wanted(self, now: float) -> set[str]:
+    """Warehouses that should be warm right now."""
+    utc_now = datetime.now(timezone.utc)
+    minute = utc_now.hour * 60 + utc_now.minute
+    wanted = set()
+    for warehouse_id, start, end in self.schedule:
+      in_window = start <= minute < end if start <= end else minute >= start or minute < end
+      if in_window:
+        wanted.add(warehouse_id)
+    with self._lock:
+      wanted.update(w for w, last in self._last_query.items() if now - last < self.active_window)
+    return wanted
+
+  def _ping(self, warehouse_id: str) -> None:
+    self.client_factory().statement_execution.execute_statement(
+      warehouse_id=warehouse_id, statement='SELECT 1', wait_timeout='0s'
+    )
+
+  def run_once(self) -> None:
+    """One scheduler pass: start wanted cold warehouses, ping idle warm ones."""
+    now = time.monotonic()
+    wanted = self._wanted(now)
+    with self._lock:
+      pending = bool(self._pending_starts)
+    if not wanted and not pending:
+      # Nothing to warm or time, so idle apps make no workspace calls
+      return
+    warehouses = {w['id']: w for w in self.inventory.list()}
+    for warehouse_id, warehouse in warehouses.items():
+      self._observe(warehouse_id, warehouse['state'])
+
+    for warehouse_id in wanted:
+      warehouse = warehouses.get(warehouse_id)
+      if warehouse is None:
+        continue
+      if warehouse['state'] in _COLD_STATES:
+        self.warm(warehouse_id)
+        continue
+      if warehouse['state'] != 'RUNNING' or not warehouse.get('auto_stop_mins'):
+        continue
+      # Ping once the warehouse has been idle for most of its auto-stop window
+      idle_limit = max(warehouse['auto_stop_mins'] * 60 - 2 * self.interval, self.interval)
+      with self._lock:
+        last_activity = max(
+          self._last_query.get(warehouse_id, 0), self._last_ping.get(warehouse_id, 0)
+        )
+      if now - last_activity >= idle_limit:
+        self._ping(warehouse_id)
+        with self._lock:
+          self._last_ping[warehouse_id] = now
+          self.keepalive_pings += 1
+          self.idle_warm_seconds += now - last_activity if last_activity else idle_limit
+
+  def _loop(self) -> None:
+    while not self._stop.wait(self.interval):
+      try:
+        self.run_once()
+      except Exception as e:
+        print(f'⚠️ Warehouse warm-up pass failed: {str(e)}')
+
+  def start(self) -> None:
+    """Start the background scheduler thread if it is not running."""
+    with self._lock:
+      if self._thread is None or not self._thread.is_alive():
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='warehouse-warmer', daemon=True)
+        self._thread.start()
+
+  def stop(self) -> None:
+    """Stop the background scheduler thread."""
+    self._stop.set()
+
+  def stats(self) -> dict:
+    """Return warm/cold hit counts, cold-start latencies and keep-warm cost."""
+    with self._lock:
+      cold = list(self._cold_starts)
+      queries = self.warm_hits + self.cold_hits
+      return {
+        'warm_hits': self.warm_hits,
+        'cold_hits': self.cold_hits,
+        'warm_hit_rate': round(self.warm_hits / queries, 3) if queries else None,
+        'starts_issued': self.starts_issued,
+        'cold_start_avg_seconds': round(sum(cold) / len(cold), 1) if cold else None,
+        'cold_start_max_seconds': round(max(cold), 1) if cold else None,
+        'keepalive_pings': self.keepalive_pings,
+        'idle_warm_seconds': round(self.idle_warm_seconds, 1),
+        'schedule': [
+          f'{w}@{s // 60:02d}:{s % 60:02d}-{e // 60:02d}:{e % 60:02d}' for w, s, e in self.schedule
+        ],
+        'running': self._thread is not None and self._thread.is_alive(),
+      }
+
+
+_warmer = None
+_warmer_lock = threading.Lock()
+
+
+def get_warehouse_warmer(
+  client_factory: Callable[[], WorkspaceClient], inventory: WarehouseInventory
+) -> WarehouseWarmer:
+  """Return the process-wide warehouse warmer, configured from the environment."""
+  global _warmer
+  if _warmer is None:
+    with _warmer_lock:
+      if _warmer is None:
+        _warmer = WarehouseWarmer(
+          client_factory,
+          inventory,
+          schedule=parse_schedule(os.environ.get('MCP_WARM_SCHEDULE', '')),
+          active_window=float(os.environ.get('MCP_WARM_ACTIVE_WINDOW_SECONDS', 900)),
+          interval=float(os.environ.get('MCP_WARM_INTERVAL_SECONDS', 60)),
+        )
+  return _warmer
+
+
+def current_warehouse_warmer() -> WarehouseWarmer | None:
+  """Return the process-wide warehouse warmer if it has been created, without creating it."""
+  return _warmer
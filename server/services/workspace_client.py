@@ -0,0 +1,137 @@
+"""Shared WorkspaceClient registry for Databricks SDK calls."""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from databricks.sdk import WorkspaceClient
+from databricks.sdk.config import Config
+
+
+class WorkspaceClientRegistry:
+  """Process-wide cache of WorkspaceClient instances keyed by host and credential.
+
+  Each WorkspaceClient owns its own HTTP session and connection pool, so handing
+  out the same client for the same host/credential keeps connections alive
+  across tool calls instead of redoing config resolution and TLS handshakes.
+  """
+
+  def __init__(self, max_clients: int = 16, idle_ttl_seconds: float = 900, pool_size: int = 20):
+    """Create a registry.
+
+    Args:
+        max_clients: Maximum number of distinct clients kept (LRU beyond that)
+        idle_ttl_seconds: Clients unused for this long are evicted
+        pool_size: HTTP connections kept alive per client connection pool
+    """
+    self.max_clients = max_clients
+    self.idle_ttl_seconds = idle_ttl_seconds
+    self.pool_size = pool_size
+    self._clients = OrderedDict()  # key -> [client, last_used]
+    self._lock = threading.Lock()
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+
+  @staticmethod
+  def _make_key(host: str | None, token: str | None) -> tuple:
+    # Never keep raw tokens around as dict keys
+    token_hash = hashlib.sha256(token.encode()).hexdigest() if token else ''
+    return ((host or '').rstrip('/'), token_hash)
+
+  def _evict_idle(self, now: float) -> None:
+    expired = [k for k, (_, last) in self._clients.items() if now - last > self.idle_ttl_seconds]
+    for key in expired:
+      del self._clients[key]
+      self.evictions += 1
+
+  def get_client(self, host: str | None = None, token: str | None = None) -> WorkspaceClient:
+    """Return a shared client for the given host and token, creating it if needed.
+
+    Args:
+        host: Workspace URL (optional, SDK default resolution if omitted)
+        token: Access token (optional, SDK default auth if omitted)
+
+    Returns:
+        A WorkspaceClient that may be shared with other callers
+    """
+    key = self._make_key(host, token)
+    with self._lock:
+      now = time.monotonic()
+      self._evict_idle(now)
+      entry = self._clients.get(key)
+      if entry:
+        entry[1] = now
+        self._clients.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    # Build outside the lock: config resolution may hit the network
+    client = WorkspaceClient(
+      config=Config(
+        host=host,
+        token=token,
+        # A caller's token wins over app credentials in the environment (e.g. on Databricks Apps)
+        auth_type='pat' if token else None,
+        max_connection_pools=self.pool_size,
+        max_connections_per_pool=self.pool_size,
+      )
+    )
+
+    with self._lock:
+      entry = self._clients.get(key)
+      if entry:
+        # Another thread won the race, use its client
+        entry[1] = time.monotonic()
+        self.hits += 1
+        return entry[0]
+      self.misses += 1
+      self._clients[key] = [client, time.monotonic()]
+      while len(self._clients) > self.max_clients:
+        self._clients.popitem(last=False)
+        self.evictions += 1
+      return client
+
+  def clear(self) -> None:
+    """Drop all cached clients."""
+    with self._lock:
+      self.evictions += len(self._clients)
+      self._clients.clear()
+
+  def stats(self) -> dict:
+    """Return reuse counters and pool configuration."""
+    with self._lock:
+      return {
+        'clients': len(self._clients),
+        'hits': self.hits,
+        'misses': self.misses,
+        'evictions': self.evictions,
+        'max_clients': self.max_clients,
+        'idle_ttl_seconds': self.idle_ttl_seconds,
+        'pool_size': self.pool_size,
+      }
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_client_registry() -> WorkspaceClientRegistry:
+  """Return the process-wide client registry, configured from the environment."""
+  global _registry
+  if _registry is None:
+    with _registry_lock:
+      if _registry is None:
+        _registry = WorkspaceClientRegistry(
+          max_clients=int(os.environ.get('MCP_CLIENT_MAX_CLIENTS', 16)),
+          idle_ttl_seconds=float(os.environ.get('MCP_CLIENT_IDLE_TTL_SECONDS', 900)),
+          pool_size=int(os.environ.get('MCP_CLIENT_POOL_SIZE', 20)),
+        )
+  return _registry
+
+
+def get_workspace_client(host: str | None = None, token: str | None = None) -> WorkspaceClient:
+  """Get a shared WorkspaceClient from the process-wide registry."""
+  return get_client_registry().get_client(host=host, token=token)
@@ -1,8 +1,123 @@
 """MCP Tools for Databricks operations."""
 
 import os
+import time
+from typing import Mapping
 
-from databricks.sdk import WorkspaceClient
+from fastmcp import Context
+from fastmcp.server.dependencies import get_context
+from pydantic import BaseModel
+
+from server.serialization import tool_serializer
+from server.services.admission import get_admission_controller
+from server.services.artifact_store import get_artifact_store, request_user
+from server.services.batch_executor import MAX_CONCURRENCY, BatchExecutor
+from server.services.blocking import get_blocking_executor, offload, run_blocking
+from server.services.chunk_cache import get_chunk_cache
+from server.services.result_cache import get_query_cache
+from server.services.single_flight import get_query_flight
+from server.services.statement_service import StatementService
+from server.services.tracing import get_tracer, trace_span
+from server.services.user_service import get_user_cache
+from server.services.warehouse_inventory import get_warehouse_inventory
+from server.services.warehouse_warmer import current_warehouse_warmer, get_warehouse_warmer
+from server.services.workspace_client import get_client_registry, get_workspace_client
+
+
+def _workspace_client():
+  """Get the shared WorkspaceClient for the app's configured host and token."""
+  return get_workspace_client(
+    host=os.environ.get('DATABRICKS_HOST'), token=os.environ.get('DATABRICKS_TOKEN')
+  )
+
+
+def _request_headers() -> Mapping[str, str]:
+  """Headers of the HTTP request that carried the current MCP message.
+
+  get_http_headers() reflects the request that started the session's task,
+  which has no mcp-session-id yet, so headers come from the request context.
+  """
+  try:
+    request = get_context().request_context.request
+  except (RuntimeError, LookupError, ValueError):
+    request = None
+  return request.headers if request is not None else {}
+
+
+def _caller_id() -> str:
+  """Identify the calling MCP session, used to queue warehouse requests fairly."""
+  return _request_headers().get('mcp-session-id') or 'anonymous'
+
+
+def _request_user() -> str | None:
+  """Workspace user of the MCP request, whom Parquet artifacts are written for."""
+  return request_user(_request_headers())
+
+
+def _warehouse_inventory():
+  """Get the shared, background-refreshed warehouse inventory."""
+  return get_warehouse_inventory(_workspace_client)
+
+
+def _warehouse_warmer():
+  """Get the shared warehouse warmer; its scheduler runs from start_warehouse_warmer."""
+  return get_warehouse_warmer(_workspace_client, _warehouse_inventory())
+
+
+def start_warehouse_warmer():
+  """Start the warm-up scheduler, once at app startup so queries and schedules are acted on."""
+  warmer = _warehouse_warmer()
+  warmer.start()
+  return warmer
+
+
+def _check_limit(limit: int) -> None:
+  """Reject page sizes that cannot make progress through a result."""
+  if limit < 1:
+    raise ValueError(f'limit must be at least 1, got {limit}')
+
+
+def _resolve_warehouse(warehouse_id: str = None) -> tuple[str | None, str]:
+  """Choose the warehouse for a query.
+
+  An explicit warehouse_id always wins. Otherwise DATABRICKS_SQL_WAREHOUSE_ID is
+  used while it is RUNNING; if it is not (or unset), the inventory picks the best
+  running warehouse, falling back to the configured default.
+
+  Returns:
+      Tuple of (warehouse_id or None, how it was selected)
+  """
+  if warehouse_id:
+    return warehouse_id, 'explicit'
+
+  default = os.environ.get('DATABRICKS_SQL_WAREHOUSE_ID')
+  try:
+    inventory = _warehouse_inventory()
+    if default:
+      current = inventory.get(default)
+      if current and current['state'] == 'RUNNING':
+        return default, 'default'
+    best = inventory.select(get_admission_controller().estimated_wait)
+  except Exception as e:
+    print(f'⚠️ Warehouse auto-selection unavailable: {str(e)}')
+    best = None
+
+  if best and (best['state'] == 'RUNNING' or not default):
+    return best['id'], 'auto'
+  return default, 'default'
+
+
+class BatchQuery(BaseModel):
+  """One query of an execute_dbsql_batch call."""
+
+  query: str
+  warehouse_id: str | None = None
+  catalog: str | None = None
+  schema_name: str | None = None
+  limit: int = 100
+  max_rows: int | None = None
+  result_format: str = 'rows'
+  use_cache: bool = True
 
 
 def load_tools(mcp_server):
@@ -15,40 +130,73 @@ def load_tools(mcp_server):
   @mcp_server.tool
   def health() -> dict:
     """Check the health of the MCP server and Databricks connection."""
+    warmer = current_warehouse_warmer()
     return {
       'status': 'healthy',
       'service': 'databricks-mcp',
       'databricks_configured': bool(os.environ.get('DATABRICKS_HOST')),
+      'client_pool': get_client_registry().stats(),
+      'query_cache': get_query_cache().stats(),
+      'result_chunks': get_chunk_cache().stats(),
+      'single_flight': get_query_flight().stats(),
+      'artifacts': get_artifact_store().stats(),
+      'admission': get_admission_controller().stats(),
+      'warehouse_inventory': _warehouse_inventory().stats(),
+      'warmup': warmer.stats() if warmer else None,
+      'user_cache': get_user_cache().stats(),
+      'blocking_executor': get_blocking_executor().stats(),
+      'tracing': get_tracer().stats(),
     }
 
   @mcp_server.tool
-  def execute_dbsql(
+  async def execute_dbsql(
     query: str,
     warehouse_id: str = None,
     catalog: str = None,
     schema: str = None,
     limit: int = 100,
+    async_mode: bool = False,
+    result_format: str = 'rows',
+    dictionary_encode: bool = False,
+    use_cache: bool = True,
+    max_rows: int = None,
   ) -> dict:
     """Execute a SQL query on Databricks SQL warehouse.
 
     Args:
         query: SQL query to execute
-        warehouse_id: SQL warehouse ID (optional, uses env var if not provided)
+        warehouse_id: SQL warehouse ID (optional; defaults to DATABRICKS_SQL_WAREHOUSE_ID
+            while it is running, otherwise the best running warehouse is picked)
         catalog: Catalog to use (optional)
         schema: Schema to use (optional)
-        limit: Maximum number of rows to return (default: 100)
+        limit: Rows in the first page (default: 100); pass next_page_token to
+            fetch_statement_page for the rest. With 'arrow' and 'parquet', which return the
+            whole result at once, the maximum number of rows
+        async_mode: Submit the query and return a statement_id immediately instead of
+            waiting for results. Use get_statement_status, fetch_statement_result and
+            cancel_statement with the returned statement_id (default: False)
+        result_format: 'rows' for one object per row, 'columnar' for typed per-column
+            arrays, 'arrow' for a columnar payload decoded from Arrow chunks, or 'parquet'
+            to write the result to a Parquet file and return an artifact whose url
+            (relative to the app URL) downloads it for the same user (default: 'rows')
+        dictionary_encode: With 'columnar', encode repetitive string columns as indices
+            into a per-column dictionary (default: False)
+        use_cache: Serve and store read-only query results from the result cache;
+            set to False to always run on the warehouse (default: True)
+        max_rows: Maximum number of rows the query may produce, applied by the warehouse
+            (optional, defaults to the server's MCP_RESULT_MAX_ROWS or limit if larger)
 
     Returns:
-        Dictionary with query results or error message
+        Dictionary with query results, a pending statement handle, or error message
     """
     try:
-      # Initialize Databricks SDK
-      w = WorkspaceClient(
-        host=os.environ.get('DATABRICKS_HOST'), token=os.environ.get('DATABRICKS_TOKEN')
-      )
+      _check_limit(limit)
+      # The statement itself is offloaded by the service once admitted
+      user = _request_user()
+      service = await run_blocking(lambda: StatementService(_workspace_client(), user=user))
 
-      # Get warehouse ID from parameter or environment
-      warehouse_id = warehouse_id or os.environ.get('DATABRICKS_SQL_WAREHOUSE_ID')
+      # Get warehouse ID from parameter, environment or the warehouse inventory
+      warehouse_id, selection = await run_blocking(_resolve_warehouse, warehouse_id)
       if not warehouse_id:
         return {
           'success': False,
@@ -57,75 +205,254 @@ def load_tools(mcp_server):
           ),
         }
 
-      # Build the full query with catalog/schema if provided
-      full_query = query
-      if catalog and schema:
-        full_query = f'USE CATALOG {catalog}; USE SCHEMA {schema}; {query}'
-
       print(f'🔧 Executing SQL on warehouse {warehouse_id}: {query[:100]}...')
+      _warehouse_warmer().record_query(warehouse_id)
+
+      result = await service.query(
+        warehouse_id,
+        query,
+        catalog,
+        schema,
+        limit=limit,
+        async_mode=async_mode,
+        result_format=result_format,
+        dictionary_encode=dictionary_encode,
+        use_cache=use_cache,
+        caller=_caller_id(),
+        max_rows=max_rows,
+      )
+      result['warehouse_id'] = warehouse_id
+      result['warehouse_selection'] = selection
+      return result
+
+    except Exception as e:
+      print(f'❌ Error executing SQL: {str(e)}')
+      return {'success': False, 'error': f'Error: {str(e)}'}
+
+  @mcp_server.tool
+  async def execute_dbsql_batch(
+    queries: list[BatchQuery],
+    max_concurrency: int = None,
+    stream_results: bool = True,
+    ctx: Context = None,
+  ) -> dict:
+    """Execute several SQL queries concurrently, possibly on different warehouses.
+
+    Args:
+        queries: Queries to run, each with query and optional warehouse_id, catalog,
+            schema_name, limit, max_rows, result_format and use_cache (same meaning as
+            execute_dbsql)
+        max_concurrency: Maximum queries running at once (optional, capped by server config)
+        stream_results: Send each result as a log notification as soon as it finishes
+            (default: True)
+        ctx: MCP request context, injected by FastMCP
 
-      # Execute the query
-      result = w.statement_execution.execute_statement(
-        warehouse_id=warehouse_id, statement=full_query, wait_timeout='30s'
+    Returns:
+        Dictionary with one entry per query (in input order) including timing, and the
+        batch wall-clock time
+    """
+    try:
+      caller = _caller_id()
+      user = _request_user()
+      executor = BatchExecutor(
+        max_concurrency=min(max_concurrency or MAX_CONCURRENCY, MAX_CONCURRENCY)
       )
 
-      # Process results
-      if result.result and result.result.data_array:
-        columns = [col.name for col in result.manifest.schema.columns]
-        data = []
+      def make_job(item: BatchQuery):
+        warehouse_id, _ = _resolve_warehouse(item.warehouse_id)
+        service = StatementService(_workspace_client(), user=user)
 
-        for row in result.result.data_array[:limit]:
-          row_dict = {}
-          for i, col in enumerate(columns):
-            row_dict[col] = row[i]
-          data.append(row_dict)
+        async def job() -> dict:
+          _check_limit(item.limit)
+          if not warehouse_id:
+            return {
+              'success': False,
+              'error': (
+                'No SQL warehouse ID provided. '
+                'Set DATABRICKS_SQL_WAREHOUSE_ID or pass warehouse_id.'
+              ),
+            }
+          print(f'🔧 Executing SQL on warehouse {warehouse_id}: {item.query[:100]}...')
+          _warehouse_warmer().record_query(warehouse_id)
+          return await service.query(
+            warehouse_id,
+            item.query,
+            item.catalog,
+            item.schema_name,
+            limit=item.limit,
+            result_format=item.result_format,
+            use_cache=item.use_cache,
+            caller=caller,
+            max_rows=item.max_rows,
+          )
 
-        return {'success': True, 'data': {'columns': columns, 'rows': data}, 'row_count': len(data)}
-      else:
-        return {
-          'success': True,
-          'data': {'message': 'Query executed successfully with no results'},
-          'row_count': 0,
-        }
+        return warehouse_id, job
+
+      completed = 0
+
+      async def on_result(entry: dict) -> None:
+        nonlocal completed
+        completed += 1
+        if ctx is None:
+          return
+        try:
+          await ctx.report_progress(
+            completed, len(queries), message=f'Query {entry["index"]} finished'
+          )
+          if stream_results:
+            await ctx.info(tool_serializer(entry), logger_name='execute_dbsql_batch')
+        except Exception:
+          # Streaming is best effort; the full batch is still returned at the end
+          pass
+
+      start = time.perf_counter()
+      # Warehouse selection may call the API when the inventory is cold
+      jobs = await run_blocking(lambda: [make_job(item) for item in queries])
+      results = await executor.run(jobs, on_result)
+      return {
+        'success': all(entry['result'].get('success') for entry in results),
+        'results': results,
+        'count': len(results),
+        'wall_ms': round((time.perf_counter() - start) * 1000, 1),
+      }
 
     except Exception as e:
-      print(f'❌ Error executing SQL: {str(e)}')
+      print(f'❌ Error executing SQL batch: {str(e)}')
       return {'success': False, 'error': f'Error: {str(e)}'}
 
   @mcp_server.tool
-  def list_warehouses() -> dict:
-    """List all SQL warehouses in the Databricks workspace.
+  @offload
+  def get_statement_status(statement_id: str) -> dict:
+    """Get the state of a SQL statement submitted with execute_dbsql.
+
+    Args:
+        statement_id: Statement ID returned by execute_dbsql
 
     Returns:
-        Dictionary containing list of warehouses with their details
+        Dictionary with the statement state and whether it has finished
     """
     try:
-      # Initialize Databricks SDK
-      w = WorkspaceClient(
-        host=os.environ.get('DATABRICKS_HOST'), token=os.environ.get('DATABRICKS_TOKEN')
+      return StatementService(_workspace_client()).get_status(statement_id)
+    except Exception as e:
+      print(f'❌ Error getting statement status: {str(e)}')
+      return {'success': False, 'error': f'Error: {str(e)}'}
+
+  @mcp_server.tool
+  @offload
+  def fetch_statement_result(
+    statement_id: str,
+    limit: int = 100,
+    result_format: str = 'rows',
+    dictionary_encode: bool = False,
+  ) -> dict:
+    """Fetch the results of a SQL statement submitted with execute_dbsql.
+
+    Args:
+        statement_id: Statement ID returned by execute_dbsql
+        limit: Maximum number of rows to return (default: 100)
+        result_format: 'columnar' for typed per-column arrays, or 'parquet' to write an
+            Arrow result to a downloadable Parquet artifact instead of returning it inline
+            (default: 'rows')
+        dictionary_encode: With 'columnar', dictionary-encode repetitive string columns
+
+    Returns:
+        Dictionary with query results, or the statement state if not finished yet
+    """
+    try:
+      _check_limit(limit)
+      return StatementService(_workspace_client(), user=_request_user()).fetch(
+        statement_id, limit, result_format, dictionary_encode
       )
+    except Exception as e:
+      print(f'❌ Error fetching statement result: {str(e)}')
+      return {'success': False, 'error': f'Error: {str(e)}'}
+
+  @mcp_server.tool
+  @offload
+  def fetch_statement_page(
+    page_token: str,
+    limit: int = 100,
+    result_format: str = 'rows',
+    dictionary_encode: bool = False,
+  ) -> dict:
+    """Fetch the next page of a SQL result using a next_page_token.
 
-      # List SQL warehouses
-      warehouses = []
-      for warehouse in w.warehouses.list():
-        warehouses.append(
-          {
-            'id': warehouse.id,
-            'name': warehouse.name,
-            'state': warehouse.state.value if warehouse.state else 'UNKNOWN',
-            'size': warehouse.cluster_size,
-            'type': warehouse.warehouse_type.value if warehouse.warehouse_type else 'UNKNOWN',
-            'creator': warehouse.creator_name if hasattr(warehouse, 'creator_name') else None,
-            'auto_stop_mins': warehouse.auto_stop_mins
-            if hasattr(warehouse, 'auto_stop_mins')
-            else None,
-          }
-        )
+    Args:
+        page_token: next_page_token returned by execute_dbsql, fetch_statement_result
+            or a previous fetch_statement_page call
+        limit: Maximum number of rows to return in this page (default: 100)
+        result_format: 'rows' or 'columnar', as for execute_dbsql (default: 'rows')
+        dictionary_encode: With 'columnar', dictionary-encode repetitive string columns
+
+    Returns:
+        Dictionary with the page rows and the next_page_token (null on the last page)
+    """
+    try:
+      _check_limit(limit)
+      return StatementService(_workspace_client(), user=_request_user()).fetch_page(
+        page_token, limit, result_format, dictionary_encode
+      )
+    except Exception as e:
+      print(f'❌ Error fetching statement page: {str(e)}')
+      return {'success': False, 'error': f'Error: {str(e)}'}
+
+  @mcp_server.tool
+  @offload
+  def cancel_statement(statement_id: str) -> dict:
+    """Cancel a running SQL statement submitted with execute_dbsql.
+
+    Args:
+        statement_id: Statement ID returned by execute_dbsql
+
+    Returns:
+        Dictionary confirming the cancellation request or error message
+    """
+    try:
+      return StatementService(_workspace_client()).cancel(statement_id)
+    except Exception as e:
+      print(f'❌ Error cancelling statement: {str(e)}')
+      return {'success': False, 'error': f'Error: {str(e)}'}
+
+  @mcp_server.tool
+  def flush_query_cache(table: str = None, prefix: str = None) -> dict:
+    """Flush cached SQL query results.
+
+    Args:
+        table: Only flush results of queries referencing this table (optional)
+        prefix: Only flush results of queries starting with this SQL text (optional)
+
+    Returns:
+        Dictionary with the number of flushed entries and cache statistics
+    """
+    try:
+      cache = get_query_cache()
+      flushed = cache.invalidate(table=table, prefix=prefix)
+      return {'success': True, 'flushed': flushed, 'stats': cache.stats()}
+    except Exception as e:
+      print(f'❌ Error flushing query cache: {str(e)}')
+      return {'success': False, 'error': f'Error: {str(e)}'}
+
+  @mcp_server.tool
+  @offload
+  def list_warehouses(refresh: bool = False) -> dict:
+    """List all SQL warehouses in the Databricks workspace.
+
+    Args:
+        refresh: Reload from the API instead of the cached inventory (default: False)
+
+    Returns:
+        Dictionary containing list of warehouses with their details
+    """
+    try:
+      # Served from the background-refreshed inventory
+      inventory = _warehouse_inventory()
+      warehouses = inventory.list(force_refresh=refresh)
 
       return {
         'success': True,
         'warehouses': warehouses,
         'count': len(warehouses),
+        'age_seconds': round(inventory.age_seconds or 0.0, 1),
         'message': f'Found {len(warehouses)} SQL warehouse(s)',
       }
 
@@ -134,6 +461,37 @@ def load_tools(mcp_server):
       return {'success': False, 'error': f'Error: {str(e)}', 'warehouses': [], 'count': 0}
 
   @mcp_server.tool
+  @offload
+  def warm_warehouse(warehouse_id: str = None, wait: bool = False) -> dict:
+    """Start a SQL warehouse ahead of time so the next query skips the cold start.
+
+    Args:
+        warehouse_id: SQL warehouse ID (optional, uses env var if not provided)
+        wait: Wait until the warehouse is RUNNING, up to 10 minutes (default: False)
+
+    Returns:
+        Dictionary with the warehouse state, whether a start was issued and warm-up stats
+    """
+    try:
+      warehouse_id = warehouse_id or os.environ.get('DATABRICKS_SQL_WAREHOUSE_ID')
+      if not warehouse_id:
+        return {
+          'success': False,
+          'error': (
+            'No SQL warehouse ID provided. Set DATABRICKS_SQL_WAREHOUSE_ID or pass warehouse_id.'
+          ),
+        }
+
+      warmer = _warehouse_warmer()
+      result = warmer.warm(warehouse_id, wait=wait)
+      return {'success': True, **result, 'stats': warmer.stats()}
+
+    except Exception as e:
+      print(f'❌ Error warming warehouse: {str(e)}')
+      return {'success': False, 'error': f'Error: {str(e)}'}
+
+  @mcp_server.tool
+  @offload
   def list_dbfs_files(path: str = '/') -> dict:
     """List files and directories in DBFS (Databricks File System).
 
@@ -144,22 +502,21 @@ def load_tools(mcp_server):
         Dictionary with file listings or error message
     """
     try:
-      # Initialize Databricks SDK
-      w = WorkspaceClient(
-        host=os.environ.get('DATABRICKS_HOST'), token=os.environ.get('DATABRICKS_TOKEN')
-      )
+      # Reuse the pooled Databricks SDK client
+      w = _workspace_client()
 
       # List files in DBFS
       files = []
-      for file_info in w.dbfs.list(path):
-        files.append(
-          {
-            'path': file_info.path,
-            'is_dir': file_info.is_dir,
-            'size': file_info.file_size if not file_info.is_dir else None,
-            'modification_time': file_info.modification_time,
-          }
-        )
+      with trace_span('databricks.dbfs.list', path=path):
+        for file_info in w.dbfs.list(path):
+          files.append(
+            {
+              'path': file_info.path,
+              'is_dir': file_info.is_dir,
+              'size': file_info.file_size if not file_info.is_dir else None,
+              'modification_time': file_info.modification_time,
+            }
+          )
 
       return {
         'success': True,
@@ -0,0 +1,194 @@
+"""Per-warehouse admission of statements, waited for on the event loop."""
+
+import asyncio
+import threading
+
+import pytest
+from databricks.sdk import WorkspaceClient
+
+from benchmarks.fake_databricks import FakeDatabricksServer, FakeWorkspace
+from server.services.admission import AdmissionController, AdmissionRejected
+from server.services.blocking import BlockingExecutor, run_blocking
+from server.services.chunk_cache import ResultChunkCache
+from server.services.result_cache import QueryResultCache
+from server.services.single_flight import SingleFlight
+from server.services.statement_service import StatementService
+
+
+@pytest.mark.asyncio
+async def test_queued_callers_do_not_hold_executor_workers():
+  """Statements waiting for a warehouse slot leave the blocking executor free."""
+  controller = AdmissionController(max_in_flight=1, max_queue=10, queue_timeout=5)
+  executor = BlockingExecutor(max_workers=1)
+  await controller.acquire_async('w', 'holder')
+  waiters = [asyncio.create_task(controller.acquire_async('w', f'c{i}')) for i in range(5)]
+  await asyncio.sleep(0.05)
+
+  try:
+    # Every caller is queued, yet the only worker is free for other SDK calls
+    assert await asyncio.wait_for(executor.run(lambda: 'free'), 1) == 'free'
+    assert controller.stats()['warehouses']['w']['queued'] == 5
+
+    for _ in waiters:
+      controller.release('w')
+      await asyncio.sleep(0.01)
+    await asyncio.gather(*waiters)
+  finally:
+    executor.shutdown()
+
+  assert controller.stats()['warehouses']['w']['admitted'] == 6
+
+
+@pytest.mark.asyncio
+async def test_callers_are_served_round_robin():
+  """A caller with several queued statements does not go ahead of the others."""
+  controller = AdmissionController(max_in_flight=1, max_queue=10, queue_timeout=5)
+  await controller.acquire_async('w', 'holder')
+  order = []
+
+  async def run(caller):
+    await controller.acquire_async('w', caller)
+    order.append(caller)
+    await asyncio.sleep(0.01)
+    controller.release('w')
+
+  tasks = [asyncio.create_task(run(caller)) for caller in ('a', 'a', 'b')]
+  await asyncio.sleep(0.05)
+  controller.release('w')
+  await asyncio.gather(*tasks)
+
+  assert order == ['a', 'b', 'a']
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_at_once():
+  """Requests that do not fit the queue fail fast with a retry-after hint."""
+  controller = AdmissionController(max_in_flight=1, max_queue=0)
+  await controller.acquire_async('w')
+
+  with pytest.raises(AdmissionRejected) as rejected:
+    await asyncio.wait_for(controller.acquire_async('w'), 0.5)
+
+  assert rejected.value.reason == 'queue full'
+  assert rejected.value.retry_after >= 1
+
+
+@pytest.mark.asyncio
+async def test_wait_times_out():
+  """A request that waits longer than queue_timeout is rejected and dequeued."""
+  controller = AdmissionController(max_in_flight=1, max_queue=10, queue_timeout=0.1)
+  await controller.acquire_async('w', 'a')
+
+  with pytest.raises(AdmissionRejected) as rejected:
+    await controller.acquire_async('w', 'b')
+
+  assert rejected.value.reason == 'queue wait timed out'
+  assert controller.stats()['warehouses']['w']['queued'] == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_wait_gives_up_its_place():
+  """A cancelled caller leaves the queue and never holds a slot."""
+  controller = AdmissionController(max_in_flight=1, max_queue=10, queue_timeout=5)
+  await controller.acquire_async('w', 'a')
+  waiter = asyncio.create_task(controller.acquire_async('w', 'b'))
+  await asyncio.sleep(0.05)
+
+  waiter.cancel()
+  with pytest.raises(asyncio.CancelledError):
+    await waiter
+  controller.release('w')
+
+  stats = controller.stats()['warehouses']['w']
+  assert stats['queued'] == 0
+  assert stats['in_flight'] == 0
+
+
+@pytest.mark.asyncio
+async def test_async_and_thread_callers_share_slots():
+  """A slot released by a thread is granted to a waiting coroutine and back."""
+  controller = AdmissionController(max_in_flight=1, max_queue=10, queue_timeout=5)
+  await controller.acquire_async('w', 'a')
+  waiter = asyncio.create_task(controller.acquire_async('w', 'b'))
+  await asyncio.sleep(0.05)
+
+  threading.Thread(target=controller.release, args=('w',)).start()
+  await asyncio.wait_for(waiter, 1)
+
+  admitted = threading.Event()
+  thread = threading.Thread(target=lambda: (controller.acquire('w', 'c'), admitted.set()))
+  thread.start()
+  await asyncio.sleep(0.05)
+  assert not admitted.is_set()
+  controller.release('w')
+  await asyncio.to_thread(thread.join, 1)
+
+  assert admitted.is_set()
+
+
+@pytest.fixture
+def slow_statements():
+  """A fake workspace whose statements run for 0.3 s."""
+  workspace = FakeWorkspace(latency=0, statement_seconds=0.3, rows=10)
+  server = FakeDatabricksServer(workspace).start()
+  yield WorkspaceClient(host=server.url, token='test')
+  server.shutdown()
+  server.server_close()
+
+
+def service_for(client: WorkspaceClient, controller: AdmissionController) -> StatementService:
+  """A statement service admitting through controller, with its own caches."""
+  return StatementService(
+    client,
+    cache=QueryResultCache(),
+    flight=SingleFlight(),
+    admission=controller,
+    chunks=ResultChunkCache(),
+  )
+
+
+@pytest.mark.asyncio
+async def test_async_submissions_hold_a_slot_until_they_finish(slow_statements):
+  """A submitted statement counts against the limit until a terminal state is seen."""
+  controller = AdmissionController(max_in_flight=1, max_queue=0)
+  service = service_for(slow_statements, controller)
+
+  submitted = await service.query('w', 'SELECT 1', async_mode=True)
+  rejected = await service.query('w', 'SELECT 2', async_mode=True)
+  assert submitted['done'] is False
+  assert 'retry_after_seconds' in rejected
+  assert controller.stats()['warehouses']['w']['held_by_running_statements'] == 1
+
+  await asyncio.sleep(0.35)
+  assert service.get_status(submitted['statement_id'])['done']
+  assert controller.stats()['warehouses']['w']['in_flight'] == 0
+  assert (await service.query('w', 'SELECT 3', async_mode=True))['success']
+
+
+@pytest.mark.asyncio
+async def test_cancel_frees_the_slot_of_a_running_statement(slow_statements):
+  """Cancelling a statement that still holds a slot gives the slot back."""
+  controller = AdmissionController(max_in_flight=1, max_queue=0)
+  service = service_for(slow_statements, controller)
+
+  submitted = await service.query('w', 'SELECT 1', async_mode=True)
+  await run_blocking(service.cancel, submitted['statement_id'])
+
+  assert controller.stats()['warehouses']['w']['in_flight'] == 0
+
+
+@pytest.mark.asyncio
+async def test_unsettled_holds_expire():
+  """A running statement nobody polls keeps its slot for at most hold_timeout."""
+  controller = AdmissionController(max_in_flight=1, max_queue=0, hold_timeout=0.1)
+  await controller.acquire_async('w')
+  controller.hold('w', 'forgotten')
+
+  await asyncio.sleep(0.15)
+  await asyncio.wait_for(controller.acquire_async('w'), 0.5)
+
+  stats = controller.stats()['warehouses']['w']
+  assert (stats['in_flight'], stats['expired_holds']) == (1, 1)
+  # Settling after the expiry does not free a slot a second time
+  controller.settle('forgotten')
+  assert controller.stats()['warehouses']['w']['in_flight'] == 1
@@ -0,0 +1,124 @@
+"""Retention and downloads of query result artifacts."""
+
+import os
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from server.routers import artifacts
+from server.services.artifact_store import ArtifactStore
+
+
+def write_bytes(size: int):
+  """Artifact writer producing size bytes."""
+
+  def write(path: str) -> None:
+    with open(path, 'wb') as f:
+      f.write(b'x' * size)
+
+  return write
+
+
+def age(store: ArtifactStore, artifact_id: str, seconds: float) -> None:
+  """Pretend an artifact was written seconds ago."""
+  path = os.path.join(store.directory, f'{artifact_id}.bin')
+  then = time.time() - seconds
+  os.utime(path, (then, then))
+
+
+@pytest.fixture
+def store(tmp_path):
+  """A store in a temporary directory with a 60 s TTL and a 1,000-byte budget."""
+  return ArtifactStore(str(tmp_path), ttl=60, max_bytes=1000)
+
+
+def test_save_returns_a_download_url_not_a_path(store):
+  """Callers get an ID and URL, the filesystem layout stays private."""
+  artifact = store.save(write_bytes(10), '.bin')
+
+  assert artifact['url'] == f'/api/artifacts/{artifact["id"]}'
+  assert artifact['bytes'] == 10
+  assert 'path' not in artifact
+
+
+def test_expired_artifacts_are_swept(store):
+  """Artifacts older than the TTL are deleted by the next write."""
+  old = store.save(write_bytes(10), '.bin')
+  age(store, old['id'], 120)
+
+  new = store.save(write_bytes(10), '.bin')
+
+  assert store.open(old['id']) is None
+  assert store.open(new['id']) is not None
+  assert store.stats()['artifacts'] == 1
+
+
+def test_oldest_artifacts_go_beyond_max_bytes(store):
+  """The total size is kept under max_bytes by deleting the oldest artifacts."""
+  ids = []
+  for i in range(4):
+    ids.append(store.save(write_bytes(400), '.bin')['id'])
+    age(store, ids[-1], 10 - i)
+
+  store.sweep()
+
+  assert [store.open(i) is not None for i in ids] == [False, False, True, True]
+  assert store.stats()['bytes'] <= 1000
+
+
+def test_the_artifact_just_written_is_never_swept(store):
+  """A write larger than max_bytes evicts older artifacts but keeps its own URL working."""
+  old = store.save(write_bytes(10), '.bin')
+
+  big = store.save(write_bytes(5000), '.bin')
+
+  assert store.open(big['id']) is not None
+  assert store.open(old['id']) is None
+
+
+def test_owners_of_removed_files_are_forgotten(store):
+  """Owner entries go with their files, also when something else deleted them."""
+  swept = store.save(write_bytes(10), '.bin', owner='alice@example.com')
+  removed = store.save(write_bytes(10), '.bin', owner='alice@example.com')
+  age(store, swept['id'], 120)
+  os.remove(os.path.join(store.directory, f'{removed["id"]}.bin'))
+
+  kept = store.save(write_bytes(10), '.bin')
+
+  assert set(store._owners) == {kept['id']}
+
+
+def test_only_the_owner_can_open_an_artifact(store):
+  """An artifact written for a user is invisible to everybody else."""
+  mine = store.save(write_bytes(10), '.bin', owner='alice@example.com')
+  shared = store.save(write_bytes(10), '.bin')
+
+  assert store.open(mine['id'], 'alice@example.com') is not None
+  assert store.open(mine['id'], 'bob@example.com') is None
+  assert store.open(mine['id']) is None
+  assert store.open(shared['id'], 'bob@example.com') is not None
+
+
+def test_unknown_ids_are_not_resolved(store):
+  """IDs not written by this store, including path tricks, are not found."""
+  assert store.open('0' * 32) is None
+  assert store.open('../../etc/passwd') is None
+
+
+def test_download_route_checks_the_forwarded_user(store, monkeypatch):
+  """The route serves the file to its owner and answers 404 to anyone else."""
+  monkeypatch.setattr(artifacts, 'get_artifact_store', lambda: store)
+  app = FastAPI()
+  app.include_router(artifacts.router, prefix='/api/artifacts')
+  client = TestClient(app)
+  artifact = store.save(write_bytes(10), '.parquet', owner='alice@example.com')
+
+  response = client.get(artifact['url'], headers={'X-Forwarded-Email': 'alice@example.com'})
+  assert response.status_code == 200
+  assert response.content == b'x' * 10
+  assert response.headers['content-type'] == 'application/vnd.apache.parquet'
+
+  response = client.get(artifact['url'], headers={'X-Forwarded-Email': 'bob@example.com'})
+  assert response.status_code == 404
@@ -0,0 +1,69 @@
+"""Concurrency of query batches."""
+
+import asyncio
+
+import pytest
+from fastmcp import FastMCP
+
+from server import tools
+from server.services.batch_executor import BatchExecutor
+from server.tools import BatchQuery, load_tools
+
+
+@pytest.mark.asyncio
+async def test_batch_runs_at_most_max_concurrency_jobs():
+  """Jobs on one warehouse share only the batch limit; results keep job order."""
+  running = 0
+  peak = 0
+
+  def make_job(index: int):
+    async def job() -> dict:
+      nonlocal running, peak
+      running += 1
+      peak = max(peak, running)
+      await asyncio.sleep(0.01)
+      running -= 1
+      return {'success': True, 'value': index}
+
+    return 'wh', job
+
+  entries = await BatchExecutor(max_concurrency=6).run([make_job(i) for i in range(12)])
+
+  assert peak == 6
+  assert [entry['result']['value'] for entry in entries] == list(range(12))
+
+
+@pytest.mark.asyncio
+async def test_failed_jobs_become_error_results():
+  """An exception from one job is reported in its entry, the others still finish."""
+
+  async def fail() -> dict:
+    raise RuntimeError('boom')
+
+  async def succeed() -> dict:
+    return {'success': True}
+
+  entries = await BatchExecutor().run([('wh', fail), ('wh', succeed)])
+
+  assert entries[0]['result'] == {'success': False, 'error': 'Error: boom'}
+  assert entries[1]['result'] == {'success': True}
+
+
+@pytest.mark.asyncio
+async def test_batch_setup_errors_are_returned_not_raised(monkeypatch):
+  """A failure before any query runs is an error result, as with the other tools."""
+
+  def no_client():
+    raise ValueError('default auth: cannot configure default credentials')
+
+  monkeypatch.setattr(tools, '_workspace_client', no_client)
+  mcp_server = FastMCP(name='test')
+  load_tools(mcp_server)
+  execute_dbsql_batch = (await mcp_server.get_tools())['execute_dbsql_batch'].fn
+
+  result = await execute_dbsql_batch([BatchQuery(query='SELECT 1', warehouse_id='wh')])
+
+  assert result == {
+    'success': False,
+    'error': 'Error: default auth: cannot configure default credentials',
+  }
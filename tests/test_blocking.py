@@ -0,0 +1,153 @@
+"""The event loop keeps running while blocking SDK calls are offloaded."""
+
+import asyncio
+import contextvars
+import time
+
+import pytest
+from fastmcp import FastMCP
+
+from benchmarks.fake_databricks import FakeDatabricksServer, FakeWorkspace
+from server.services import warehouse_inventory, warehouse_warmer, workspace_client
+from server.services.blocking import BlockingExecutor, offload, run_blocking
+from server.tools import BatchQuery, load_tools
+
+CALLS = 16
+CALL_SECONDS = 0.2
+TICK_SECONDS = 0.005
+MAX_LAG_SECONDS = 0.05
+
+
+def slow_sdk_call(n: int) -> int:
+  """Stand-in for a Databricks SDK call: a blocking HTTP round trip."""
+  time.sleep(CALL_SECONDS)
+  return n
+
+
+async def max_loop_lag(work) -> tuple[list, float]:
+  """Await work while a ticker measures how late the event loop wakes it up."""
+  lags = []
+  done = asyncio.Event()
+
+  async def ticker():
+    while not done.is_set():
+      expected = time.perf_counter() + TICK_SECONDS
+      await asyncio.sleep(TICK_SECONDS)
+      lags.append(time.perf_counter() - expected)
+
+  ticking = asyncio.create_task(ticker())
+  try:
+    results = await work
+  finally:
+    done.set()
+    await ticking
+  return results, max(lags)
+
+
+@pytest.mark.asyncio
+async def test_offloaded_calls_do_not_block_the_loop():
+  """Slow offloaded calls run concurrently while the loop keeps ticking."""
+  tool = offload(slow_sdk_call)
+  started = time.perf_counter()
+  results, lag = await max_loop_lag(asyncio.gather(*(tool(n) for n in range(CALLS))))
+
+  assert results == list(range(CALLS))
+  assert lag < MAX_LAG_SECONDS
+  # The calls ran concurrently, not one after another
+  assert time.perf_counter() - started < CALLS * CALL_SECONDS / 2
+
+
+@pytest.mark.asyncio
+async def test_inline_calls_block_the_loop():
+  """The same calls made inline stall the loop, so the lag bound means something."""
+
+  async def inline():
+    await asyncio.sleep(TICK_SECONDS)  # Let the ticker start
+    return [slow_sdk_call(n) for n in range(2)]
+
+  _, lag = await max_loop_lag(inline())
+
+  assert lag >= CALL_SECONDS
+
+
+@pytest.mark.asyncio
+async def test_saturated_pool_queues_without_blocking_the_loop():
+  """Calls beyond max_workers wait in the pool, not on the loop."""
+  executor = BlockingExecutor(max_workers=2)
+  try:
+    calls = asyncio.gather(*(executor.run(slow_sdk_call, n) for n in range(6)))
+    results, lag = await max_loop_lag(calls)
+  finally:
+    executor.shutdown()
+
+  assert results == list(range(6))
+  assert lag < MAX_LAG_SECONDS
+  stats = executor.stats()
+  assert stats['peak_active'] == 2
+  assert stats['saturated'] > 0
+  assert stats['completed'] == 6
+
+
+@pytest.mark.asyncio
+async def test_calls_see_the_callers_context():
+  """Worker threads run with the caller's contextvars."""
+  user = contextvars.ContextVar('user')
+  user.set('alice@example.com')
+
+  assert await run_blocking(user.get) == 'alice@example.com'
+
+
+@pytest.mark.asyncio
+async def test_offload_keeps_the_signature():
+  """Offloaded tools keep the metadata FastMCP builds their schema from."""
+  tool = offload(slow_sdk_call)
+
+  assert tool.__name__ == 'slow_sdk_call'
+  assert tool.__doc__ == slow_sdk_call.__doc__
+  assert asyncio.iscoroutinefunction(tool)
+
+
+@pytest.fixture
+def slow_workspace(monkeypatch):
+  """The tools' shared services pointed at a fake workspace answering after CALL_SECONDS."""
+  workspace = FakeWorkspace(latency=CALL_SECONDS, statement_seconds=0, rows=10)
+  server = FakeDatabricksServer(workspace).start()
+  monkeypatch.setenv('DATABRICKS_HOST', server.url)
+  monkeypatch.setenv('DATABRICKS_TOKEN', 'test')
+  # Fresh, cold singletons: no cached clients, inventory or warm-up state
+  monkeypatch.setattr(workspace_client, '_registry', None)
+  monkeypatch.setattr(warehouse_inventory, '_inventory', None)
+  monkeypatch.setattr(warehouse_warmer, '_warmer', None)
+  mcp_server = FastMCP(name='test')
+  load_tools(mcp_server)
+  yield workspace, mcp_server
+  server.shutdown()
+  server.server_close()
+
+
+@pytest.mark.asyncio
+async def test_execute_dbsql_does_not_block_the_loop(slow_workspace):
+  """Every workspace call of the tool, cold inventory included, is made off the loop."""
+  workspace, mcp_server = slow_workspace
+  execute_dbsql = (await mcp_server.get_tools())['execute_dbsql'].fn
+
+  result, lag = await max_loop_lag(
+    execute_dbsql('SELECT 1', warehouse_id='wh-explicit', use_cache=False)
+  )
+
+  assert result['success'], result
+  assert workspace.stats()['requests']['statements.execute'] == 1
+  assert lag < MAX_LAG_SECONDS
+
+
+@pytest.mark.asyncio
+async def test_execute_dbsql_batch_does_not_block_the_loop(slow_workspace):
+  """Batch queries, including automatic warehouse selection, keep the loop responsive."""
+  workspace, mcp_server = slow_workspace
+  execute_dbsql_batch = (await mcp_server.get_tools())['execute_dbsql_batch'].fn
+  queries = [BatchQuery(query=f'SELECT {n}', use_cache=False) for n in range(4)]
+
+  result, lag = await max_loop_lag(execute_dbsql_batch(queries))
+
+  assert [entry['result']['success'] for entry in result['results']] == [True] * 4
+  assert lag < MAX_LAG_SECONDS
@@ -0,0 +1,63 @@
+"""Discovery document caching and invalidation."""
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from fastmcp import FastMCP
+
+from server.routers import mcp_info
+from server.services.discovery import DiscoveryCache
+from server.services.prompt_registry import PromptRegistry
+
+
+def make_client() -> tuple[TestClient, FastMCP, DiscoveryCache]:
+  """A client of an app serving the discovery routes for a server with one tool."""
+  mcp_server = FastMCP(name='test')
+
+  @mcp_server.tool
+  def ping() -> str:
+    """Answer pong."""
+    return 'pong'
+
+  cache = DiscoveryCache(mcp_server, 'test', PromptRegistry())
+  app = FastAPI()
+  app.state.servername = 'test'
+  app.state.discovery_cache = cache
+  app.include_router(mcp_info.router, prefix='/api/mcp_info')
+  return TestClient(app), mcp_server, cache
+
+
+def test_unchanged_tools_are_served_from_the_snapshot():
+  """Repeated requests reuse the document and honour If-None-Match."""
+  client, _, cache = make_client()
+
+  first = client.get('/api/mcp_info/discovery')
+  again = client.get('/api/mcp_info/discovery', headers={'If-None-Match': first.headers['etag']})
+
+  assert first.json()['tools'] == [{'name': 'ping', 'description': 'Answer pong.'}]
+  assert again.status_code == 304
+  assert cache.stats()['rebuilds'] == 1
+  assert cache.stats()['not_modified'] == 1
+
+
+def test_tools_added_at_runtime_rebuild_the_document():
+  """A tool registered after the first request shows up in the next one."""
+  client, mcp_server, cache = make_client()
+  client.get('/api/mcp_info/discovery')
+
+  @mcp_server.tool
+  def echo(text: str) -> str:
+    """Repeat text."""
+    return text
+
+  response = client.get('/api/mcp_info/discovery')
+
+  assert [tool['name'] for tool in response.json()['tools']] == ['ping', 'echo']
+  assert response.headers['X-Discovery-Version'] == '2'
+  assert cache.stats()['rebuilds'] == 2
+
+
+def test_config_reports_the_app_server_name():
+  """The server name comes from the app, not from importing server.app."""
+  client, _, _ = make_client()
+
+  assert client.get('/api/mcp_info/config').json()['servername'] == 'test'
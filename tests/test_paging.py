@@ -0,0 +1,131 @@
+"""Paging through statement results against the fake workspace."""
+
+import pytest
+from databricks.sdk import WorkspaceClient
+from databricks.sdk.service.sql import ResultData
+from fastmcp import FastMCP
+
+from benchmarks.fake_databricks import FakeDatabricksServer, FakeWorkspace
+from server.services import statement_service
+from server.services.admission import AdmissionController
+from server.services.chunk_cache import ResultChunkCache
+from server.services.result_cache import QueryResultCache
+from server.services.single_flight import SingleFlight
+from server.services.statement_service import StatementService
+from server.tools import load_tools
+
+
+@pytest.fixture
+def workspace():
+  """A fake workspace whose statements return 10,000 rows in 2,000-row chunks."""
+  workspace = FakeWorkspace(latency=0, statement_seconds=0, rows=10000, chunk_rows=2000)
+  server = FakeDatabricksServer(workspace).start()
+  yield workspace, WorkspaceClient(host=server.url, token='test')
+  server.shutdown()
+  server.server_close()
+
+
+def service_for(
+  client: WorkspaceClient, user: str = None, chunks: ResultChunkCache = None
+) -> StatementService:
+  """A statement service with its own caches, so tests do not share state."""
+  return StatementService(
+    client,
+    cache=QueryResultCache(),
+    flight=SingleFlight(),
+    admission=AdmissionController(),
+    user=user,
+    chunks=chunks or ResultChunkCache(),
+  )
+
+
+@pytest.mark.asyncio
+async def test_each_chunk_is_downloaded_once(workspace):
+  """Pages within a chunk reuse it instead of downloading it for every page."""
+  fake, client = workspace
+  service = service_for(client)
+
+  page = await service.query('w', 'SELECT * FROM t', limit=500, use_cache=False)
+  rows = page['row_count']
+  pages = 1
+  while page['next_page_token']:
+    page = service.fetch_page(page['next_page_token'], 500)
+    rows += page['row_count']
+    pages += 1
+
+  assert (rows, pages) == (10000, 20)
+  # The first chunk came inline with the execute response
+  assert fake.stats()['requests']['statements.chunk'] == 4
+
+
+@pytest.mark.asyncio
+async def test_page_size_does_not_cap_the_result(workspace):
+  """The page size is not a row cap, max_rows is the cap the warehouse applies."""
+  _, client = workspace
+  service = service_for(client)
+
+  uncapped = await service.query('w', 'SELECT * FROM t', limit=100, use_cache=False)
+  capped = await service.query('w', 'SELECT * FROM t', limit=100, max_rows=300, use_cache=False)
+
+  assert uncapped['row_count'] == 100
+  assert uncapped['total_row_count'] == 10000
+  assert capped['row_count'] == 100
+  assert capped['total_row_count'] == 300
+  assert capped['next_page_token'] is not None
+
+
+@pytest.mark.asyncio
+async def test_results_are_capped_without_max_rows(workspace, monkeypatch):
+  """Without max_rows the warehouse still stops at the server's default cap."""
+  _, client = workspace
+  monkeypatch.setattr(statement_service, 'DEFAULT_MAX_ROWS', 3000)
+  service = service_for(client)
+
+  page = await service.query('w', 'SELECT * FROM t', limit=10, use_cache=False)
+  large_page = await service.query('w', 'SELECT * FROM t', limit=5000, use_cache=False)
+
+  assert (page['total_row_count'], page.get('truncated')) == (3000, True)
+  # A first page larger than the cap raises it to the page size
+  assert large_page['total_row_count'] == 5000
+
+
+@pytest.mark.asyncio
+async def test_kept_chunks_belong_to_one_user(workspace):
+  """Another user's pages of the same statement do not come from the first user's chunk."""
+  fake, client = workspace
+  chunks = ResultChunkCache()
+  alice = service_for(client, 'alice@example.com', chunks)
+  bob = service_for(client, 'bob@example.com', chunks)
+
+  page = await alice.query('w', 'SELECT * FROM t', limit=500, use_cache=False)
+  token = page['next_page_token']
+  alice.fetch_page(token, 500)
+  bob.fetch_page(token, 500)
+
+  assert fake.stats()['requests'].get('statements.chunk', 0) == 1
+  assert chunks.stats()['statements'] == 2
+
+
+def test_chunk_cache_keeps_one_chunk_per_statement():
+  """The next chunk of a statement replaces the previous one."""
+  chunks = ResultChunkCache()
+  chunks.put(None, 's', ResultData(chunk_index=0, data_array=[['a' * 10]]))
+  chunks.put(None, 's', ResultData(chunk_index=1, data_array=[['b' * 10]]))
+
+  assert chunks.get(None, 's', 0) is None
+  assert chunks.get(None, 's', 1).data_array == [['b' * 10]]
+  assert chunks.stats()['bytes'] == 10
+
+
+@pytest.mark.asyncio
+async def test_tools_reject_limits_below_one():
+  """A zero limit would hand out the same page token forever, so the tools refuse it."""
+  mcp_server = FastMCP(name='test')
+  load_tools(mcp_server)
+  tools = await mcp_server.get_tools()
+
+  executed = await tools['execute_dbsql'].fn('SELECT 1', warehouse_id='w', limit=0)
+  paged = await tools['fetch_statement_page'].fn('token', limit=0)
+
+  assert executed == {'success': False, 'error': 'Error: limit must be at least 1, got 0'}
+  assert paged == {'success': False, 'error': 'Error: limit must be at least 1, got 0'}
@@ -0,0 +1,88 @@
+"""Prompt changes applied on the event loop and announced to MCP sessions."""
+
+import asyncio
+import threading
+
+import pytest
+
+from server.prompts import PromptListChangedNotifier
+
+
+class FakeRegistry:
+  """Stands in for PromptRegistry: a version and change subscribers."""
+
+  def __init__(self):
+    self.version = 1
+    self.subscribers = []
+
+  def subscribe(self, callback) -> None:
+    """Call callback with the changed names on every change."""
+    self.subscribers.append(callback)
+
+  def change(self, names: set[str]) -> None:
+    """Report a change, as the watcher thread does."""
+    self.version += 1
+    for callback in self.subscribers:
+      callback(names)
+
+
+class FakeSession:
+  """Stands in for an MCP ServerSession and counts GET-stream notifications."""
+
+  def __init__(self):
+    self.notified = 0
+
+  async def send_prompt_list_changed(self) -> None:
+    """Record a prompts/list_changed sent on the GET stream."""
+    self.notified += 1
+
+
+@pytest.mark.asyncio
+async def test_changes_are_applied_on_the_event_loop():
+  """Changes reported by the watcher thread update the server on the loop thread."""
+  registry = FakeRegistry()
+  applied = []
+  notifier = PromptListChangedNotifier(
+    registry, apply=lambda changed: applied.append((changed, threading.get_ident()))
+  )
+  notifier.bind(asyncio.get_running_loop())
+
+  watcher = threading.Thread(target=registry.change, args=({'new_prompt'},))
+  watcher.start()
+  await asyncio.to_thread(watcher.join)
+  await asyncio.sleep(0.01)
+
+  assert applied == [({'new_prompt'}, threading.get_ident())]
+
+
+@pytest.mark.asyncio
+async def test_get_stream_sessions_are_not_told_twice():
+  """Sessions told on their GET stream are marked seen; POST-only ones still are due."""
+  registry = FakeRegistry()
+  notifier = PromptListChangedNotifier(registry)
+  notifier.bind(asyncio.get_running_loop())
+  streaming, posting = FakeSession(), FakeSession()
+  for session, session_id in ((streaming, 'with-stream'), (posting, 'post-only')):
+    notifier._seen[session] = registry.version
+    notifier._session_ids[session] = session_id
+
+  stream_open = asyncio.Event()
+  stream_done = asyncio.Event()
+
+  async def mcp_app(scope, receive, send):
+    stream_open.set()
+    await stream_done.wait()
+
+  scope = {'type': 'http', 'method': 'GET', 'headers': [(b'mcp-session-id', b'with-stream')]}
+  get_stream = asyncio.create_task(notifier.track_streams(mcp_app)(scope, None, None))
+  await stream_open.wait()
+
+  registry.change({'p'})
+  await asyncio.sleep(0.01)
+  stream_done.set()
+  await get_stream
+
+  assert (streaming.notified, posting.notified) == (1, 1)
+  assert notifier._seen[streaming] == registry.version
+  assert notifier._seen[posting] < registry.version
+  assert not notifier._streams
@@ -0,0 +1,480 @@
+"""dba_mcp_proxy forwarding, against an app served by httpx.MockTransport."""
+
+import gzip
+import json
+import sys
+import threading
+import time
+import types
+
+import httpx
+import pytest
+
+from dba_mcp_proxy import mcp_client
+from dba_mcp_proxy.mcp_client import (
+  CircuitBreaker,
+  HttpTransport,
+  MCPProxy,
+  ResponseCache,
+  UpstreamError,
+  iter_sse_events,
+)
+
+APP_URL = 'http://localhost:8000'
+
+
+class FakeApp:
+  """Stands in for the app's MCP endpoint.
+
+  Handshakes open numbered sessions. Other messages are recorded and answered
+  with their method and session, unless a response or exception was queued in
+  replies for them.
+  """
+
+  def __init__(self):
+    self.sessions = 0
+    self.received = []
+    self.replies = []
+    self.lock = threading.Lock()
+
+  def __call__(self, request: httpx.Request) -> httpx.Response:
+    """Answer one HTTP request from the proxy."""
+    if request.method == 'GET':
+      return httpx.Response(405)
+    body = request.content
+    if request.headers.get('content-encoding') == 'gzip':
+      body = gzip.decompress(body)
+    payload = json.loads(body)
+
+    method = payload.get('method') if isinstance(payload, dict) else None
+    if method == 'initialize':
+      with self.lock:
+        self.sessions += 1
+        session_id = f'session-{self.sessions}'
+      result = {'jsonrpc': '2.0', 'id': payload['id'], 'result': {}}
+      return httpx.Response(200, json=result, headers={'mcp-session-id': session_id})
+    if method == 'notifications/initialized':
+      return httpx.Response(202)
+
+    with self.lock:
+      self.received.append(payload)
+      reply = self.replies.pop(0) if self.replies else None
+    if isinstance(reply, Exception):
+      raise reply
+    return reply or self.answer(payload, request.headers.get('mcp-session-id'))
+
+  def answer(self, payload: dict | list, session_id: str | None) -> httpx.Response:
+    """Answer each request in a message or batch with its method and session."""
+    messages = payload if isinstance(payload, list) else [payload]
+    responses = [
+      {'jsonrpc': '2.0', 'id': m['id'], 'result': {'method': m['method'], 'session': session_id}}
+      for m in messages
+      if 'id' in m and 'method' in m
+    ]
+    if not responses:
+      return httpx.Response(202)
+    return httpx.Response(200, json=responses if isinstance(payload, list) else responses[0])
+
+  def methods(self) -> list[str]:
+    """Methods received after the handshake, batch members included."""
+    messages = [m for p in self.received for m in (p if isinstance(p, list) else [p])]
+    return [m.get('method') for m in messages]
+
+
+def sse(*messages, chunk_size: int = 0) -> httpx.Response:
+  """A text/event-stream response carrying messages, streamed in chunk_size pieces."""
+  body = b''.join(f'event: message\r\ndata: {json.dumps(m)}\r\n\r\n'.encode() for m in messages)
+  content = body
+  if chunk_size:
+    content = iter([body[i : i + chunk_size] for i in range(0, len(body), chunk_size)])
+  return httpx.Response(200, content=content, headers={'content-type': 'text/event-stream'})
+
+
+def mock_transport(app: FakeApp, **kwargs) -> HttpTransport:
+  """An HttpTransport whose requests are answered by app."""
+  http = HttpTransport(max_connections=4, http2=False, **kwargs)
+  http.client = httpx.Client(transport=httpx.MockTransport(app))
+  return http
+
+
+@pytest.fixture
+def proxies():
+  """Create proxies for a local app and shut their thread pools down afterwards."""
+  created = []
+
+  def make(app: FakeApp, http: HttpTransport = None, **kwargs) -> MCPProxy:
+    proxy = MCPProxy(None, APP_URL, transport=http or mock_transport(app), **kwargs)
+    created.append(proxy)
+    return proxy
+
+  yield make
+  for proxy in created:
+    proxy._fanout.shutdown(wait=True)
+    proxy.http.close()
+
+
+def request(request_id, method: str, **params) -> dict:
+  """A JSON-RPC request."""
+  return {'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params}
+
+
+SSE_BODY = (
+  b': keep-alive\r\n\r\n'
+  b'event: message\r\nid: 1\r\ndata: {"a":\r\ndata:1}\r\n\r\n'
+  b'retry: 100\n'
+  b'data: second\n\n'
+  b'data:  last, unterminated'
+)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, len(SSE_BODY)])
+def test_sse_events_are_parsed_whatever_the_chunking(chunk_size):
+  """CRLF and LF lines split anywhere across chunks parse to the same events."""
+  chunks = [SSE_BODY[i : i + chunk_size] for i in range(0, len(SSE_BODY), chunk_size)]
+
+  events = list(iter_sse_events(chunks))
+
+  assert events == ['{"a":\n1}', 'second', ' last, unterminated']
+
+
+def test_sse_events_are_yielded_as_they_arrive():
+  """An event is handed on once its blank line arrives, before the stream ends."""
+  seen = []
+
+  def chunks():
+    yield b'data: first\r\n'
+    yield b'\r\n'
+    seen.append('second chunk read')
+    yield b'data: second\r\n\r\n'
+
+  events = iter_sse_events(chunks())
+
+  assert next(events) == 'first'
+  assert seen == []
+  assert list(events) == ['second']
+
+
+def test_stream_notifications_are_forwarded_ahead_of_the_response(proxies, capsys):
+  """Progress on a chunked stream is written to stdout and the response returned."""
+  app = FakeApp()
+  progress = {'jsonrpc': '2.0', 'method': 'notifications/progress', 'params': {'progress': 1}}
+  result = {'jsonrpc': '2.0', 'id': 7, 'result': {'rows': 3}}
+  app.replies.append(sse(progress, result, chunk_size=5))
+  proxy = proxies(app)
+
+  response = proxy.proxy_request(request(7, 'tools/call', name='execute_dbsql'))
+
+  assert response == result
+  assert [json.loads(line) for line in capsys.readouterr().out.splitlines()] == [progress]
+
+
+def test_stream_ending_early_answers_with_an_error(proxies, capsys):
+  """A stream that closes without the response yields a JSON-RPC error, not a hang."""
+  app = FakeApp()
+  app.replies.append(sse({'jsonrpc': '2.0', 'method': 'notifications/message'}))
+  proxy = proxies(app)
+
+  response = proxy.proxy_request(request(1, 'tools/call', name='slow'))
+
+  assert response['id'] == 1
+  assert 'Stream ended' in response['error']['message']
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+  """Retry at once instead of backing off."""
+  monkeypatch.setattr(mcp_client, 'RETRY_BASE_DELAY', 0)
+
+
+def test_circuit_opens_at_the_threshold_and_lets_one_probe_through():
+  """Consecutive failures open the circuit; after the reset timeout one probe decides."""
+  breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+  breaker.record_failure()
+  assert breaker.allow() and breaker.state == 'closed'
+
+  breaker.record_failure()
+  assert not breaker.allow()
+  assert breaker.state == 'open' and breaker.retry_after() > 0
+
+  time.sleep(0.06)
+  assert breaker.allow() and breaker.state == 'half-open'
+  assert not breaker.allow()
+  breaker.record_failure()
+  assert breaker.state == 'open' and breaker.trips == 2
+
+  time.sleep(0.06)
+  assert breaker.allow()
+  breaker.record_success()
+  assert breaker.state == 'closed' and breaker.allow()
+
+
+def test_open_circuit_fails_fast(proxies, no_backoff):
+  """While the circuit is open requests are answered locally without reaching the app."""
+  app = FakeApp()
+  proxy = proxies(app, max_retries=0)
+  proxy.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+  app.replies.append(httpx.ConnectError('refused'))
+
+  first = proxy.proxy_request(request(1, 'tools/call', name='a'))
+  second = proxy.proxy_request(request(2, 'tools/call', name='b'))
+
+  assert 'refused' in first['error']['message']
+  assert 'circuit open' in second['error']['message']
+  assert app.methods() == ['tools/call']
+
+
+@pytest.mark.parametrize(
+  'error, idempotent, sent, plan',
+  [
+    (httpx.ConnectError('refused'), False, True, (True, None)),
+    (httpx.ReadTimeout('timed out'), False, True, (False, None)),
+    (httpx.ReadTimeout('timed out'), True, True, (True, None)),
+    (UpstreamError(502, 'Bad Gateway'), False, True, (False, None)),
+    (UpstreamError(502, 'Bad Gateway'), False, False, (True, None)),
+    (UpstreamError(502, 'Bad Gateway'), True, True, (True, None)),
+    (UpstreamError(429, 'Too Many Requests', retry_after=2), False, True, (True, 2)),
+    (UpstreamError(503, 'Unavailable'), False, True, (True, None)),
+    (UpstreamError(401, 'Unauthorized'), False, True, (True, 0)),
+    (UpstreamError(404, 'Not Found'), False, True, (True, 0)),
+    (UpstreamError(400, 'Bad Request: Missing session ID'), False, True, (True, 0)),
+    (UpstreamError(400, 'Bad Request'), False, True, (False, None)),
+    (ValueError('bad JSON'), True, True, (False, None)),
+  ],
+)
+def test_retry_plan(proxies, error, idempotent, sent, plan):
+  """Non-idempotent requests are only replayed when the server cannot have run them."""
+  proxy = proxies(FakeApp())
+
+  assert proxy._plan_retry(error, None, idempotent, sent) == plan
+
+
+def test_tool_call_that_never_connected_is_replayed(proxies, no_backoff):
+  """A connection refused before sending is retried, and the call runs once."""
+  app = FakeApp()
+  app.replies.append(httpx.ConnectError('refused'))
+  proxy = proxies(app)
+
+  response = proxy.proxy_request(request(1, 'tools/call', name='insert_rows'))
+
+  assert response['result']['method'] == 'tools/call'
+  assert app.methods() == ['tools/call', 'tools/call']
+  assert proxy.stats()['retries'] == 1 and proxy.stats()['recovered'] == 1
+
+
+@pytest.mark.parametrize(
+  'failure', [httpx.ReadTimeout('timed out'), httpx.Response(502, text='Bad Gateway')]
+)
+def test_tool_call_the_server_may_have_run_is_not_replayed(proxies, no_backoff, failure):
+  """A tools/call lost after it was sent fails instead of risking a second run."""
+  app = FakeApp()
+  app.replies.append(failure)
+  proxy = proxies(app)
+
+  response = proxy.proxy_request(request(1, 'tools/call', name='insert_rows'))
+
+  assert response['id'] == 1 and 'error' in response
+  assert app.methods() == ['tools/call']
+
+
+def test_idempotent_request_lost_in_flight_is_replayed(proxies, no_backoff):
+  """Listings are safe to repeat, so a timed out tools/list is retried."""
+  app = FakeApp()
+  app.replies.append(httpx.ReadTimeout('timed out'))
+  proxy = proxies(app)
+
+  response = proxy.proxy_request(request(1, 'tools/list'))
+
+  assert response['result']['method'] == 'tools/list'
+  assert app.methods() == ['tools/list', 'tools/list']
+
+
+def test_expired_session_is_renewed_and_the_call_replayed(proxies):
+  """A 404 for the session re-runs the handshake and replays the call on the new session."""
+  app = FakeApp()
+  proxy = proxies(app)
+  proxy.proxy_request(request(1, 'ping'))
+  app.replies.append(httpx.Response(404, text='Session not found'))
+
+  response = proxy.proxy_request(request(2, 'tools/call', name='insert_rows'))
+
+  assert response['result'] == {'method': 'tools/call', 'session': 'session-2'}
+  assert app.sessions == 2
+  assert proxy.stats()['session_renewals'] == 1
+
+
+def test_listings_are_answered_from_the_cache(proxies):
+  """A repeated tools/list is served locally, addressed to the new request id."""
+  app = FakeApp()
+  proxy = proxies(app)
+
+  first = proxy.proxy_request(request(1, 'tools/list'))
+  again = proxy.proxy_request(request(2, 'tools/list', _meta={'progressToken': 'p'}))
+
+  assert again == {**first, 'id': 2}
+  assert app.methods() == ['tools/list']
+  assert proxy.stats()['cache']['hits'] == 1
+
+
+def test_list_changed_drops_only_its_group(proxies, capsys):
+  """tools/list_changed on a stream refetches tools but keeps cached prompts."""
+  app = FakeApp()
+  proxy = proxies(app)
+  proxy.proxy_request(request(1, 'tools/list'))
+  proxy.proxy_request(request(2, 'prompts/list'))
+  changed = {'jsonrpc': '2.0', 'method': 'notifications/tools/list_changed'}
+  app.replies.append(sse(changed, {'jsonrpc': '2.0', 'id': 3, 'result': {}}))
+
+  proxy.proxy_request(request(3, 'tools/call', name='register_tool'))
+  proxy.proxy_request(request(4, 'tools/list'))
+  proxy.proxy_request(request(5, 'prompts/list'))
+
+  assert app.methods() == ['tools/list', 'prompts/list', 'tools/call', 'tools/list']
+  assert json.loads(capsys.readouterr().out) == changed
+
+
+def test_new_session_drops_the_cache(proxies):
+  """After a re-handshake the app may be a new deployment, so listings are refetched."""
+  app = FakeApp()
+  proxy = proxies(app)
+  proxy.proxy_request(request(1, 'tools/list'))
+  app.replies.append(httpx.Response(404, text='Session not found'))
+
+  proxy.proxy_request(request(2, 'ping'))
+  response = proxy.proxy_request(request(3, 'tools/list'))
+
+  assert response['result']['session'] == 'session-2'
+  assert app.methods() == ['tools/list', 'ping', 'ping', 'tools/list']
+
+
+def test_results_fetched_before_an_invalidation_are_not_stored():
+  """A listing that was in flight when list_changed arrived may be stale and is dropped."""
+  cache = ResponseCache(ttl=60)
+  tools_list = request(1, 'tools/list')
+  generation = cache.generation()
+
+  cache.invalidate('tools')
+  cache.put(tools_list, {'jsonrpc': '2.0', 'id': 1, 'result': {'tools': []}}, generation)
+
+  assert cache.get(tools_list) is None
+
+
+def test_zero_ttl_disables_the_cache(proxies):
+  """With cache_ttl 0 every listing goes to the app."""
+  app = FakeApp()
+  proxy = proxies(app, cache_ttl=0)
+
+  proxy.proxy_request(request(1, 'tools/list'))
+  proxy.proxy_request(request(2, 'tools/list'))
+
+  assert app.methods() == ['tools/list', 'tools/list']
+
+
+def test_http2_falls_back_to_http1_without_h2(proxies, monkeypatch, capsys):
+  """Without the h2 package requests go over HTTP/1.1 instead of failing."""
+  monkeypatch.setitem(sys.modules, 'h2', None)
+  app = FakeApp()
+  http = HttpTransport(max_connections=2, log_timings=True)
+  assert http.http2 is False
+  http.client = httpx.Client(transport=httpx.MockTransport(app))
+
+  response = proxies(app, http=http).proxy_request(request(1, 'tools/call', name='a'))
+
+  assert response['result']['method'] == 'tools/call'
+  timing = json.loads(capsys.readouterr().err.splitlines()[-1].split(' ', 2)[2])
+  assert timing['http_version'] == 'HTTP/1.1' and timing['status'] == 200
+
+
+def test_http2_is_used_when_h2_is_installed(monkeypatch):
+  """HTTP/2 is switched on automatically when h2 can be imported."""
+  monkeypatch.setitem(sys.modules, 'h2', types.ModuleType('h2'))
+
+  http = HttpTransport(max_connections=2)
+
+  assert http.http2 is True
+  http.close()
+
+
+def test_large_request_bodies_are_gzipped():
+  """With compress_requests, bodies of 1 KB or more are sent gzip encoded."""
+  sent = []
+
+  def app(req: httpx.Request) -> httpx.Response:
+    sent.append((req.headers.get('content-encoding'), req.content))
+    return httpx.Response(202)
+
+  http = HttpTransport(max_connections=2, http2=False, compress_requests=True)
+  http.client = httpx.Client(transport=httpx.MockTransport(app))
+  small = request(1, 'tools/call', name='a')
+  large = request(2, 'tools/call', name='a', arguments={'query': 'SELECT 1 ' * 200})
+
+  for payload in (small, large):
+    with http.post(APP_URL, {}, payload) as response:
+      response.read()
+  http.close()
+
+  assert sent[0] == (None, json.dumps(small).encode())
+  assert sent[1][0] == 'gzip'
+  assert json.loads(gzip.decompress(sent[1][1])) == large
+
+
+class SlowToolApp(FakeApp):
+  """A FakeApp whose tool named slow takes a while to answer."""
+
+  def answer(self, payload: dict | list, session_id: str | None) -> httpx.Response:
+    """Answer like FakeApp, after a pause for the slow tool."""
+    if isinstance(payload, dict) and payload['params'].get('name') == 'slow':
+      time.sleep(0.1)
+    return super().answer(payload, session_id)
+
+
+def test_batch_responses_keep_request_order(proxies):
+  """Fanned-out members finishing out of order are answered in request order."""
+  app = SlowToolApp()
+  proxy = proxies(app)
+  proxy.proxy_request(request('listed', 'tools/list'))
+  batch = [
+    request('slow', 'tools/call', name='slow'),
+    {'jsonrpc': '2.0', 'method': 'notifications/cancelled', 'params': {'requestId': 0}},
+    request('fast', 'tools/call', name='fast'),
+    request('cached', 'tools/list'),
+    5,
+  ]
+
+  responses = proxy.proxy_batch(batch)
+
+  assert [r['id'] for r in responses] == ['slow', 'fast', 'cached', None]
+  assert responses[-1]['error']['code'] == -32600
+  assert app.methods().count('tools/list') == 1
+
+
+def test_upstream_batch_responses_are_matched_by_id(proxies):
+  """An array reply in any order is matched to requests, and a missing reply is an error."""
+  app = FakeApp()
+  app.replies.append(
+    httpx.Response(
+      200,
+      json=[
+        {'jsonrpc': '2.0', 'id': 3, 'result': {'n': 3}},
+        {'jsonrpc': '2.0', 'id': 1, 'result': {'n': 1}},
+      ],
+    )
+  )
+  proxy = proxies(app, upstream_batch=True)
+
+  responses = proxy.proxy_batch([request(i, 'tools/call', name='a') for i in (1, 2, 3)])
+
+  assert [r['id'] for r in responses] == [1, 2, 3]
+  assert (responses[0]['result'], responses[2]['result']) == ({'n': 1}, {'n': 3})
+  assert 'No response' in responses[1]['error']['message']
+  assert len(app.received) == 1
+
+
+def test_batch_of_notifications_gets_no_reply(proxies):
+  """A batch holding only notifications is forwarded and answered with nothing."""
+  app = FakeApp()
+  proxy = proxies(app)
+
+  responses = proxy.proxy_batch([{'jsonrpc': '2.0', 'method': 'notifications/cancelled'}])
+
+  assert responses == []
+  assert app.methods() == ['notifications/cancelled']
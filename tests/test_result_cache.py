@@ -0,0 +1,41 @@
+"""Which statements the query result cache treats as read-only."""
+
+import pytest
+
+from server.services.result_cache import is_cacheable_query
+
+
+@pytest.mark.parametrize(
+  'query',
+  [
+    'SELECT * FROM t',
+    '(SELECT 1) UNION (SELECT 2)',
+    'with recent AS (SELECT * FROM t) SELECT * FROM recent;',
+    "WITH a AS (SELECT 'insert into x' AS note) SELECT * FROM a",
+    'WITH a AS (SELECT `update`, created_at FROM t) SELECT * FROM a',
+    'WITH a AS (SELECT 1) -- merge later\nSELECT * FROM a',
+    "SELECT 'a;b' AS s",
+    'SHOW TABLES',
+    'EXPLAIN INSERT INTO t VALUES (1)',
+  ],
+)
+def test_read_only_statements_are_cacheable(query):
+  """Reads, including CTEs that only mention writes in literals or comments, are cached."""
+  assert is_cacheable_query(query)
+
+
+@pytest.mark.parametrize(
+  'query',
+  [
+    'INSERT INTO t SELECT * FROM s',
+    'WITH src AS (SELECT * FROM s) INSERT INTO t SELECT * FROM src',
+    'with src as (select * from s)\nmerge into t using src on t.id = src.id '
+    'when matched then update set *',
+    'WITH a AS (SELECT 1) DELETE FROM t WHERE id IN (SELECT * FROM a)',
+    'SELECT 1; DROP TABLE t',
+    'OPTIMIZE t',
+  ],
+)
+def test_writes_are_not_cacheable(query):
+  """Writes, also behind a CTE or a leading SELECT statement, are never cached."""
+  assert not is_cacheable_query(query)
@@ -0,0 +1,107 @@
+"""Single-flight coalescing of identical concurrent calls."""
+
+import asyncio
+import threading
+
+import pytest
+
+from server.services.admission import AdmissionRejected
+from server.services.single_flight import SharedCallError, SingleFlight
+
+
+class Unbuildable(Exception):
+  """An exception that cannot be rebuilt from its args."""
+
+  def __new__(cls, message: str, *, code: int):
+    """Require code, which args does not carry."""
+    return super().__new__(cls, message)
+
+  def __init__(self, message: str, *, code: int):
+    super().__init__(message)
+    self.code = code
+
+
+@pytest.mark.asyncio
+async def test_followers_raise_their_own_chained_copy_of_the_error():
+  """Each follower raises a new exception of the leader's type, chained to it."""
+  flight = SingleFlight()
+  release = asyncio.Event()
+
+  async def rejected():
+    await release.wait()
+    raise AdmissionRejected('wh', 'queue full', 7)
+
+  tasks = [asyncio.create_task(flight.do_async('q', rejected)) for _ in range(3)]
+  await asyncio.sleep(0)
+  release.set()
+  errors = await asyncio.gather(*tasks, return_exceptions=True)
+
+  leader, *followers = errors
+  assert len({id(e) for e in errors}) == 3
+  for error in followers:
+    assert type(error) is AdmissionRejected
+    assert (str(error), error.retry_after) == (str(leader), 7)
+    assert error.__cause__ is leader
+  assert flight.stats()['saved'] == 2
+
+
+def test_thread_followers_fall_back_to_a_shared_call_error():
+  """Blocking followers get a SharedCallError chained to an error that cannot be copied."""
+  flight = SingleFlight()
+  started, release = threading.Event(), threading.Event()
+  errors = []
+
+  def failing():
+    started.set()
+    release.wait()
+    raise Unbuildable('broken', code=1)
+
+  def call():
+    try:
+      flight.do('q', failing)
+    except Exception as e:
+      errors.append(e)
+
+  leader = threading.Thread(target=call)
+  leader.start()
+  started.wait()
+  follower = threading.Thread(target=call)
+  follower.start()
+  while flight._calls['q'].waiters == 0:
+    pass
+  release.set()
+  leader.join()
+  follower.join()
+
+  leader_error, follower_error = sorted(errors, key=lambda e: isinstance(e, SharedCallError))
+  assert type(leader_error) is Unbuildable
+  assert type(follower_error) is SharedCallError
+  assert follower_error.__cause__ is leader_error
+
+
+@pytest.mark.asyncio
+async def test_followers_rerun_the_call_when_the_leader_is_cancelled():
+  """Cancelling the leader's task hands the call to a follower instead of failing it."""
+  flight = SingleFlight()
+  runs = []
+  release = asyncio.Event()
+
+  async def query():
+    runs.append(asyncio.current_task())
+    await release.wait()
+    return {'rows': len(runs)}
+
+  leader = asyncio.create_task(flight.do_async('q', query))
+  await asyncio.sleep(0)
+  followers = [asyncio.create_task(flight.do_async('q', query)) for _ in range(2)]
+  await asyncio.sleep(0)
+
+  leader.cancel()
+  await asyncio.sleep(0.01)
+  release.set()
+  results = await asyncio.gather(*followers)
+
+  assert leader.cancelled()
+  assert len(runs) == 2
+  assert sorted(shared for _, shared in results) == [False, True]
+  assert [result for result, _ in results] == [{'rows': 2}, {'rows': 2}]
@@ -0,0 +1,132 @@
+"""OAuth token caching and refresh in dba_mcp_proxy."""
+
+import json
+import os
+import stat
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from dba_mcp_proxy import mcp_client
+from dba_mcp_proxy.mcp_client import TokenManager, _parse_expiry
+
+HOST = 'https://example.cloud.databricks.com'
+
+
+class RecordingFetch:
+  """Stands in for the Databricks CLI and hands out numbered tokens."""
+
+  def __init__(self, lifetime: float = 3600):
+    self.lifetime = lifetime
+    self.calls = 0
+
+  def __call__(self, databricks_host: str) -> dict:
+    """Return a token response like `databricks auth token` does."""
+    self.calls += 1
+    expiry = datetime.now(timezone.utc) + timedelta(seconds=self.lifetime)
+    return {'access_token': f'token-{self.calls}', 'expiry': expiry.isoformat()}
+
+
+@pytest.fixture
+def managers(tmp_path):
+  """Create TokenManagers on a temporary cache file and stop their threads afterwards."""
+  created = []
+
+  def make(fetch, **kwargs) -> TokenManager:
+    cache_path = tmp_path / 'cache' / 'tokens.json'
+    manager = TokenManager(HOST, cache_path=cache_path, fetch=fetch, **kwargs)
+    created.append(manager)
+    return manager
+
+  yield make
+  for manager in created:
+    manager.stop()
+
+
+def test_expiry_parsing():
+  """CLI expiries with or without an offset parse to epoch seconds; junk parses to None."""
+  assert _parse_expiry('2030-01-01T00:00:00+00:00') == 1893456000
+  assert _parse_expiry('2030-01-01T01:00:00+01:00') == 1893456000
+  assert _parse_expiry('2030-01-01T00:00:00.123456Z') == pytest.approx(1893456000.123456)
+  assert _parse_expiry('soon') is None
+  assert _parse_expiry(None) is None
+
+
+def test_tokens_without_expiry_get_an_assumed_lifetime(managers):
+  """A CLI response without an expiry is trusted for UNKNOWN_TOKEN_LIFETIME only."""
+  manager = managers(lambda host: {'access_token': 'token'})
+
+  before = time.time()
+  assert manager.get() == 'token'
+
+  assert manager._expires_at == pytest.approx(before + mcp_client.UNKNOWN_TOKEN_LIFETIME, abs=5)
+
+
+def test_cache_file_is_private_and_survives_restarts(managers):
+  """Tokens are written 0600 in a 0700 directory and reused by the next process."""
+  fetch = RecordingFetch()
+  first = managers(fetch)
+  assert first.get() == 'token-1'
+
+  cache = first.cache_path
+  assert stat.S_IMODE(cache.stat().st_mode) == 0o600
+  assert stat.S_IMODE(cache.parent.stat().st_mode) == 0o700
+  assert json.loads(cache.read_text())[HOST]['access_token'] == 'token-1'
+
+  second = managers(fetch)
+  assert second.get() == 'token-1'
+  assert (fetch.calls, second.disk_hits) == (1, 1)
+
+
+def test_cache_readable_by_others_is_ignored(managers):
+  """A cache file other users could read is not trusted."""
+  fetch = RecordingFetch()
+  managers(fetch).get()
+  cache = managers(fetch).cache_path
+  os.chmod(cache, 0o644)
+
+  assert managers(fetch).get() == 'token-2'
+
+
+@pytest.mark.parametrize(
+  'content', ['{not json', '[]', '{"%s": []}' % HOST, '{"%s": {"expires_at": 1}}' % HOST]
+)
+def test_corrupt_or_expired_cache_falls_back_to_the_cli(managers, content):
+  """Unreadable, malformed or expired cache entries lead to a CLI fetch, not an error."""
+  fetch = RecordingFetch()
+  manager = managers(fetch)
+  manager.cache_path.parent.mkdir(mode=0o700)
+  fd = os.open(manager.cache_path, os.O_WRONLY | os.O_CREAT, 0o600)
+  with os.fdopen(fd, 'w') as f:
+    f.write(content)
+
+  assert manager.get() == 'token-1'
+  assert fetch.calls == 1
+  assert json.loads(manager.cache_path.read_text())[HOST]['access_token'] == 'token-1'
+
+
+def test_refresh_keeps_a_token_outside_the_margin(managers):
+  """Concurrent refreshes after one succeeded reuse its token instead of fetching again."""
+  fetch = RecordingFetch()
+  manager = managers(fetch, refresh_margin=300)
+
+  assert manager.refresh() == 'token-1'
+  assert manager.refresh() == 'token-1'
+  assert fetch.calls == 1
+
+
+def test_token_is_refreshed_before_the_margin(managers, monkeypatch):
+  """The background thread fetches a new token refresh_margin seconds before expiry."""
+  monkeypatch.setattr(mcp_client, 'MIN_TOKEN_REFRESH_INTERVAL', 0.05)
+  fetch = RecordingFetch(lifetime=1.5)
+  manager = managers(fetch, refresh_margin=1)
+
+  assert manager.get() == 'token-1'
+  deadline = time.time() + 1.2
+  while fetch.calls < 2 and time.time() < deadline:
+    time.sleep(0.02)
+
+  # Refreshed about 0.5 s in, well before the first token's expiry
+  assert fetch.calls >= 2
+  assert manager.get() != 'token-1'
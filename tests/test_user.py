@@ -0,0 +1,82 @@
+"""Current-user lookups per caller identity."""
+
+import pytest
+from databricks.sdk.errors import Unauthenticated
+from databricks.sdk.service.iam import User
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from server.routers import user
+from server.services.user_service import CurrentUserCache
+
+
+class RecordingUserService:
+  """Stands in for UserService and records the credentials it was built with."""
+
+  calls = []
+
+  def __init__(self, host: str = None, token: str = None):
+    self.calls.append((host, token))
+    self.token = token
+
+  def get_user_info(self) -> dict:
+    """The caller's user for a forwarded token, the app's otherwise."""
+    name = 'caller@example.com' if self.token else 'app@example.com'
+    return {'userName': name, 'displayName': None, 'active': True, 'emails': [name]}
+
+
+@pytest.fixture
+def client(monkeypatch):
+  """A client of an app serving the user routes with a recording UserService."""
+  RecordingUserService.calls = []
+  monkeypatch.setattr(user, 'UserService', RecordingUserService)
+  monkeypatch.setenv('DATABRICKS_HOST', 'https://example.cloud.databricks.com')
+  app = FastAPI()
+  app.include_router(user.router, prefix='/api/user')
+  return TestClient(app)
+
+
+def test_forwarded_token_identifies_the_caller(client):
+  """On Databricks Apps the route looks up the user of the forwarded token."""
+  response = client.get('/api/user/me', headers={'X-Forwarded-Access-Token': 'user-token'})
+
+  assert response.json()['userName'] == 'caller@example.com'
+  assert RecordingUserService.calls == [('https://example.cloud.databricks.com', 'user-token')]
+
+
+def test_without_a_forwarded_token_the_app_identity_is_used(client):
+  """Locally there is no forwarded token, so the app's own credentials are used."""
+  response = client.get('/api/user/me')
+
+  assert response.json()['userName'] == 'app@example.com'
+  assert RecordingUserService.calls == [(None, None)]
+
+
+def test_cache_is_keyed_by_identity():
+  """Different identities never see each other's user."""
+  cache = CurrentUserCache()
+
+  alice = cache.get(('host', 'a'), lambda: User(user_name='alice'))
+  bob = cache.get(('host', 'b'), lambda: User(user_name='bob'))
+
+  assert (alice.user_name, bob.user_name) == ('alice', 'bob')
+  assert cache.get(('host', 'a'), lambda: User(user_name='other')).user_name == 'alice'
+
+
+def test_cached_failures_raise_a_new_exception_each_time():
+  """Negative hits raise fresh exceptions with the original type and message."""
+  cache = CurrentUserCache()
+
+  def fetch():
+    raise Unauthenticated('Invalid access token', error_code='UNAUTHENTICATED')
+
+  errors = []
+  for _ in range(3):
+    with pytest.raises(Unauthenticated) as raised:
+      cache.get(('host', 'expired'), fetch)
+    errors.append(raised.value)
+
+  assert cache.stats()['negative_hits'] == 2
+  assert len({id(error) for error in errors}) == 3
+  assert {str(error) for error in errors} == {'Invalid access token'}
+  assert errors[2].error_code == 'UNAUTHENTICATED'
@@ -0,0 +1,85 @@
+"""Warehouse warm-up scheduling."""
+
+import time
+
+import pytest
+from fastmcp import FastMCP
+
+from server.services import warehouse_warmer
+from server.services.warehouse_inventory import WarehouseInventory
+from server.services.warehouse_warmer import WarehouseWarmer
+from server.tools import load_tools
+
+
+class RecordingInventory:
+  """Stands in for WarehouseInventory and counts how often it is listed."""
+
+  def __init__(self, warehouses: list[dict]):
+    self.warehouses = warehouses
+    self.lists = 0
+
+  def list(self) -> list[dict]:
+    """Return the warehouses."""
+    self.lists += 1
+    return self.warehouses
+
+  def cached(self, warehouse_id: str) -> dict | None:
+    """Return one warehouse without counting a listing."""
+    return next((w for w in self.warehouses if w['id'] == warehouse_id), None)
+
+
+def test_idle_passes_make_no_workspace_calls():
+  """Without schedules, recent queries or pending starts a pass does nothing."""
+  inventory = RecordingInventory([{'id': 'wh', 'state': 'STOPPED'}])
+  warmer = WarehouseWarmer(lambda: None, inventory)
+
+  warmer.run_once()
+
+  assert inventory.lists == 0
+
+
+def test_recent_queries_are_acted_on():
+  """A warehouse queried within the active window is started when it stops."""
+  inventory = RecordingInventory([{'id': 'wh', 'state': 'RUNNING'}])
+  warmer = WarehouseWarmer(lambda: None, inventory)
+  warmer.record_query('wh')
+  inventory.warehouses = [{'id': 'wh', 'state': 'STOPPED'}]
+  warmed = []
+  warmer.warm = warmed.append
+
+  warmer.run_once()
+
+  assert warmed == ['wh']
+
+
+def test_recording_a_query_never_loads_the_inventory():
+  """On the request path only the loaded inventory is read, however cold it is."""
+  listed = []
+
+  class Client:
+    class warehouses:
+      @staticmethod
+      def list():
+        listed.append(True)
+        return []
+
+  warmer = WarehouseWarmer(Client, WarehouseInventory(Client, max_stale_seconds=0))
+
+  warmer.record_query('wh')
+
+  assert listed == []
+  assert warmer.stats()['warm_hits'] + warmer.stats()['cold_hits'] == 0
+  assert warmer._wanted(time.monotonic()) == {'wh'}
+
+
+@pytest.mark.asyncio
+async def test_health_does_not_create_the_warmer(monkeypatch):
+  """Reading health before startup reports no warm-up stats and starts no thread."""
+  monkeypatch.setattr(warehouse_warmer, '_warmer', None)
+  mcp_server = FastMCP(name='test')
+  load_tools(mcp_server)
+
+  health = (await mcp_server.get_tools())['health']
+
+  assert health.fn()['warmup'] is None
+  assert warehouse_warmer.current_warehouse_warmer() is None